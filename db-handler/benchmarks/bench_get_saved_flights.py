@@ -0,0 +1,108 @@
+"""
+Benchmark for db_service.get_saved_flights.
+
+Seeds users with 1, 50 and 500 saved flights (2 outbound + 2 inbound segments each) and
+compares the batched loader against the previous per-flight implementation (1 + 3N queries).
+
+Runs against an in-memory SQLite database by default, which hides network round trips,
+so the query counts matter as much as the timings. Pass a database URL to run against Postgres:
+    python benchmarks/bench_get_saved_flights.py [DATABASE_URL]
+"""
+import os
+import sys
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_HANDLER_DIR = os.path.join(CURRENT_DIR, '..')
+sys.path.insert(0, DB_HANDLER_DIR)
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from src.models.db_model import Base, SavedFlight, FlightInfo, FlightSegments, SegmentInfo
+from src.models.payload_model import FlightResponseObj, FlightResponseObjWrapper, FlightViewResponse
+from src.services.db_service import get_saved_flights, _to_segment_wrapper
+
+FLIGHT_COUNTS = [1, 50, 500]
+REPEATS = 5
+
+
+def legacy_get_saved_flights(user, db):
+    """Previous implementation: one flight info query and two segment queries per saved flight."""
+    all_flights = []
+    for flight in db.query(SavedFlight).filter(SavedFlight.user_id == user).all():
+        flight_info = db.query(FlightInfo).filter(FlightInfo.flight_id == flight.flight_id).one_or_none()
+        bounds = {}
+        for bound in ("outbound", "inbound"):
+            bounds[bound] = [
+                _to_segment_wrapper(segment) for segment, _ in (
+                    db.query(SegmentInfo, FlightSegments.segment_order)
+                    .join(FlightSegments, SegmentInfo.segment_id == FlightSegments.segment_id)
+                    .filter(FlightSegments.flight_id == flight.flight_id, FlightSegments.bound == bound)
+                    .order_by(FlightSegments.segment_order)
+                    .all()
+                )
+            ]
+        all_flights.append(FlightResponseObjWrapper(FlightResponse=FlightResponseObj(
+            number_of_segments=flight_info.total_num_segments,
+            flight_id=flight.flight_id,
+            outbound=bounds["outbound"],
+            inbound=bounds["inbound"],
+            price_per_person=flight_info.price_per_person or "",
+            total_price=flight_info.total_price or ""
+        )))
+    return FlightViewResponse(user_id=user, flights=all_flights)
+
+
+def seed(session, user, num_flights):
+    for f in range(num_flights):
+        flight_id = f"{user}_FL{f}"
+        session.add(FlightInfo(flight_id=flight_id, total_num_segments=4, price_per_person="100",
+                               total_price="100", num_users_saved=1))
+        session.add(SavedFlight(user_id=user, flight_id=flight_id))
+        for bound in ("outbound", "inbound"):
+            for order in (1, 2):
+                segment_id = f"{flight_id}_{bound}_{order}"
+                session.add(SegmentInfo(
+                    segment_id=segment_id, airline_code="AA", flight_code=str(order),
+                    departure_date="2025-04-10", departure_time="10:00", arrival_date="2025-04-10",
+                    arrival_time="12:00", duration="2H", departure_airport="LAX", departure_city="Los Angeles",
+                    destination_airport="SFO", destination_city="San Francisco", num_flights_saved=1
+                ))
+                session.add(FlightSegments(flight_id=flight_id, segment_id=segment_id,
+                                           segment_order=order, bound=bound))
+    session.commit()
+
+
+def bench(label, func, session_factory, user, query_counter):
+    timings = []
+    for _ in range(REPEATS):
+        with session_factory() as session:
+            query_counter["count"] = 0
+            start = time.perf_counter()
+            func(user=user, db=session)
+            timings.append(time.perf_counter() - start)
+    best = min(timings) * 1000
+    print(f"  {label:<8} {best:>9.2f} ms  {query_counter['count']:>5} queries")
+
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else "sqlite://"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    query_counter = {"count": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_queries(*args):
+        query_counter["count"] += 1
+
+    batched = get_saved_flights.__wrapped__  # bypass db_operation, use our own session
+    for num_flights in FLIGHT_COUNTS:
+        user = f"bench_user_{num_flights}"
+        with session_factory() as session:
+            seed(session, user, num_flights)
+
+        print(f"{num_flights} saved flights:")
+        bench("legacy", legacy_get_saved_flights, session_factory, user, query_counter)
+        bench("batched", batched, session_factory, user, query_counter)
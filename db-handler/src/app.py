@@ -1,5 +1,7 @@
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, NoResultFound
 import logging
@@ -16,11 +18,17 @@ from .models.payload_model import (
 )
 from .models.convert_model import transform_flight_save
 from .utils.logging import configure_logging
+from .utils.api_client import DB_ASYNC, pool_stats, dispose_engines
 
 configure_logging()
 logger = logging.getLogger("db_microservice")
 
-app = FastAPI(title="Flight and Itinerary API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await dispose_engines()
+
+app = FastAPI(title="Flight and Itinerary API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,12 +56,19 @@ async def log_requests(request: Request, call_next):
         logger.error(f"Request failed: {request.method} {request.url.path} [ID:{request_id}]", exc_info=True)
         raise
 
+# run a db_service operation without blocking the event loop:
+# on the async engine when DB_ASYNC is set, otherwise on the sync engine in the threadpool
+async def run_db_operation(operation, *args, **kwargs):
+    if DB_ASYNC:
+        return await operation.run_async(*args, **kwargs)
+    return await run_in_threadpool(operation, *args, **kwargs)
+
 # exception handling decorator (to standardise)
 def handle_exceptions(func):
     @wraps(func)
-    def wrapper(*args, **kwargs):
+    async def wrapper(*args, **kwargs):
         try:
-            return func(*args, **kwargs)
+            return await func(*args, **kwargs)
         except NoResultFound:
             logger.warning(f"Resource not found in {func.__name__}")
             raise HTTPException(
@@ -86,21 +101,26 @@ def handle_exceptions(func):
             )
     return wrapper
 
+@app.get("/metrics", status_code=status.HTTP_200_OK)
+async def metrics():
+    """Expose connection pool usage for monitoring"""
+    return {"db_pool": pool_stats()}
+
 # flight endpoints
 @app.post("/api/flights/save", status_code=status.HTTP_201_CREATED)
 @handle_exceptions
-def save_flight(flight: FlightSaveRequest):
+async def save_flight(flight: FlightSaveRequest):
     logger.info(f"Saving flight {flight.flights.FlightResponse.flight_id} for user {flight.user_id}")
     flight_db_info = transform_flight_save(flight)
-    result = db_service.save_flight(flight_db_info)
+    result = await run_db_operation(db_service.save_flight, flight_db_info)
     logger.info(f"Flight saved successfully for user {flight.user_id}")
     return result
 
 @app.post("/api/flights/unsave", status_code=status.HTTP_200_OK)
 @handle_exceptions
-def unsave_flight(flight: FlightUnsaveRequest):
+async def unsave_flight(flight: FlightUnsaveRequest):
     logger.info(f"Removing saved flight {flight.flight_id} for user {flight.user_id}")
-    result = db_service.unsave_flight(user_id=flight.user_id, flight_id=flight.flight_id)
+    result = await run_db_operation(db_service.unsave_flight, user_id=flight.user_id, flight_id=flight.flight_id)
     if not result:
         logger.warning(f"Saved flight {flight.flight_id} not found for user {flight.user_id}")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Saved flight not found")
@@ -109,19 +129,20 @@ def unsave_flight(flight: FlightUnsaveRequest):
 
 @app.get("/api/flights/get_saved", status_code=status.HTTP_200_OK)
 @handle_exceptions
-def get_saved_flights(user_id: str):
+async def get_saved_flights(user_id: str):
     logger.info(f"Retrieving saved flights for user {user_id}")
-    result = db_service.get_saved_flights(user=user_id)
+    result = await run_db_operation(db_service.get_saved_flights, user=user_id)
     # logger.info(f"Retrieved {len(result) if result else 0} saved flights for user {user.user_id}")
     return result
 
 # itinerary endpoints
 @app.post("/api/itineraries/save", status_code=status.HTTP_201_CREATED)
 @handle_exceptions
-def save_itinerary(itinerary: ItinerarySaveRequest):
+async def save_itinerary(itinerary: ItinerarySaveRequest):
     logger.info(f"Saving itinerary for user {itinerary.user_id} in {itinerary.itinerary.city}")
     itinerary_details = itinerary.itinerary
-    result = db_service.save_itinerary(
+    result = await run_db_operation(
+        db_service.save_itinerary,
         user_id=itinerary.user_id,
         city=itinerary_details.city,
         activity_id=itinerary_details.activity_id,
@@ -136,9 +157,9 @@ def save_itinerary(itinerary: ItinerarySaveRequest):
 
 @app.post("/api/itineraries/unsave", status_code=status.HTTP_200_OK)
 @handle_exceptions
-def unsave_itinerary(itinerary: ItineraryUnsaveRequest):
+async def unsave_itinerary(itinerary: ItineraryUnsaveRequest):
     logger.info(f"Removing saved itinerary {itinerary.activity_id} for user {itinerary.user_id}")
-    result = db_service.unsave_itinerary(user_id=itinerary.user_id, activity_id=itinerary.activity_id)
+    result = await run_db_operation(db_service.unsave_itinerary, user_id=itinerary.user_id, activity_id=itinerary.activity_id)
     if not result:
         logger.warning(f"Saved itinerary {itinerary.activity_id} not found for user {itinerary.user_id}")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Saved itinerary not found")
@@ -147,9 +168,9 @@ def unsave_itinerary(itinerary: ItineraryUnsaveRequest):
 
 @app.get("/api/itineraries/get_saved", status_code=status.HTTP_200_OK)
 @handle_exceptions
-def get_saved_itineraries(user_id: str):
+async def get_saved_itineraries(user_id: str):
     logger.info(f"Retrieving saved itineraries for user {user_id}")
-    result = db_service.get_saved_itineraries(user_id=user_id)
+    result = await run_db_operation(db_service.get_saved_itineraries, user_id=user_id)
     # logger.info(f"Retrieved {len(result) if result else 0} saved itineraries for user {user.user_id}")
     return result
 
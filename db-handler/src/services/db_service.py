@@ -1,11 +1,16 @@
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError, NoResultFound, IntegrityError
 from typing import Optional, List, Dict, Any, Callable
 from functools import wraps
+from operator import itemgetter
 import logging
 import time
+from collections import Counter, defaultdict
 
-from ..utils.api_client import get_db
+from ..utils.api_client import open_session, open_async_session
 from ..models.db_model import SavedFlight, FlightInfo, FlightSegments, SegmentInfo, SavedItinerary, ItineraryInfo
 from ..models.payload_model import (
     SegmentResponse, SegmentResponseWrapper, FlightResponseObj,
@@ -17,111 +22,140 @@ from ..models.convert_model import FlightSaveDB
 logger = logging.getLogger("db_microservice")
 
 # helper to handle database operations with logging/error handling
+def _run_operation(func: Callable, db: Session, args: tuple, kwargs: dict) -> Any:
+    """Run a database operation in its own transaction, committing on success and rolling back on error"""
+    operation_id = f"{func.__name__}_{time.time():.0f}" # generate unique operation ID
+    logger.debug(f"Database operation starting: {func.__name__} [ID:{operation_id}]")
+    start_time = time.time()
+    
+    try:
+        # execute the database operation
+        result = func(db=db, *args, **kwargs)
+        db.commit()
+        
+        elapsed_time = time.time() - start_time
+        logger.debug(f"Database operation completed: {func.__name__} [ID:{operation_id}] - Time: {elapsed_time:.3f}s")
+        return result
+        
+    except IntegrityError as e:
+        db.rollback()
+        logger.error(f"Database integrity error in {func.__name__} [ID:{operation_id}]: {str(e)}", exc_info=True)
+        raise
+        
+    except NoResultFound as e:
+        db.rollback()
+        logger.warning(f"Resource not found in {func.__name__} [ID:{operation_id}]")
+        raise
+        
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.error(f"Database error in {func.__name__} [ID:{operation_id}]: {str(e)}", exc_info=True)
+        raise
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Unexpected error in {func.__name__} [ID:{operation_id}]: {str(e)}", exc_info=True)
+        raise
+
 def db_operation(func: Callable) -> Callable:
-    """Decorator for database operations with error handling"""
+    """
+    Decorator for database operations with error handling.
+    The decorated function runs on a pooled sync session; its run_async attribute runs the same
+    operation on an AsyncSession (see DB_ASYNC), so both paths share one implementation.
+    """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        operation_id = f"{func.__name__}_{time.time():.0f}" # generate unique operation ID
-        logger.debug(f"Database operation starting: {func.__name__} [ID:{operation_id}]")
-        start_time = time.time()
-        
-        db: Session = next(get_db())
-        try:
-            # execute the database operation
-            result = func(db=db, *args, **kwargs)
-            db.commit()
-            
-            elapsed_time = time.time() - start_time
-            logger.debug(f"Database operation completed: {func.__name__} [ID:{operation_id}] - Time: {elapsed_time:.3f}s")
-            return result
-            
-        except IntegrityError as e:
-            db.rollback()
-            logger.error(f"Database integrity error in {func.__name__} [ID:{operation_id}]: {str(e)}", exc_info=True)
-            raise
-            
-        except NoResultFound as e:
-            db.rollback()
-            logger.warning(f"Resource not found in {func.__name__} [ID:{operation_id}]")
-            raise
-            
-        except SQLAlchemyError as e:
-            db.rollback()
-            logger.error(f"Database error in {func.__name__} [ID:{operation_id}]: {str(e)}", exc_info=True)
-            raise
-            
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Unexpected error in {func.__name__} [ID:{operation_id}]: {str(e)}", exc_info=True)
-            raise
-            
-        finally:
-            db.close()
-            
+        with open_session() as db:
+            return _run_operation(func, db, args, kwargs)
+
+    async def run_async(*args, **kwargs):
+        async with open_async_session() as db:
+            return await db.run_sync(lambda session: _run_operation(func, session, args, kwargs))
+
+    wrapper.run_async = run_async
     return wrapper
 
 
 ############### FLIGHTS ###############
 
+def _insert(db: Session, model):
+    """
+    INSERT statement supporting ON CONFLICT for the session's database
+    (PostgreSQL in production, SQLite for local tests and benchmarks)
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert(model)
+    return pg_insert(model)
+
 @db_operation
 def save_flight(full_info: FlightSaveDB, db: Session = None) -> Dict[str, str]:
     """
     Saves flight for user
     Creates new flight record if it does not exist
     Else, updates existing flight information
+    Uses set-based upserts, so the number of statements does not depend on the number of segments
     """
     flight_info = full_info.flight
     segments = full_info.segments
     flight_segments = full_info.flight_segments
-    
-    # [1] check if flight record already exists
-    db_flight = db.query(FlightInfo).filter_by(flight_id=flight_info.flight_id).one_or_none()
 
-    if not db_flight:
+    # [1] create flight record if it does not exist yet (RETURNING is empty if it already existed)
+    created_flight_id = db.execute(
+        _insert(db, FlightInfo)
+        .values(**flight_info.model_dump(), num_users_saved=0)
+        .on_conflict_do_nothing(index_elements=[FlightInfo.flight_id])
+        .returning(FlightInfo.flight_id)
+    ).scalar_one_or_none()
+
+    if created_flight_id:
         logger.info(f"Creating new flight record for flight {flight_info.flight_id}")
 
-        # (a) save flight info
-        db.add(FlightInfo(**flight_info.model_dump(), num_users_saved=1))
-        db.flush()
-
-        # (b) save segments info
-        for segment_info in segments:
-            logger.debug(f"Processing segment {segment_info.segment_id} for flight {flight_info.flight_id}")
-            
-            # check if segment already exists
-            db_segment = db.query(SegmentInfo).filter_by(segment_id=segment_info.segment_id).one_or_none()
-
-            if not db_segment:
-                logger.debug(f"Creating new segment record for segment {segment_info.segment_id}")
-                db.add(SegmentInfo(**segment_info.model_dump(), num_flights_saved=1))
-            else:
-                logger.debug(f"Updating existing segment {segment_info.segment_id}")
-                db_segment.num_flights_saved += 1
-            
-            db.flush()
-
-        # (c) save connecting flights info
-        logger.debug(f"Saving {len(flight_segments)} flight-segment relationships")
-        db.bulk_save_objects([FlightSegments(**fs.model_dump()) for fs in flight_segments])
-    
-    # increment users saved if flight info already exists
+        # (a) upsert segments info, incrementing flight count of segments that already exist
+        segment_counts = Counter(segment_info.segment_id for segment_info in segments)
+        segment_rows = {
+            segment_info.segment_id: {**segment_info.model_dump(), "num_flights_saved": segment_counts[segment_info.segment_id]}
+            for segment_info in segments
+        }
+        if segment_rows:
+            logger.debug(f"Upserting {len(segment_rows)} segments for flight {flight_info.flight_id}")
+            # rows in a fixed (segment_id) order, so concurrent saves sharing segments lock them in the same order
+            segment_insert = _insert(db, SegmentInfo).values(sorted(segment_rows.values(), key=itemgetter("segment_id")))
+            db.execute(segment_insert.on_conflict_do_update(
+                index_elements=[SegmentInfo.segment_id],
+                set_={"num_flights_saved": SegmentInfo.num_flights_saved + segment_insert.excluded.num_flights_saved}
+            ))
+
+        # (b) save connecting flights info
+        if flight_segments:
+            logger.debug(f"Saving {len(flight_segments)} flight-segment relationships")
+            db.execute(
+                _insert(db, FlightSegments)
+                .values([fs.model_dump() for fs in flight_segments])
+                .on_conflict_do_nothing()
+            )
     else:
         logger.info(f"Updating existing flight {flight_info.flight_id}")
-        db_flight.num_users_saved += 1
 
     # [2] add to user saved flights, if not already saved
-    existing_saved_flight = db.query(SavedFlight).filter_by(
-        user_id=full_info.user_id,
-        flight_id=flight_info.flight_id
-    ).one_or_none()
-
-    if existing_saved_flight:
+    saved_flight_id = db.execute(
+        _insert(db, SavedFlight)
+        .values(user_id=full_info.user_id, flight_id=flight_info.flight_id)
+        .on_conflict_do_nothing()
+        .returning(SavedFlight.flight_id)
+    ).scalar_one_or_none()
+
+    if not saved_flight_id:
         logger.info(f"User {full_info.user_id} has already saved flight {flight_info.flight_id}")
-        db_flight.num_users_saved -= 1
         # return {"message": "User has already saved this flight"}
         return SaveUnsaveResponse(user_id=full_info.user_id, status=False, message="User already saved flight")
-    
-    db.add(SavedFlight(user_id=full_info.user_id, flight_id=flight_info.flight_id))
+
+    # [3] increment users saved in the database, so concurrent saves do not lose updates
+    db.execute(
+        update(FlightInfo)
+        .where(FlightInfo.flight_id == flight_info.flight_id)
+        .values(num_users_saved=FlightInfo.num_users_saved + 1)
+    )
+
     # return {"message": "Flight saved successfully"}
     return SaveUnsaveResponse(user_id=full_info.user_id, status=True, message="Flight saved successfully")
 
@@ -131,161 +165,152 @@ def unsave_flight(user_id: str, flight_id: str, db: Session = None) -> Optional[
     """
     Remove flight from user saved flights
     Cleans up flight info if no users have saved it
+    Reference counts are updated atomically in the database, so concurrent unsaves do not lose updates
     """
-    # [1] check if flight in user saved flights
-    saved_flight = db.query(SavedFlight).filter_by(
-        user_id=user_id,
-        flight_id=flight_id
-    ).one_or_none()
-    
-    if not saved_flight:
+    # [1] delete from user saved flights (RETURNING is empty if user did not save it)
+    unsaved_flight_id = db.execute(
+        delete(SavedFlight)
+        .where(SavedFlight.user_id == user_id, SavedFlight.flight_id == flight_id)
+        .returning(SavedFlight.flight_id)
+    ).scalar_one_or_none()
+
+    if not unsaved_flight_id:
         logger.warning(f"Flight {flight_id} not found saved for user {user_id}")
         # return {"message": "User does not have this flight saved"}
         return SaveUnsaveResponse(user_id=user_id, status=False, message="User does not have this flight saved")
-    
-    flight_info = db.query(FlightInfo).filter_by(flight_id=flight_id).one_or_none()
-    
-    if not flight_info:
+
+    # [2] decrement num_users_saved count
+    num_users_saved = db.execute(
+        update(FlightInfo)
+        .where(FlightInfo.flight_id == flight_id)
+        .values(num_users_saved=FlightInfo.num_users_saved - 1)
+        .returning(FlightInfo.num_users_saved)
+    ).scalar_one_or_none()
+
+    if num_users_saved is None:
         logger.warning(f"Record for flight {flight_id} not found")
         # return {"message": "Flight does not exist"}
         return SaveUnsaveResponse(user_id=user_id, status=False, message="Flight does not exist")
 
-    # [2] delete from user saved flights
-    db.delete(saved_flight)
-    db.flush()
-
-    # decrement num_users_saved count
-    flight_info.num_users_saved -= 1
-    logger.debug(f"Updated flight {flight_id} users saved count to {flight_info.num_users_saved}")
+    logger.debug(f"Updated flight {flight_id} users saved count to {num_users_saved}")
 
     # [3] delete all related flight info if no other users saved it
-    if flight_info.num_users_saved <= 0:
+    if num_users_saved <= 0:
         logger.info(f"No users have saved flight {flight_id}, cleaning up flight data")
-        
-        segment_ids = [row[0] for row in db.query(FlightSegments.segment_id)
-                        .filter(FlightSegments.flight_id == flight_id).all()]
-        
-        logger.debug(f"Found {len(segment_ids)} segments associated with flight {flight_id}")
 
         # [a] delete flight segments (child)
-        db.query(FlightSegments).filter_by(flight_id=flight_id).delete()
-        db.flush()
+        segment_ids = db.execute(
+            delete(FlightSegments)
+            .where(FlightSegments.flight_id == flight_id)
+            .returning(FlightSegments.segment_id)
+        ).scalars().all()
+        logger.debug(f"Found {len(segment_ids)} segments associated with flight {flight_id}")
 
         # [b] delete flight info (parent)
-        db.delete(flight_info)
-        db.flush()
+        db.execute(delete(FlightInfo).where(FlightInfo.flight_id == flight_id, FlightInfo.num_users_saved <= 0))
 
         # [c] update/delete segment info
-        for segment_id in segment_ids:
-            logger.debug(f"Processing segment {segment_id} for cleanup")
-            segment_info = db.query(SegmentInfo).filter_by(segment_id=segment_id).one_or_none()
-
-            if segment_info:
-                segment_info.num_flights_saved -= 1
-
-                if segment_info.num_flights_saved <= 0:
-                    logger.debug(f"Deleting segment {segment_id}, which is no longer in use")
-                    db.delete(segment_info)
-                    db.flush()
-                else:
-                    logger.debug(f"Updated segment {segment_id} flight count to {segment_info.num_flights_saved}")
-    
+        _release_segments(db, segment_ids)
+
     # return {"message": "Flight successfully removed from saved"}
     return SaveUnsaveResponse(user_id=user_id, status=True, message="Flight successfully removed from saved")
 
+def _release_segments(db: Session, segment_ids: List[str]) -> None:
+    """
+    Decrement flight counts of segments no longer used by a flight,
+    then delete the segments no flight uses any more
+    """
+    if not segment_ids:
+        return
+
+    # a segment used n times by the flight is decremented by n (one statement per distinct n, usually one)
+    ids_by_count = defaultdict(list)
+    for segment_id, count in Counter(segment_ids).items():
+        ids_by_count[count].append(segment_id)
+
+    for count, ids in ids_by_count.items():
+        db.execute(
+            update(SegmentInfo)
+            .where(SegmentInfo.segment_id.in_(ids))
+            .values(num_flights_saved=SegmentInfo.num_flights_saved - count)
+        )
+
+    deleted_segment_ids = db.execute(
+        delete(SegmentInfo)
+        .where(SegmentInfo.segment_id.in_(set(segment_ids)), SegmentInfo.num_flights_saved <= 0)
+        .returning(SegmentInfo.segment_id)
+    ).scalars().all()
+    logger.debug(f"Deleted {len(deleted_segment_ids)} segments no longer in use")
+
+def _to_segment_wrapper(segment: SegmentInfo) -> SegmentResponseWrapper:
+    return SegmentResponseWrapper(
+        SegmentResponse=SegmentResponse(
+            num_passengers = 1,                     # TODO: check if save num_passengers
+            departure_time = segment.departure_time,
+            departure_date = segment.departure_date,
+            arrival_date = segment.arrival_date,
+            arrival_time = segment.arrival_time,
+            duration = segment.duration,
+            departure_airport = segment.departure_airport,
+            departure_city = segment.departure_city or "Unknown",
+            destination_airport = segment.destination_airport,
+            destination_city = segment.destination_city or "Unknown",
+            airline_code = segment.airline_code,
+            flight_number = segment.flight_code,
+            unique_id = segment.segment_id
+        )
+    )
+
 @db_operation
 def get_saved_flights(user: str, db: Session = None) -> Dict[str, List[Dict[str, Any]]]:
-    # get all saved flights for user
+    """
+    Get all saved flights for user
+    Uses a fixed number of queries regardless of how many flights are saved:
+    one for the flights, one for all of their segments (grouped in Python)
+    """
+    # [1] get flight info for all saved flights of user
     saved_flights = (
-        db.query(SavedFlight)
+        db.query(FlightInfo)
+        .join(SavedFlight, FlightInfo.flight_id == SavedFlight.flight_id)
         .filter(SavedFlight.user_id == user)
         .all()
     )
     logger.debug(f"Found {len(saved_flights)} saved flights for user {user}")
 
-    all_flights = []
+    if not saved_flights:
+        logger.info(f"Successfully retrieved 0 flights for user {user}")
+        return FlightViewResponse(user_id=user, flights=[])
 
-    for flight in saved_flights:
-        logger.debug(f"Processing flight {flight.flight_id}")
-        flight_info = db.query(FlightInfo).filter(FlightInfo.flight_id == flight.flight_id).one_or_none()
-
-        if not flight_info:
-            logger.warning(f"Flight info not found for {flight.flight_id}, skipping")
-            continue
-
-        # get outbound flight segments
-        outbound_segment_info = (
-            db.query(SegmentInfo, FlightSegments.segment_order)
-            .join(FlightSegments, SegmentInfo.segment_id == FlightSegments.segment_id)
-            .filter(FlightSegments.flight_id == flight.flight_id, FlightSegments.bound == 'outbound')
-            .order_by(FlightSegments.segment_order)
-            .all()
-        )
-        
-        # get inbound flight segments
-        inbound_segment_info = (
-            db.query(SegmentInfo, FlightSegments.segment_order)
-            .join(FlightSegments, SegmentInfo.segment_id == FlightSegments.segment_id)
-            .filter(FlightSegments.flight_id == flight.flight_id, FlightSegments.bound == 'inbound')
-            .order_by(FlightSegments.segment_order)
-            .all()
-        )
+    # [2] get segments of all saved flights in one query, in order within each bound
+    segment_rows = (
+        db.query(FlightSegments.flight_id, FlightSegments.bound, SegmentInfo)
+        .join(SegmentInfo, SegmentInfo.segment_id == FlightSegments.segment_id)
+        .join(SavedFlight, SavedFlight.flight_id == FlightSegments.flight_id)
+        .filter(SavedFlight.user_id == user)
+        .order_by(FlightSegments.flight_id, FlightSegments.bound, FlightSegments.segment_order)
+        .all()
+    )
+    logger.debug(f"Found {len(segment_rows)} segments across saved flights for user {user}")
 
-        logger.debug(f"Found {len(outbound_segment_info)} outbound and {len(inbound_segment_info)} inbound segments")
-
-        # process outbound flights
-        outbound_flights = []
-        for out_f, segment_order in outbound_segment_info:
-            outbound_flights.append(SegmentResponseWrapper(
-                SegmentResponse=SegmentResponse(
-                    num_passengers = 1,                     # TODO: check if save num_passengers
-                    departure_time = out_f.departure_time,
-                    departure_date = out_f.departure_date,
-                    arrival_date = out_f.arrival_date,
-                    arrival_time = out_f.arrival_time,
-                    duration = out_f.duration,
-                    departure_airport = out_f.departure_airport,
-                    departure_city = out_f.departure_city or "Unknown",
-                    destination_airport = out_f.destination_airport,
-                    destination_city = out_f.destination_city or "Unknown",
-                    airline_code = out_f.airline_code,
-                    flight_number = out_f.flight_code,
-                    unique_id = out_f.segment_id
-                )
-            ))
-        
-        # process inbound flights
-        inbound_flights = []
-        for in_f, segment_order in inbound_segment_info:
-            inbound_flights.append(SegmentResponseWrapper(
-                SegmentResponse=SegmentResponse(
-                    num_passengers = 1,                     # TODO: check if save num_passengers
-                    departure_time = in_f.departure_time,
-                    departure_date = in_f.departure_date,
-                    arrival_date = in_f.arrival_date,
-                    arrival_time = in_f.arrival_time,
-                    duration = in_f.duration,
-                    departure_airport = in_f.departure_airport,
-                    departure_city=in_f.destination_city or "Unknown",
-                    destination_airport = in_f.destination_airport,
-                    destination_city=in_f.destination_city or "Unknown",
-                    airline_code = in_f.airline_code,
-                    flight_number = in_f.flight_code,
-                    unique_id = in_f.segment_id
-                )
-            ))
+    # group segments by flight and bound
+    segments_by_flight = defaultdict(lambda: {"outbound": [], "inbound": []})
+    for flight_id, bound, segment in segment_rows:
+        segments_by_flight[flight_id][bound].append(_to_segment_wrapper(segment))
 
+    all_flights = []
+    for flight_info in saved_flights:
+        segments = segments_by_flight[flight_info.flight_id]
         all_flights.append(FlightResponseObjWrapper(
             FlightResponse=FlightResponseObj(
                 number_of_segments = flight_info.total_num_segments,
-                flight_id = flight.flight_id,
-                outbound = outbound_flights,
-                inbound = inbound_flights,
+                flight_id = flight_info.flight_id,
+                outbound = segments["outbound"],
+                inbound = segments["inbound"],
                 price_per_person = flight_info.price_per_person or "",
                 total_price = flight_info.total_price or ""
             )
         ))
-            
+
     logger.info(f"Successfully retrieved {len(all_flights)} flights for user {user}")
     response = FlightViewResponse(user_id=user, flights=all_flights)
     return response
@@ -297,30 +322,44 @@ def save_itinerary(user_id: str, city: str, activity_id: str, activity_name: str
     """
     Saves itinerary for user
     Creates new itinerary record if it does not exist
+    Reference counts are updated atomically in the database, so concurrent saves do not lose updates
     """
-    # [1] check if itinerary exists
-    db_itinerary = db.query(ItineraryInfo).filter_by(activity_id=activity_id).one_or_none()
-
-    if not db_itinerary:
-        logger.info(f"Creating new itinerary record for {activity_id}")
-        db_itinerary = ItineraryInfo(
+    # [1] create itinerary record if it does not exist
+    created_activity_id = db.execute(
+        _insert(db, ItineraryInfo)
+        .values(
             city=city, activity_id=activity_id, activity_name=activity_name,
             activity_details=activity_details, price_amount=price_amount,
-            price_currency=price_currency, pictures=pictures, num_users_saved=1)
-        db.add(db_itinerary)
+            price_currency=price_currency, pictures=pictures, num_users_saved=0)
+        .on_conflict_do_nothing(index_elements=[ItineraryInfo.activity_id])
+        .returning(ItineraryInfo.activity_id)
+    ).scalar_one_or_none()
+
+    if created_activity_id:
+        logger.info(f"Creating new itinerary record for {activity_id}")
     else:
         logger.info(f"Updating existing itinerary {activity_id}")
-        db_itinerary.num_users_saved += 1
-    
-    # [2] check that user has not already saved this itinerary
-    existing_saved_itinerary = db.query(SavedItinerary).filter_by(user_id=user_id, activity_id=activity_id).one_or_none()
-    if existing_saved_itinerary:
+
+    # [2] add to user saved itineraries, if not already saved
+    saved_activity_id = db.execute(
+        _insert(db, SavedItinerary)
+        .values(user_id=user_id, activity_id=activity_id)
+        .on_conflict_do_nothing()
+        .returning(SavedItinerary.activity_id)
+    ).scalar_one_or_none()
+
+    if not saved_activity_id:
         logger.info(f"User {user_id} has already saved itinerary {activity_id}")
-        db_itinerary.num_users_saved -= 1
         # return {"message": "User has already saved this itinerary"}
         return SaveUnsaveResponse(user_id=user_id, status=False, message="User already saved itinerary")
-    
-    db.add(SavedItinerary(user_id=user_id, activity_id=activity_id))
+
+    # [3] increment users saved
+    db.execute(
+        update(ItineraryInfo)
+        .where(ItineraryInfo.activity_id == activity_id)
+        .values(num_users_saved=ItineraryInfo.num_users_saved + 1)
+    )
+
     # return {"message": "Itinerary saved successfully"}
     return SaveUnsaveResponse(user_id=user_id, status=True, message="Itinerary saved successfully")
 
@@ -329,38 +368,41 @@ def unsave_itinerary(user_id: str, activity_id: str, db: Session = None) -> Dict
     """
     Remove itinerary from user saved itineraries
     Cleans up itinerary info if no users have saved it
+    Reference counts are updated atomically in the database, so concurrent unsaves do not lose updates
     """
-    # [1] check if itinerary in user saved itineraries
-    saved_itinerary = db.query(SavedItinerary).filter_by(
-        user_id=user_id,
-        activity_id=activity_id
-    ).one_or_none()
-
-    if not saved_itinerary:
+    # [1] delete from user saved itineraries (RETURNING is empty if user did not save it)
+    unsaved_activity_id = db.execute(
+        delete(SavedItinerary)
+        .where(SavedItinerary.user_id == user_id, SavedItinerary.activity_id == activity_id)
+        .returning(SavedItinerary.activity_id)
+    ).scalar_one_or_none()
+
+    if not unsaved_activity_id:
         logger.warning(f"Itinerary {activity_id} not found saved for user {user_id}")
         # return {"message": "User does not have this itinerary saved"}
         return SaveUnsaveResponse(user_id=user_id, status=False, message="User does not have this itinerary saved")
- 
-    # [2] delete from user saved itineraries
-    db.delete(saved_itinerary)
-    db.flush()
-    
-    # [3] update or delete itinerary info
-    itinerary_info = db.query(ItineraryInfo).filter_by(activity_id=activity_id).one_or_none()
 
-    if itinerary_info:
-        # [a] decrement num_users_saved in the ItineraryInfo table
-        itinerary_info.num_users_saved -= 1
-        logger.debug(f"Updated itinerary {activity_id} users saved count to {itinerary_info.num_users_saved}")
+    # [2] decrement num_users_saved in the ItineraryInfo table
+    num_users_saved = db.execute(
+        update(ItineraryInfo)
+        .where(ItineraryInfo.activity_id == activity_id)
+        .values(num_users_saved=ItineraryInfo.num_users_saved - 1)
+        .returning(ItineraryInfo.num_users_saved)
+    ).scalar_one_or_none()
 
-        # [b] delete entry if no users saved this itinerary
-        if itinerary_info.num_users_saved <= 0:
-            logger.info(f"No users have saved itinerary {activity_id}, deleting record")
-            db.delete(itinerary_info)
-            db.flush()
-    else:
+    if num_users_saved is None:
         logger.warning(f"Itinerary information for {activity_id} not found")
-    
+    else:
+        logger.debug(f"Updated itinerary {activity_id} users saved count to {num_users_saved}")
+
+        # [3] delete entry if no users saved this itinerary
+        if num_users_saved <= 0:
+            logger.info(f"No users have saved itinerary {activity_id}, deleting record")
+            db.execute(
+                delete(ItineraryInfo)
+                .where(ItineraryInfo.activity_id == activity_id, ItineraryInfo.num_users_saved <= 0)
+            )
+
     # return {"message": "Itinerary removed from saved"}
     return SaveUnsaveResponse(user_id=user_id, status=True, message="Itinerary removed from saved")
 
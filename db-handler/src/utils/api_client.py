@@ -1,10 +1,13 @@
 import os
+import time
 import logging
+import threading
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from urllib.parse import quote_plus
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 
 logger = logging.getLogger("db_microservice")
 
@@ -17,21 +20,123 @@ DB_USER = os.getenv("DB-USER", "your_username")
 DB_PASSWORD = os.getenv("DB-PASSWORD", "your_password")
 DB_PORT = os.getenv("DB-PORT", "5432")
 
+# connection pool configuration (per worker; replicas x workers x (size + overflow) must fit the Postgres connection limit)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# serve requests through an asyncio engine (asyncpg) instead of the threadpool
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+
 DATABASE_URL = f"postgresql://{DB_USER}:{quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=require"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{DB_NAME}?ssl=require"
 # logger.debug(f"Connecting to database using: {DATABASE_URL}")
 
 # [1] initialise database connection
 try:
     logger.info("Initialising database connection...")
-    engine = create_engine(DATABASE_URL)
+    logger.info(
+        f"Database pool: size={DB_POOL_SIZE}, max_overflow={DB_MAX_OVERFLOW}, timeout={DB_POOL_TIMEOUT}s, "
+        f"recycle={DB_POOL_RECYCLE}s, pre_ping={DB_POOL_PRE_PING}"
+    )
+    pool_options = dict(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING
+    )
+    engine = create_engine(DATABASE_URL, **pool_options)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    async_engine = None
+    AsyncSessionLocal = None
+    if DB_ASYNC:
+        logger.info("Using async database engine (asyncpg)")
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options)
+        AsyncSessionLocal = async_sessionmaker(async_engine, autocommit=False, autoflush=False, expire_on_commit=False)
     Base = declarative_base()
     logger.info("Database connection established")
 except Exception as e:
     logger.error(f"Error connecting to database", exc_info=True) 
     raise RuntimeError(f"Database connection failed: {str(e)}") from e
 
-# [2] session management (dependency)
+# [2] connection pool statistics
+class PoolWaitStats:
+    """Time spent waiting to check a connection out of the pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "total_wait_seconds": round(self.total_wait, 6),
+                "avg_wait_seconds": round(self.total_wait / self.checkouts, 6) if self.checkouts else 0.0,
+                "max_wait_seconds": round(self.max_wait, 6)
+            }
+
+pool_wait_stats = PoolWaitStats()
+
+def pool_stats() -> dict:
+    """Current pool usage, to size the Postgres connection budget across replicas"""
+    pool = async_engine.pool if async_engine is not None else engine.pool
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        **pool_wait_stats.stats()
+    }
+
+# [3] session management
+@contextmanager
+def open_session():
+    """
+    Session for a single database operation, always closed (returning its connection to the pool) on exit.
+    The connection is checked out up front so the time spent waiting on the pool is recorded.
+    """
+    db = SessionLocal()
+    try:
+        start_time = time.perf_counter()
+        db.connection()
+        pool_wait_stats.record(time.perf_counter() - start_time)
+        yield db
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def open_async_session():
+    """Async counterpart of open_session, used when DB_ASYNC is enabled"""
+    db: AsyncSession = AsyncSessionLocal()
+    try:
+        start_time = time.perf_counter()
+        await db.connection()
+        pool_wait_stats.record(time.perf_counter() - start_time)
+        yield db
+    finally:
+        await db.close()
+
+async def dispose_engines():
+    """Close all pooled connections (called on application shutdown)"""
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
+# dependency
 def get_db():
     db = SessionLocal()
     try:
@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from src.utils import api_client
+from src.utils.api_client import open_session, pool_stats, PoolWaitStats
+
+@pytest.fixture
+def sqlite_sessions(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool)
+    monkeypatch.setattr(api_client, "SessionLocal", sessionmaker(bind=engine, autocommit=False, autoflush=False))
+    monkeypatch.setattr(api_client, "pool_wait_stats", PoolWaitStats())
+    yield engine
+    engine.dispose()
+
+def test_engine_uses_configured_pool_settings():
+    """
+    GIVEN the pool settings read from the environment
+    WHEN the engine is created
+    THEN the pool should be sized, recycled and pre-pinged accordingly
+    """
+    pool = api_client.engine.pool
+    assert pool.size() == api_client.DB_POOL_SIZE
+    assert pool._max_overflow == api_client.DB_MAX_OVERFLOW
+    assert pool._timeout == api_client.DB_POOL_TIMEOUT
+    assert pool._recycle == api_client.DB_POOL_RECYCLE
+    assert pool._pre_ping == api_client.DB_POOL_PRE_PING
+
+def test_open_session_returns_connection_to_pool(sqlite_sessions):
+    """
+    GIVEN a session opened for a database operation
+    WHEN the operation finishes
+    THEN the connection should be checked back into the pool and the wait recorded
+    """
+    with open_session() as db:
+        assert db.execute(text("SELECT 1")).scalar() == 1
+        assert sqlite_sessions.pool.checkedout() == 1
+
+    assert sqlite_sessions.pool.checkedout() == 0
+    assert api_client.pool_wait_stats.stats()["checkouts"] == 1
+
+def test_open_session_closes_session_on_error(sqlite_sessions):
+    """
+    GIVEN an operation that raises
+    WHEN the session context exits
+    THEN the connection should still be returned to the pool
+    """
+    with pytest.raises(RuntimeError):
+        with open_session():
+            raise RuntimeError("operation failed")
+
+    assert sqlite_sessions.pool.checkedout() == 0
+
+def test_pool_stats_reports_usage_and_wait_time():
+    """
+    GIVEN the configured engine
+    WHEN pool_stats is called
+    THEN it should report checked out/overflow counts and checkout wait times
+    """
+    stats = pool_stats()
+
+    assert stats["pool_size"] == api_client.DB_POOL_SIZE
+    assert stats["max_overflow"] == api_client.DB_MAX_OVERFLOW
+    assert stats["checked_out"] == 0
+    assert stats["overflow"] == 0
+    assert {"checkouts", "total_wait_seconds", "avg_wait_seconds", "max_wait_seconds"} <= stats.keys()
+
+def test_pool_wait_stats_aggregates_waits():
+    """
+    GIVEN several recorded pool checkouts
+    WHEN stats are requested
+    THEN total, average and maximum wait should be reported
+    """
+    wait_stats = PoolWaitStats()
+    wait_stats.record(0.1)
+    wait_stats.record(0.3)
+
+    assert wait_stats.stats() == {
+        "checkouts": 2,
+        "total_wait_seconds": 0.4,
+        "avg_wait_seconds": 0.2,
+        "max_wait_seconds": 0.3
+    }
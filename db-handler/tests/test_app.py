@@ -0,0 +1,44 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+from src.app import app
+from src.models.payload_model import SaveUnsaveResponse
+
+client = TestClient(app)
+
+@pytest.fixture
+def unsave_response():
+    return SaveUnsaveResponse(user_id="test_user", status=True, message="Itinerary removed from saved")
+
+@patch("src.app.DB_ASYNC", False)
+@patch("src.app.db_service.unsave_itinerary")
+def test_endpoint_uses_threadpool_by_default(mock_unsave_itinerary, unsave_response):
+    """
+    GIVEN the default (sync) database configuration
+    WHEN an endpoint is called
+    THEN the sync db_service operation should be run
+    """
+    mock_unsave_itinerary.return_value = unsave_response
+
+    response = client.post("/api/itineraries/unsave", json={"user_id": "test_user", "activity_id": "ACT123"})
+
+    assert response.status_code == 200
+    assert response.json()["status"] is True
+    mock_unsave_itinerary.assert_called_once_with(user_id="test_user", activity_id="ACT123")
+    mock_unsave_itinerary.run_async.assert_not_called()
+
+@patch("src.app.DB_ASYNC", True)
+@patch("src.app.db_service.unsave_itinerary")
+def test_endpoint_uses_async_session_when_enabled(mock_unsave_itinerary, unsave_response):
+    """
+    GIVEN DB_ASYNC is enabled
+    WHEN an endpoint is called
+    THEN the operation should be awaited on the async path
+    """
+    mock_unsave_itinerary.run_async = AsyncMock(return_value=unsave_response)
+
+    response = client.post("/api/itineraries/unsave", json={"user_id": "test_user", "activity_id": "ACT123"})
+
+    assert response.status_code == 200
+    mock_unsave_itinerary.run_async.assert_awaited_once_with(user_id="test_user", activity_id="ACT123")
+    mock_unsave_itinerary.assert_not_called()
@@ -1,10 +1,15 @@
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock, call
-from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock, AsyncMock, call
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.exc import SQLAlchemyError, NoResultFound
 from src.services.db_service import save_flight, unsave_flight, get_saved_flights
 from src.services.db_service import save_itinerary, unsave_itinerary, get_saved_itineraries
-from src.models.db_model import SavedFlight, FlightInfo, FlightSegments, SegmentInfo
+from src.models.db_model import Base, SavedFlight, FlightInfo, FlightSegments, SegmentInfo
 from src.models.db_model import SavedItinerary, ItineraryInfo
 from src.models.payload_model import SegmentResponse, FlightResponseObj
 from src.models.convert_model import FlightSaveDB
@@ -14,6 +19,13 @@ def mock_db():
     mock = MagicMock(spec=Session)
     return mock
 
+@pytest.fixture
+def sqlite_session_factory():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    engine.dispose()
+
 @pytest.fixture
 def mock_flight_data():
     return FlightSaveDB(
@@ -62,442 +74,421 @@ def mock_itinerary_data():
 
 ############### FLIGHTS ###############
 
-@patch("src.services.db_service.get_db")
-def test_save_new_flight(mock_get_db, mock_db, mock_flight_data):
+def execute_result(value, values=None):
+    """Mock result of db.execute whose scalar_one_or_none() returns value (and scalars().all() values)"""
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = value
+    result.scalars.return_value.all.return_value = values or []
+    return result
+
+@patch("src.services.db_service.open_session")
+def test_save_new_flight(mock_open_session, mock_db, mock_flight_data):
     """
     GIVEN new flight WHEN save_flight is called
     THEN add flight information and return success message
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
-    
-    # mock new flight
-    flight_query = MagicMock()
-    flight_query.filter_by.return_value.one_or_none.return_value = None
-    
-    # configure that user hasn't saved flight yet
-    saved_flight_query = MagicMock()
-    saved_flight_query.filter_by.return_value.one_or_none.return_value = None
-    
-    segment_query = MagicMock()
-    segment_query.filter_by.return_value.one_or_none.return_value = None
+    mock_open_session.return_value.__enter__.return_value = mock_db
 
-    mock_db.query.side_effect = [
-        flight_query,
-        segment_query,
-        saved_flight_query
+    mock_db.execute.side_effect = [
+        execute_result("FL123"),  # flight info inserted
+        execute_result(None),     # segments upserted
+        execute_result(None),     # flight segments inserted
+        execute_result("FL123"),  # saved flight inserted
+        execute_result(None)      # num_users_saved incremented
     ]
-    
+
     result = save_flight(mock_flight_data)
-    
-    assert mock_db.add.call_count == 3  # : FlightInfo, SegmentInfo, and SavedFlight
-    mock_db.bulk_save_objects.assert_called_once()
+
+    assert mock_db.execute.call_count == 5
+    mock_db.add.assert_not_called()
     assert mock_db.commit.call_count >= 1
-    mock_db.flush.assert_called()
     assert result.user_id == "test_user"
     assert result.status is True
     assert result.message == "Flight saved successfully"
 
-@patch("src.services.db_service.get_db")
-def test_save_existing_flight(mock_get_db, mock_db, mock_flight_data):
+@patch("src.services.db_service.open_session")
+def test_save_existing_flight(mock_open_session, mock_db, mock_flight_data):
     """
     GIVEN existing flight WHEN save_flight is called
-    THEN increment counter and add to user saved flights
+    THEN skip segment upserts, add to user saved flights and increment counter
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
-    
-    # mock existing flight
-    mock_flight = MagicMock()
-    mock_flight.num_users_saved = 1
-    
-    # configure flight query to return existing flight
-    flight_query = MagicMock()
-    flight_query.filter_by.return_value.one_or_none.return_value = mock_flight
-    
-    # configure that user hasn't saved flight yet
-    saved_flight_query = MagicMock()
-    saved_flight_query.filter_by.return_value.one_or_none.return_value = None
-    
-    mock_db.query.side_effect = [
-        flight_query,
-        saved_flight_query
+    mock_open_session.return_value.__enter__.return_value = mock_db
+
+    mock_db.execute.side_effect = [
+        execute_result(None),     # flight info already exists
+        execute_result("FL123"),  # saved flight inserted
+        execute_result(None)      # num_users_saved incremented
     ]
-    
+
     result = save_flight(mock_flight_data)
-    
-    assert mock_flight.num_users_saved == 2  # incremented by 1
+
+    assert mock_db.execute.call_count == 3
+    increment_sql = str(mock_db.execute.call_args_list[-1].args[0])
+    assert "num_users_saved=(flight_info.num_users_saved +" in increment_sql
     assert mock_db.commit.call_count >= 1
     assert result.user_id == "test_user"
     assert result.status is True
     assert result.message == "Flight saved successfully"
 
-@patch("src.services.db_service.get_db")
-def test_save_flight_already_saved(mock_get_db, mock_db, mock_flight_data):
+@patch("src.services.db_service.open_session")
+def test_save_flight_already_saved(mock_open_session, mock_db, mock_flight_data):
     """
     GIVEN flight already saved by user
     WHEN save_flight is called
     THEN return message indicating it's already saved
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
-    
-    # mock existing flight
-    mock_flight = MagicMock()
-    
-    flight_query = MagicMock()
-    flight_query.filter_by.return_value.one_or_none.return_value = mock_flight
-    
-    # configure that user has already saved flight
-    mock_saved_flight = MagicMock()
-    saved_flight_query = MagicMock()
-    saved_flight_query.filter_by.return_value.one_or_none.return_value = mock_saved_flight
-    
-    mock_db.query.side_effect = [
-        flight_query,
-        saved_flight_query
+    mock_open_session.return_value.__enter__.return_value = mock_db
+
+    mock_db.execute.side_effect = [
+        execute_result(None),  # flight info already exists
+        execute_result(None)   # user already saved flight
     ]
-    
+
     result = save_flight(mock_flight_data)
-    
-    # flight already saved - should not modify database
+
+    # flight already saved - should not increment counter
+    assert mock_db.execute.call_count == 2
     mock_db.add.assert_not_called()
     mock_db.commit.assert_called_once()
     assert result.user_id == "test_user"
     assert result.status is False
     assert result.message == "User already saved flight"
 
-@patch("src.services.db_service.get_db")
-def test_unsave_flight_successful(mock_get_db, mock_db):
+@patch("src.services.db_service.open_session")
+def test_save_flight_counts_shared_segments_on_sqlite(mock_open_session, sqlite_session_factory, mock_flight_data):
+    """
+    GIVEN two flights sharing a segment, saved by two users
+    WHEN save_flight is called against a real (SQLite) database
+    THEN reference counts should reflect one row per flight and per user
+    """
+    mock_open_session.side_effect = sqlite_session_factory
+
+    other_flight = mock_flight_data.model_copy(deep=True)
+    other_flight.flight.flight_id = "FL999"
+    other_flight.flight_segments[0].flight_id = "FL999"
+
+    assert save_flight(mock_flight_data).status is True
+    assert save_flight(mock_flight_data.model_copy(update={"user_id": "other_user"})).status is True
+    assert save_flight(mock_flight_data).status is False
+    assert save_flight(other_flight).status is True
+
+    with sqlite_session_factory() as db:
+        assert db.get(FlightInfo, "FL123").num_users_saved == 2
+        assert db.get(FlightInfo, "FL999").num_users_saved == 1
+        assert db.get(SegmentInfo, "SEG1").num_flights_saved == 2
+        assert db.query(SavedFlight).count() == 3
+        assert db.query(FlightSegments).count() == 2
+
+@patch("src.services.db_service.open_session")
+def test_save_flight_upserts_segments_in_segment_id_order(mock_open_session, mock_db, mock_flight_data):
+    """
+    GIVEN a new flight whose segments are listed out of order, one of them twice
+    WHEN save_flight is called
+    THEN the segment upsert should hold one row per segment, sorted by segment_id,
+    so concurrent saves of flights sharing segments take their row locks in the same order
+    """
+    mock_open_session.return_value.__enter__.return_value = mock_db
+    mock_db.execute.side_effect = [
+        execute_result("FL123"), execute_result(None), execute_result(None), execute_result("FL123"), execute_result(None)
+    ]
+
+    first_segment = mock_flight_data.segments[0]
+    mock_flight_data.segments = [
+        first_segment.model_copy(update={"segment_id": "SEG3"}),
+        first_segment,
+        first_segment.model_copy(update={"segment_id": "SEG2"}),
+        first_segment.model_copy(update={"segment_id": "SEG3"})
+    ]
+
+    assert save_flight(mock_flight_data).status is True
+
+    segment_upsert = mock_db.execute.call_args_list[1].args[0]
+    params = segment_upsert.compile(dialect=postgresql.dialect()).params
+    assert [params[f"segment_id_m{i}"] for i in range(3)] == ["SEG1", "SEG2", "SEG3"]
+    assert params["num_flights_saved_m2"] == 2
+    assert "segment_id_m3" not in params
+
+@patch("src.services.db_service.open_session")
+def test_unsave_flight_successful(mock_open_session, mock_db):
     """
     GIVEN flight saved by user
     WHEN unsave_flight is called
     THEN remove flight from user saved flights
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
+    mock_open_session.return_value.__enter__.return_value = mock_db
     user_id = "test_user"
     flight_id = "FL123"
-    
-    # mock saved flight
-    mock_saved_flight = MagicMock()
-    saved_flight_query = MagicMock()
-    saved_flight_query.filter_by.return_value.one_or_none.return_value = mock_saved_flight
-    
-    # mock flight info
-    mock_flight_info = MagicMock()
-    mock_flight_info.num_users_saved = 1  # only user with flight saved
-    flight_info_query = MagicMock()
-    flight_info_query.filter_by.return_value.one_or_none.return_value = mock_flight_info
-    
-    # mock segments query and info
-    segment_ids_query = MagicMock()
-    segment_ids_query.filter.return_value.all.return_value = [("SEG1",)]
-    
-    flight_segments_query = MagicMock()
-    
-    mock_segment_info = MagicMock()
-    mock_segment_info.num_flights_saved = 1  # last flight using segment
-    segment_info_query = MagicMock()
-    segment_info_query.filter_by.return_value.one_or_none.return_value = mock_segment_info
-    
-    mock_db.query.side_effect = [
-        saved_flight_query,
-        flight_info_query,
-        segment_ids_query,
-        flight_segments_query,
-        segment_info_query
+
+    mock_db.execute.side_effect = [
+        execute_result("FL123"),        # saved flight deleted
+        execute_result(0),              # num_users_saved decremented to 0
+        execute_result(None, ["SEG1"]), # flight segments deleted
+        execute_result(None),           # flight info deleted
+        execute_result(None),           # segment flight counts decremented
+        execute_result(None, ["SEG1"])  # unused segments deleted
     ]
-    
+
     result = unsave_flight(user_id, flight_id)
-    
-    assert mock_db.delete.call_count == 3  # : SavedFlight, FlightInfo, and SegmentInfo
-    mock_db.flush.assert_called()
+
+    assert mock_db.execute.call_count == 6
     mock_db.commit.assert_called_once()
     assert result.user_id == user_id
     assert result.status is True
     assert result.message == "Flight successfully removed from saved"
 
-@patch("src.services.db_service.get_db")
-def test_unsave_flight_not_saved(mock_get_db, mock_db):
+@patch("src.services.db_service.open_session")
+def test_unsave_flight_still_saved_by_other_users(mock_open_session, mock_db):
+    """
+    GIVEN flight saved by user and another user
+    WHEN unsave_flight is called
+    THEN only decrement the counter, keeping flight data
+    """
+    mock_open_session.return_value.__enter__.return_value = mock_db
+
+    mock_db.execute.side_effect = [
+        execute_result("FL123"),  # saved flight deleted
+        execute_result(1)         # num_users_saved decremented to 1
+    ]
+
+    result = unsave_flight("test_user", "FL123")
+
+    assert mock_db.execute.call_count == 2
+    assert result.status is True
+
+@patch("src.services.db_service.open_session")
+def test_unsave_flight_not_saved(mock_open_session, mock_db):
     """
     GIVEN flight not saved by user
     WHEN unsave_flight is called
     THEN return message indicating it's not saved
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
+    mock_open_session.return_value.__enter__.return_value = mock_db
     user_id = "test_user"
     flight_id = "FL123"
-    
+
     # configure that user hasn't saved flight
-    saved_flight_query = MagicMock()
-    saved_flight_query.filter_by.return_value.one_or_none.return_value = None
-    mock_db.query.return_value = saved_flight_query
-    
+    mock_db.execute.return_value = execute_result(None)
+
     result = unsave_flight(user_id, flight_id)
-    
-    mock_db.delete.assert_not_called()
+
+    mock_db.execute.assert_called_once()
     mock_db.commit.assert_called_once()
     assert result.user_id == user_id
     assert result.status is False
     assert result.message == "User does not have this flight saved"
 
-# @patch("src.services.db_service.get_db")
-# def test_get_saved_flights(mock_get_db, mock_db):
-#     """
-#     GIVEN user with saved flights
-#     WHEN get_saved_flights is called
-#     THEN return saved flights information
-#     """
-#     mock_get_db.return_value.__next__.return_value = mock_db
-#     user_id = "test_user"
-    
-#     # mock saved flight
-#     mock_saved_flight = MagicMock()
-#     mock_saved_flight.flight_id = "FL123"
-#     saved_flights_query = MagicMock()
-#     saved_flights_query.filter.return_value.all.return_value = [mock_saved_flight]
-    
-#     # mock flight and segment info/query
-#     mock_flight_info = MagicMock()
-#     mock_flight_info.flight_id = "FL123"
-#     mock_flight_info.total_num_segments = 2
-#     mock_flight_info.price_per_person = "199.99"
-#     mock_flight_info.total_price = "399.98"
-#     flight_info_query = MagicMock()
-#     flight_info_query.filter.return_value.one_or_none.return_value = mock_flight_info
-    
-#     mock_out_segment = MagicMock()
-#     mock_out_segment.segment_id = "SEG1"
-#     mock_out_segment.airline_code = "AA"
-#     mock_out_segment.flight_code = "123"
-#     mock_out_segment.departure_date = "2025-04-10"
-#     mock_out_segment.departure_time = "10:00"
-#     mock_out_segment.arrival_date = "2025-04-10"
-#     mock_out_segment.arrival_time = "12:00"
-#     mock_out_segment.duration = "2h"
-#     mock_out_segment.departure_airport = "LAX"
-#     mock_out_segment.departure_city = "Los Angeles"
-#     mock_out_segment.destination_airport = "SFO"
-#     mock_out_segment.destination_city = "San Francisco"
-    
-#     # mock outbound query
-#     outbound_query = MagicMock()
-#     outbound_join = MagicMock()
-#     outbound_filter1 = MagicMock()
-#     outbound_filter2 = MagicMock()
-#     outbound_query.join.return_value = outbound_join
-#     outbound_join.filter.return_value = outbound_filter1
-#     outbound_filter1.filter.return_value = outbound_filter2
-#     outbound_filter2.order_by.return_value.all.return_value = [(mock_out_segment, 1)]
-    
-#     # mock inbound query
-#     inbound_query = MagicMock()
-#     inbound_join = MagicMock()
-#     inbound_filter1 = MagicMock()
-#     inbound_filter2 = MagicMock()
-#     inbound_join.filter.return_value = inbound_filter1
-#     inbound_filter1.filter.return_value = inbound_filter2
-#     inbound_filter2.order_by.return_value.all.return_value = []  # no inbound segments
-    
-#     mock_db.query.side_effect = [
-#         saved_flights_query,
-#         flight_info_query,
-#         outbound_query,
-#         inbound_query
-#     ]
-    
-#     response = get_saved_flights(user_id)
-    
-#     assert response.user_id == user_id
-#     assert len(response.flights) == 1
+def make_segment_info(segment_id, departure_airport, destination_airport):
+    return SegmentInfo(
+        segment_id=segment_id,
+        airline_code="AA",
+        flight_code="123",
+        departure_date="2025-04-10",
+        departure_time="10:00",
+        arrival_date="2025-04-10",
+        arrival_time="12:00",
+        duration="2h",
+        departure_airport=departure_airport,
+        departure_city=f"{departure_airport} city",
+        destination_airport=destination_airport,
+        destination_city=f"{destination_airport} city"
+    )
 
-#     flight_response_wrapper = response.flights[0]
-#     flight = flight_response_wrapper.FlightResponse
+@patch("src.services.db_service.open_session")
+def test_get_saved_flights(mock_open_session, mock_db):
+    """
+    GIVEN user with saved flights
+    WHEN get_saved_flights is called
+    THEN return saved flights information using two queries in total
+    """
+    mock_open_session.return_value.__enter__.return_value = mock_db
+    user_id = "test_user"
+
+    # mock flight info query
+    flight_one = FlightInfo(flight_id="FL123", total_num_segments=2, price_per_person="199.99", total_price="399.98")
+    flight_two = FlightInfo(flight_id="FL456", total_num_segments=1, price_per_person="99.99", total_price="99.99")
+    flights_query = MagicMock()
+    flights_query.join.return_value.filter.return_value.all.return_value = [flight_one, flight_two]
+
+    # mock segments query (already ordered by flight, bound, segment order)
+    segments_query = MagicMock()
+    segments_query.join.return_value.join.return_value.filter.return_value.order_by.return_value.all.return_value = [
+        ("FL123", "inbound", make_segment_info("SEG2", "SFO", "LAX")),
+        ("FL123", "outbound", make_segment_info("SEG1", "LAX", "SFO")),
+        ("FL456", "outbound", make_segment_info("SEG3", "JFK", "LHR")),
+    ]
+
+    mock_db.query.side_effect = [flights_query, segments_query]
+
+    response = get_saved_flights(user_id)
+
+    assert mock_db.query.call_count == 2
+    assert response.user_id == user_id
+    assert len(response.flights) == 2
+
+    flight = response.flights[0].FlightResponse
+    assert flight.flight_id == "FL123"
+    assert flight.number_of_segments == 2
+    assert flight.price_per_person == "199.99"
+    assert flight.total_price == "399.98"
+    assert [s.SegmentResponse.unique_id for s in flight.outbound] == ["SEG1"]
+    assert [s.SegmentResponse.unique_id for s in flight.inbound] == ["SEG2"]
+
+    inbound_segment = flight.inbound[0].SegmentResponse
+    assert inbound_segment.departure_city == "SFO city"
+    assert inbound_segment.destination_city == "LAX city"
 
-#     assert flight.flight_id == "FL123"
-#     assert flight.number_of_segments == 2
-#     assert flight.price_per_person == "199.99"
-#     assert flight.total_price == "399.98"
+    other_flight = response.flights[1].FlightResponse
+    assert other_flight.flight_id == "FL456"
+    assert len(other_flight.outbound) == 1
+    assert len(other_flight.inbound) == 0
 
-#     assert len(flight.outbound) == 1
-#     assert len(flight.inbound) == 0
+    mock_db.commit.assert_called_once()
 
-#     segment = flight.outbound[0].SegmentResponse
+@patch("src.services.db_service.open_session")
+def test_get_saved_flights_no_flights_skips_segment_query(mock_open_session, mock_db):
+    """
+    GIVEN user with no saved flights
+    WHEN get_saved_flights is called
+    THEN return an empty list without querying segments
+    """
+    mock_open_session.return_value.__enter__.return_value = mock_db
 
-#     assert segment.departure_time == "10:00"
-#     assert segment.departure_date == "2025-04-10"
-#     assert segment.arrival_date == "2025-04-10"
-#     assert segment.arrival_time == "12:00"
-#     assert segment.departure_airport == "LAX"
-#     assert segment.destination_airport == "SFO"
-#     assert segment.unique_id == "SEG1"
-#     assert segment.airline_code == "AA"
-#     assert segment.flight_number == "123"
+    flights_query = MagicMock()
+    flights_query.join.return_value.filter.return_value.all.return_value = []
+    mock_db.query.return_value = flights_query
 
-#     mock_db.commit.assert_called_once()
+    response = get_saved_flights("test_user")
+
+    assert response.flights == []
+    assert mock_db.query.call_count == 1
 
 
 ############### ITINERARY ###############
 
-@patch("src.services.db_service.get_db")
-def test_save_new_itinerary(mock_get_db, mock_db, mock_itinerary_data):
+@patch("src.services.db_service.open_session")
+def test_save_new_itinerary(mock_open_session, mock_db, mock_itinerary_data):
     """
     GIVEN new itinerary WHEN save_itinerary is called
     THEN add itinerary information and return success message
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
-    
-    # mock new itinerary
-    itinerary_query = MagicMock()
-    itinerary_query.filter_by.return_value.one_or_none.return_value = None
-    
-    # configure that user hasn't saved itinerary yet
-    saved_itinerary_query = MagicMock()
-    saved_itinerary_query.filter_by.return_value.one_or_none.return_value = None
-    
-    mock_db.query.side_effect = [
-        itinerary_query,
-        saved_itinerary_query
+    mock_open_session.return_value.__enter__.return_value = mock_db
+
+    mock_db.execute.side_effect = [
+        execute_result("ACT123"),  # itinerary info inserted
+        execute_result("ACT123"),  # saved itinerary inserted
+        execute_result(None)       # num_users_saved incremented
     ]
-    
+
     result = save_itinerary(**mock_itinerary_data)
-    
-    assert mock_db.add.call_count == 2  # : ItineraryInfo and SavedItinerary
+
+    assert mock_db.execute.call_count == 3
     mock_db.commit.assert_called_once()
     assert result.user_id == "test_user"
     assert result.status is True
     assert result.message == "Itinerary saved successfully"
 
-@patch("src.services.db_service.get_db")
-def test_save_existing_itinerary(mock_get_db, mock_db, mock_itinerary_data):
+@patch("src.services.db_service.open_session")
+def test_save_existing_itinerary(mock_open_session, mock_db, mock_itinerary_data):
     """
     GIVEN existing itinerary WHEN save_itinerary is called
     THEN increment counter and add to user saved itineraries
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
-    
-    # mock existing itinerary
-    mock_itinerary = MagicMock()
-    mock_itinerary.num_users_saved = 1
-    itinerary_query = MagicMock()
-    itinerary_query.filter_by.return_value.one_or_none.return_value = mock_itinerary
-    
-    # configure that user hasn't saved itinerary yet
-    saved_itinerary_query = MagicMock()
-    saved_itinerary_query.filter_by.return_value.one_or_none.return_value = None
-    
-    mock_db.query.side_effect = [
-        itinerary_query,
-        saved_itinerary_query
+    mock_open_session.return_value.__enter__.return_value = mock_db
+
+    mock_db.execute.side_effect = [
+        execute_result(None),      # itinerary info already exists
+        execute_result("ACT123"),  # saved itinerary inserted
+        execute_result(None)       # num_users_saved incremented
     ]
-    
+
     result = save_itinerary(**mock_itinerary_data)
-    
-    assert mock_itinerary.num_users_saved == 2  # incremented by 1
-    assert mock_db.add.call_count == 1  # only for SavedItinerary
+
+    assert mock_db.execute.call_count == 3
+    increment_sql = str(mock_db.execute.call_args_list[-1].args[0])
+    assert "num_users_saved=(itinerary_info.num_users_saved +" in increment_sql
     mock_db.commit.assert_called_once()
     assert result.user_id == "test_user"
     assert result.status is True
     assert result.message == "Itinerary saved successfully"
 
-@patch("src.services.db_service.get_db")
-def test_save_itinerary_already_saved(mock_get_db, mock_db, mock_itinerary_data):
+@patch("src.services.db_service.open_session")
+def test_save_itinerary_already_saved(mock_open_session, mock_db, mock_itinerary_data):
     """
     GIVEN itinerary already saved by user
     WHEN save_itinerary is called
     THEN return message indicating it's already saved
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
-    
-    # mock existing itinerary
-    mock_itinerary = MagicMock()
-    itinerary_query = MagicMock()
-    itinerary_query.filter_by.return_value.one_or_none.return_value = mock_itinerary
-    
-    # configure that user has already saved itinerary
-    mock_saved_itinerary = MagicMock()
-    saved_itinerary_query = MagicMock()
-    saved_itinerary_query.filter_by.return_value.one_or_none.return_value = mock_saved_itinerary
-    
-    mock_db.query.side_effect = [
-        itinerary_query,
-        saved_itinerary_query
+    mock_open_session.return_value.__enter__.return_value = mock_db
+
+    mock_db.execute.side_effect = [
+        execute_result(None),  # itinerary info already exists
+        execute_result(None)   # user already saved itinerary
     ]
-    
+
     result = save_itinerary(**mock_itinerary_data)
-    
-    # itinerary already saved - should not modify database
-    mock_db.add.assert_not_called()
+
+    # itinerary already saved - should not increment counter
+    assert mock_db.execute.call_count == 2
     mock_db.commit.assert_called_once()
     assert result.user_id == "test_user"
     assert result.status is False
     assert result.message == "User already saved itinerary"
 
-@patch("src.services.db_service.get_db")
-def test_unsave_itinerary_successful(mock_get_db, mock_db):
+@patch("src.services.db_service.open_session")
+def test_unsave_itinerary_successful(mock_open_session, mock_db):
     """
     GIVEN itinerary saved by user
     WHEN unsave_itinerary is called
     THEN remove itinerary from user saved itineraries
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
+    mock_open_session.return_value.__enter__.return_value = mock_db
     user_id = "test_user"
     activity_id = "ACT123"
-    
-    # mock saved itinerary
-    mock_saved_itinerary = MagicMock()
-    saved_itinerary_query = MagicMock()
-    saved_itinerary_query.filter_by.return_value.one_or_none.return_value = mock_saved_itinerary
-    
-    # mock itinerary info
-    mock_itinerary_info = MagicMock()
-    mock_itinerary_info.num_users_saved = 1  # only user with itinerary saved
-    itinerary_info_query = MagicMock()
-    itinerary_info_query.filter_by.return_value.one_or_none.return_value = mock_itinerary_info
-    
-    mock_db.query.side_effect = [
-        saved_itinerary_query,
-        itinerary_info_query
+
+    mock_db.execute.side_effect = [
+        execute_result("ACT123"),  # saved itinerary deleted
+        execute_result(0),         # num_users_saved decremented to 0
+        execute_result(None)       # itinerary info deleted
     ]
-    
+
     result = unsave_itinerary(user_id, activity_id)
-    
-    assert mock_db.delete.call_count == 2  # : SavedItinerary and ItineraryInfo
-    mock_db.flush.assert_called()
+
+    assert mock_db.execute.call_count == 3
     mock_db.commit.assert_called_once()
     assert result.user_id == user_id
     assert result.status is True
     assert result.message == "Itinerary removed from saved"
 
-@patch("src.services.db_service.get_db")
-def test_unsave_itinerary_not_saved(mock_get_db, mock_db):
+@patch("src.services.db_service.open_session")
+def test_unsave_itinerary_not_saved(mock_open_session, mock_db):
     """
     GIVEN itinerary not saved by user
     WHEN unsave_itinerary is called
     THEN return message indicating it's not saved
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
+    mock_open_session.return_value.__enter__.return_value = mock_db
     user_id = "test_user"
     activity_id = "ACT123"
-    
+
     # configure that user hasn't saved itinerary
-    saved_itinerary_query = MagicMock()
-    saved_itinerary_query.filter_by.return_value.one_or_none.return_value = None
-    mock_db.query.return_value = saved_itinerary_query
-    
+    mock_db.execute.return_value = execute_result(None)
+
     result = unsave_itinerary(user_id, activity_id)
-    
-    mock_db.delete.assert_not_called()
+
+    mock_db.execute.assert_called_once()
     mock_db.commit.assert_called_once()
     assert result.user_id == user_id
     assert result.status is False
     assert result.message == "User does not have this itinerary saved"
 
-@patch("src.services.db_service.get_db")
-def test_get_saved_itineraries(mock_get_db, mock_db):
+@patch("src.services.db_service.open_session")
+def test_get_saved_itineraries(mock_open_session, mock_db):
     """
     GIVEN user with saved itineraries
     WHEN get_saved_itineraries is called
     THEN return saved itineraries information
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
+    mock_open_session.return_value.__enter__.return_value = mock_db
     user_id = "test_user"
     
     # mock itinerary
@@ -532,14 +523,14 @@ def test_get_saved_itineraries(mock_get_db, mock_db):
     assert itinerary.price_currency == "EUR"
     mock_db.commit.assert_called_once()
 
-@patch("src.services.db_service.get_db")
-def test_db_operation_decorator_handles_exceptions(mock_get_db, mock_db):
+@patch("src.services.db_service.open_session")
+def test_db_operation_decorator_handles_exceptions(mock_open_session, mock_db):
     """
     GIVEN database operation that raises an exception
     WHEN decorated with db_operation
     THEN handle exception properly
     """
-    mock_get_db.return_value.__next__.return_value = mock_db
+    mock_open_session.return_value.__enter__.return_value = mock_db
     mock_db.query.side_effect = SQLAlchemyError("Database error")
     
     with pytest.raises(SQLAlchemyError):
@@ -547,5 +538,81 @@ def test_db_operation_decorator_handles_exceptions(mock_get_db, mock_db):
     
     # verify proper cleanup
     mock_db.rollback.assert_called_once()
-    mock_db.close.assert_called_once()
-    mock_db.commit.assert_not_called()
\ No newline at end of file
+    mock_open_session.return_value.__exit__.assert_called_once()
+    mock_db.commit.assert_not_called()
+
+@patch("src.services.db_service.open_async_session")
+def test_db_operation_run_async_uses_async_session(mock_open_async_session, mock_db):
+    """
+    GIVEN the async database path
+    WHEN an operation is awaited through run_async
+    THEN it should run on the AsyncSession's sync proxy and commit there
+    """
+    async_db = MagicMock()
+    async_db.run_sync = AsyncMock(side_effect=lambda fn: fn(mock_db))
+    mock_open_async_session.return_value.__aenter__.return_value = async_db
+    mock_db.execute.return_value = execute_result(None)
+
+    result = asyncio.run(unsave_itinerary.run_async("test_user", "ACT123"))
+
+    async_db.run_sync.assert_awaited_once()
+    mock_db.commit.assert_called_once()
+    assert result.status is False
+    assert result.message == "User does not have this itinerary saved"
+
+
+@pytest.fixture
+def threaded_session_factory(tmp_path):
+    # file-backed so every thread gets its own connection; SQLite serialises the writers
+    engine = create_engine(f"sqlite:///{tmp_path / 'stress.db'}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    engine.dispose()
+
+@patch("src.services.db_service.open_session")
+def test_concurrent_save_and_unsave_keep_counts_consistent(mock_open_session, threaded_session_factory, mock_flight_data, mock_itinerary_data):
+    """
+    GIVEN many users saving and unsaving the same flight and itinerary at the same time
+    WHEN the requests run concurrently from many threads
+    THEN no increments or decrements should be lost and unused rows should be cleaned up
+    """
+    mock_open_session.side_effect = threaded_session_factory
+    users = [f"user_{i}" for i in range(24)]
+
+    def save(user_id):
+        assert save_flight(mock_flight_data.model_copy(update={"user_id": user_id})).status is True
+        assert save_itinerary(**{**mock_itinerary_data, "user_id": user_id}).status is True
+
+    def unsave(user_id):
+        assert unsave_flight(user_id, "FL123").status is True
+        assert unsave_itinerary(user_id, "ACT123").status is True
+
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        list(executor.map(save, users))
+
+    with threaded_session_factory() as db:
+        assert db.get(FlightInfo, "FL123").num_users_saved == len(users)
+        assert db.get(SegmentInfo, "SEG1").num_flights_saved == 1
+        assert db.get(ItineraryInfo, "ACT123").num_users_saved == len(users)
+
+    # half the users unsave while the other half saves again (already saved, so a no-op)
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        unsaved = executor.map(unsave, users[:12])
+        resaved = executor.map(lambda user_id: save_flight(mock_flight_data.model_copy(update={"user_id": user_id})), users[12:])
+        list(unsaved)
+        assert all(result.status is False for result in resaved)
+
+    with threaded_session_factory() as db:
+        assert db.get(FlightInfo, "FL123").num_users_saved == 12
+        assert db.get(ItineraryInfo, "ACT123").num_users_saved == 12
+        assert db.query(SavedFlight).count() == 12
+
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        list(executor.map(unsave, users[12:]))
+
+    with threaded_session_factory() as db:
+        assert db.get(FlightInfo, "FL123") is None
+        assert db.get(SegmentInfo, "SEG1") is None
+        assert db.get(ItineraryInfo, "ACT123") is None
+        assert db.query(FlightSegments).count() == 0
+        assert db.query(SavedItinerary).count() == 0
@@ -1,10 +1,41 @@
+from contextlib import asynccontextmanager
+import httpx
 from fastapi import FastAPI, HTTPException
 from src.utils.custom_logging import configure_logging
-from src.services.flight_service import get_flights
+from src.utils import api_client
+from src.utils.api_client import open_client, close_client
+from src.utils.api_token_refresh import start_token_refresher, stop_token_refresher
+from src.utils.circuit_breaker import CircuitOpenError
+from src.services.flight_service import get_flights, get_flexible_flights
 from src.models.flight_model import FlightRequest, FlightResponse
 import logging
+import math
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # share one pooled Amadeus client across all requests handled by this worker
+    open_client()
+    start_token_refresher()
+    yield
+    stop_token_refresher()
+    await close_client()
+
+
+app = FastAPI(lifespan=lifespan)
+
+@app.get("/metrics")
+async def metrics():
+    """Expose cache, request coalescing, Amadeus rate limiting, circuit breaker and hedging counters for monitoring"""
+    return {
+        "flight_cache": api_client.flight_cache.stats(),
+        "flight_fallback_cache": api_client.flight_fallback_cache.stats(),
+        "flight_coalescer": api_client.flight_coalescer.stats(),
+        "amadeus_limiter": api_client.amadeus_limiter.stats(),
+        "amadeus_breaker": api_client.amadeus_breaker.stats(),
+        "amadeus_hedging": api_client.amadeus_hedging.stats()
+    }
 
-app = FastAPI()
 
 @app.post("/flight", response_model=FlightResponse)
 async def fetch_flight(request: FlightRequest):
@@ -18,20 +49,32 @@ async def fetch_flight(request: FlightRequest):
     dep_date = request.flights.departure_date
     ret_date = request.flights.return_date
     num_passengers = request.flights.num_passenger
+    flexible_days = request.flights.flexible_days
     
     # Log high-level request details at INFO
     logger.info(
         f"Received flight request from user_id={request.user_id} | "
         f"Origin={origin_loc}, Destination={dest_loc}, "
-        f"Departure={dep_date}, Return={ret_date}, Passengers={num_passengers}"
+        f"Departure={dep_date}, Return={ret_date}, Passengers={num_passengers}, "
+        f"Flexible days={flexible_days}, Filters={request.flights.filters.model_dump(exclude_defaults=True)}"
     )
 
     # Log full request payload at DEBUG level for deeper troubleshooting (optional)
     logger.debug(f"Complete request payload: {request.dict()}")
 
     try:
-        logger.info("Calling flight_service.get_flights() to fetch flight data...")
-        flight_data = get_flights(origin_loc, dest_loc, num_passengers, dep_date, ret_date, request.user_id)
+        if flexible_days:
+            # fan out over the date window and answer with a price calendar
+            logger.info("Calling flight_service.get_flexible_flights() to fetch flight data...")
+            flight_data = await get_flexible_flights(
+                origin_loc, dest_loc, num_passengers, dep_date, ret_date, request.user_id,
+                flexible_days, request.flights.filters
+            )
+        else:
+            logger.info("Calling flight_service.get_flights() to fetch flight data...")
+            flight_data = await get_flights(
+                origin_loc, dest_loc, num_passengers, dep_date, ret_date, request.user_id, request.flights.filters
+            )
         logger.info("Successfully retrieved flight data.")
 
         # Log how many flight options we got at INFO
@@ -51,6 +94,20 @@ async def fetch_flight(request: FlightRequest):
         logger.debug(f"FlightResponse data: {flight_data}")
 
         return flight_data
+
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 429:
+            logger.error("Error fetching flight data.", exc_info=True)
+            raise HTTPException(status_code=400, detail=str(e))
+        # still throttled after the limiter's retries: tell the client to come back later
+        logger.warning("Amadeus is still rate limiting flight searches after retries.")
+        headers = {"Retry-After": e.response.headers["Retry-After"]} if "Retry-After" in e.response.headers else None
+        raise HTTPException(status_code=429, detail="Flight search is rate limited, please retry later.", headers=headers)
+
+    except CircuitOpenError as e:
+        # Amadeus keeps failing and there is no earlier result for this search to fall back on
+        logger.warning(str(e))
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
     
     except Exception as e:
         # Include exception details at ERROR; exc_info=True can give a traceback
@@ -0,0 +1,49 @@
+"""
+Micro-benchmark for airport -> city lookups.
+
+Compares the previous implementation (re-reading and scanning airport_to_city.json
+on every call) against the in-memory index built at startup in flight_service.
+
+Run from the flight-app directory:
+    python benchmarks/bench_airport_lookup.py
+"""
+import json
+import os
+import sys
+import timeit
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+FLIGHT_APP_DIR = os.path.join(CURRENT_DIR, '..')
+sys.path.insert(0, FLIGHT_APP_DIR)
+
+from src.services.flight_service import AIRPORT_FILE, get_city_from_airport
+
+# a typical search touches a handful of hub airports plus the odd unknown code
+AIRPORTS = ["SYD", "SIN", "LHR", "JFK", "CDG", "DXB", "HND", "XXX"]
+
+
+def legacy_get_city_from_airport(airport: str):
+    with open(AIRPORT_FILE, "r") as file:
+        data = json.load(file)
+
+    for entry in data:
+        if airport in entry["airports"]:
+            return entry["city"]
+
+    return "Unknown"
+
+
+def bench(label: str, func, number: int):
+    total = timeit.timeit(lambda: [func(code) for code in AIRPORTS], number=number)
+    per_lookup = total / (number * len(AIRPORTS))
+    print(f"{label:<10} {per_lookup * 1e6:>12.3f} us/lookup  ({number * len(AIRPORTS)} lookups)")
+    return per_lookup
+
+
+if __name__ == "__main__":
+    for code in AIRPORTS:
+        assert legacy_get_city_from_airport(code) == get_city_from_airport(code), code
+
+    legacy = bench("legacy", legacy_get_city_from_airport, number=5)
+    indexed = bench("indexed", get_city_from_airport, number=100_000)
+    print(f"speedup: {legacy / indexed:,.0f}x")
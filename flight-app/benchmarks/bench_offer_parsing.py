@@ -0,0 +1,218 @@
+"""
+Micro-benchmark for turning an Amadeus flight-offers payload into a FlightResponse.
+
+Compares the previous implementation (nested lookups per field, one pydantic model per
+segment and per offer, debug messages formatted even with DEBUG off) against the
+single-pass parser in offer_parser, on payloads of 5, 50 and 250 offers shaped like a
+recorded /v2/shopping/flight-offers response.
+
+Run from the flight-app directory:
+    python benchmarks/bench_offer_parsing.py
+"""
+import copy
+import logging
+import os
+import sys
+import timeit
+import uuid
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+FLIGHT_APP_DIR = os.path.join(CURRENT_DIR, '..')
+sys.path.insert(0, FLIGHT_APP_DIR)
+
+from src.models.flight_model import (
+    FlightResponse, SegmentResponse, FlightResponseObj,
+    FlightResponseObjWrapper, SegmentResponseWrapper
+)
+from src.services.flight_service import airport_to_city, get_city_from_airport
+from src.services.offer_parser import parse_offers, to_flight_response
+
+logger = logging.getLogger("flight_microservice")
+logger.setLevel(logging.INFO)
+
+DEPARTURE_DATE = "2025-03-10"
+NUM_PASSENGERS = 2
+
+
+def recorded_segment(origin: str, destination: str, departure: str, arrival: str, carrier: str, number: str, segment_id: str):
+    return {
+        "departure": {"iataCode": origin, "terminal": "1", "at": departure},
+        "arrival": {"iataCode": destination, "terminal": "2", "at": arrival},
+        "carrierCode": carrier,
+        "number": number,
+        "aircraft": {"code": "789"},
+        "operating": {"carrierCode": carrier},
+        "duration": "PT8H5M",
+        "id": segment_id,
+        "numberOfStops": 0,
+        "blacklistedInEU": False
+    }
+
+
+RECORDED_OFFER = {
+    "type": "flight-offer",
+    "id": "1",
+    "source": "GDS",
+    "instantTicketingRequired": False,
+    "nonHomogeneous": False,
+    "oneWay": False,
+    "lastTicketingDate": "2025-02-20",
+    "numberOfBookableSeats": 9,
+    "itineraries": [
+        {
+            "duration": "PT16H35M",
+            "segments": [
+                recorded_segment("SYD", "SIN", "2025-03-10T08:00:00", "2025-03-10T14:05:00", "QF", "81", "1"),
+                recorded_segment("SIN", "LHR", "2025-03-10T18:30:00", "2025-03-11T01:35:00", "QF", "1", "2")
+            ]
+        },
+        {
+            "duration": "PT21H50M",
+            "segments": [
+                recorded_segment("LHR", "SIN", "2025-03-17T11:45:00", "2025-03-18T07:50:00", "QF", "2", "3"),
+                recorded_segment("SIN", "SYD", "2025-03-18T10:10:00", "2025-03-18T20:35:00", "QF", "82", "4")
+            ]
+        }
+    ],
+    "price": {
+        "currency": "AUD",
+        "total": "2860.46",
+        "base": "1410.00",
+        "fees": [{"amount": "0.00", "type": "SUPPLIER"}, {"amount": "0.00", "type": "TICKETING"}],
+        "grandTotal": "2860.46"
+    },
+    "pricingOptions": {"fareType": ["PUBLISHED"], "includedCheckedBagsOnly": True},
+    "validatingAirlineCodes": ["QF"],
+    "travelerPricings": [
+        {
+            "travelerId": str(traveler),
+            "fareOption": "STANDARD",
+            "travelerType": "ADULT",
+            "price": {"currency": "AUD", "total": "1430.23", "base": "705.00"},
+            "fareDetailsBySegment": [
+                {
+                    "segmentId": str(segment),
+                    "cabin": "ECONOMY",
+                    "fareBasis": "NLSAU",
+                    "class": "N",
+                    "includedCheckedBags": {"quantity": 1}
+                }
+                for segment in range(1, 5)
+            ]
+        }
+        for traveler in range(1, NUM_PASSENGERS + 1)
+    ]
+}
+
+
+def recorded_payload(offers: int) -> dict:
+    data = []
+    for index in range(offers):
+        offer = copy.deepcopy(RECORDED_OFFER)
+        offer["id"] = str(index + 1)
+        offer["price"]["base"] = f"{1410 + index * 7.5:.2f}"
+        data.append(offer)
+    return {"meta": {"count": offers}, "data": data}
+
+
+def legacy_build_response(data: dict, num_passenger: str, departure_date: str, user_id: str) -> FlightResponse:
+    logger.debug(f"Raw flight data response: {data}")
+    flights = []
+    for idx, flight in enumerate(data["data"]):
+        logger.debug(f"Processing flight index {idx}: {flight}")
+
+        if any(len(itin["segments"]) > 3 for itin in flight.get("itineraries", [])):
+            continue
+
+        try:
+            price_per_person = str(flight["price"]["base"])
+        except KeyError:
+            continue
+
+        outbound_segments = []
+        inbound_segments = []
+
+        for i, itinerary in enumerate(flight.get("itineraries", [])):
+            logger.debug(
+                f"  Processing itinerary {i} for flight index {idx}, containing "
+                f"{len(itinerary.get('segments', []))} segment(s)."
+            )
+            for segment in itinerary.get("segments", []):
+                try:
+                    dep_date, dep_time = segment["departure"]["at"].split('T')
+                    dep_time = dep_time[:5]
+                    arr_date, arr_time = segment["arrival"]["at"].split('T')
+                    arr_time = arr_time[:5]
+                    airline_code = segment["carrierCode"]
+                    flight_code = segment["number"]
+                    dep_airport = segment["departure"]["iataCode"]
+                    arr_airport = segment["arrival"]["iataCode"]
+                    dep_city = get_city_from_airport(dep_airport)
+                    arr_city = get_city_from_airport(arr_airport)
+                except (KeyError, ValueError):
+                    continue
+
+                segment_info = {
+                    "num_passengers": int(num_passenger),
+                    "departure_time": dep_time,
+                    "departure_date": dep_date,
+                    "arrival_date": arr_date,
+                    "arrival_time": arr_time,
+                    "duration": segment["duration"][2:],
+                    "departure_airport": dep_airport,
+                    "departure_city": dep_city,
+                    "destination_airport": arr_airport,
+                    "destination_city": arr_city,
+                    "airline_code": airline_code,
+                    "flight_number": flight_code,
+                    "unique_id": airline_code + flight_code + departure_date + dep_time
+                }
+
+                wrapped_segment = SegmentResponseWrapper(SegmentResponse=SegmentResponse(**segment_info))
+                if i == 0:
+                    outbound_segments.append(wrapped_segment)
+                else:
+                    inbound_segments.append(wrapped_segment)
+
+        flight_info = {
+            "number_of_segments": len(outbound_segments) + len(inbound_segments),
+            "flight_id": str(uuid.uuid4()),
+            "outbound": outbound_segments,
+            "inbound": inbound_segments,
+            "price_per_person": price_per_person,
+            "total_price": f"{(float(price_per_person) * int(num_passenger)):.2f}"
+        }
+        flights.append(FlightResponseObjWrapper(FlightResponse=FlightResponseObj(**flight_info)))
+
+    return FlightResponse(user_id=user_id, results=flights)
+
+
+def single_pass_build_response(data: dict, num_passenger: str, departure_date: str, user_id: str) -> FlightResponse:
+    offers = parse_offers(data["data"], departure_date, airport_to_city)
+    return to_flight_response(user_id, offers, int(num_passenger))
+
+
+def without_flight_ids(response: FlightResponse) -> dict:
+    dumped = response.model_dump()
+    for result in dumped["results"]:
+        result["FlightResponse"].pop("flight_id")
+    return dumped
+
+
+def bench(label: str, func, payload: dict, number: int):
+    total = timeit.timeit(lambda: func(payload, str(NUM_PASSENGERS), DEPARTURE_DATE, "bench-user"), number=number)
+    per_call = total / number
+    print(f"{label:<12} {per_call * 1e6:>12.1f} us/response  ({number} responses)")
+    return per_call
+
+
+if __name__ == "__main__":
+    for offers, number in ((5, 2_000), (50, 200), (250, 40)):
+        payload = recorded_payload(offers)
+        assert without_flight_ids(legacy_build_response(payload, str(NUM_PASSENGERS), DEPARTURE_DATE, "u")) == \
+            without_flight_ids(single_pass_build_response(payload, str(NUM_PASSENGERS), DEPARTURE_DATE, "u"))
+
+        print(f"{offers} offers")
+        legacy = bench("legacy", legacy_build_response, payload, number)
+        single_pass = bench("single-pass", single_pass_build_response, payload, number)
+        print(f"speedup: {legacy / single_pass:.1f}x\n")
@@ -1,5 +1,32 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Literal, Optional
+
+
+# optional search filters; the ones Amadeus supports are sent with the search, the rest are applied while parsing
+class FlightFilters(BaseModel):
+    max_results: int = Field(5, ge=1, le=250)  # Amadeus returns at most 250 offers
+    non_stop: bool = False
+    max_stops: Optional[int] = Field(None, ge=0, le=2)  # per itinerary
+    included_airlines: List[str] = []
+    excluded_airlines: List[str] = []
+    max_price: Optional[int] = Field(None, gt=0)  # per person, in the search currency
+    sort: Optional[Literal["price", "duration"]] = None  # None keeps the Amadeus order (cheapest first)
+
+    @field_validator("included_airlines", "excluded_airlines")
+    @classmethod
+    def normalize_airline_codes(cls, codes: List[str]) -> List[str]:
+        codes = sorted({code.strip().upper() for code in codes})
+        for code in codes:
+            if len(code) != 2 or not code.isalnum():
+                raise ValueError(f"'{code}' is not an IATA airline code")
+        return codes
+
+    @model_validator(mode="after")
+    def check_airline_lists(self):
+        if self.included_airlines and self.excluded_airlines:
+            raise ValueError("included_airlines and excluded_airlines cannot be used together")
+        return self
+
 
 # request model for endpoint
 class FlightRequestObj(BaseModel):
@@ -8,6 +35,8 @@ class FlightRequestObj(BaseModel):
     num_passenger: str
     departure_date: str
     return_date: str
+    flexible_days: int = Field(0, ge=0, le=3)  # also search this many days before and after both dates
+    filters: FlightFilters = Field(default_factory=FlightFilters)
 
 
 class FlightRequest(BaseModel):
@@ -48,7 +77,16 @@ class FlightResponseObjWrapper(BaseModel):
     FlightResponse: FlightResponseObj
 
 
+# cheapest price per person for each departure/return date pair of a flexible-date search
+class PriceCalendar(BaseModel):
+    departure_dates: List[str]
+    return_dates: List[str]
+    prices: List[List[Optional[str]]]  # [departure][return], None if no offer was found or the search did not finish
+    complete: bool  # False if some searches failed or were cut off by the deadline
+
+
 class FlightResponse(BaseModel):
     user_id: str
     results: List[FlightResponseObjWrapper] = []
+    price_calendar: Optional[PriceCalendar] = None
 
@@ -1,25 +1,37 @@
 from ..utils.api_client import get_flight_data
-from ..models.flight_model import (
-    FlightResponse, SegmentResponse, FlightResponseObj,
-    FlightResponseObjWrapper, SegmentResponseWrapper
-)
+from ..models.flight_model import FlightFilters, FlightResponse, PriceCalendar
+from .offer_parser import MAX_SEGMENTS_PER_ITINERARY, parse_offers, to_flight_response
+import asyncio
 import logging
-import uuid
 import json
 import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, Optional
 
 logger = logging.getLogger("flight_microservice")
 
-def get_flights(
+AMADEUS_MAX_RESULTS = 250  # most offers Amadeus returns for one search
+# offers requested per wanted result when max_stops or the duration sort is applied locally
+LOCAL_FILTER_OVERFETCH = int(os.getenv("LOCAL_FILTER_OVERFETCH", "4"))
+
+# seconds a flexible-date search waits for its searches; the calendar is returned with whatever finished
+FLEXIBLE_SEARCH_DEADLINE = float(os.getenv("FLEXIBLE_SEARCH_DEADLINE", "10"))
+# date pairs of one flexible-date search sent to Amadeus at a time (flexible_days=3 means up to 49 pairs)
+FLEXIBLE_SEARCH_CONCURRENCY = int(os.getenv("FLEXIBLE_SEARCH_CONCURRENCY", "4"))
+
+async def get_flights(
     origin_loc_code: str,
     destination_loc_code: str,
     num_passenger: str,
     departure_date: str,
     return_date: str,
-    user_id: str
+    user_id: str,
+    filters: Optional[FlightFilters] = None
 ) -> FlightResponse:
     """
     Retrieve flight data from external API and build a structured flight response.
+    Filters Amadeus supports are part of the search itself; max_stops and sort are applied while parsing.
 
     :param origin_loc_code: Origin Airport IATA Code
     :param destination_loc_code: Destination Airport IATA Code
@@ -27,6 +39,7 @@ def get_flights(
     :param departure_date: Departure date
     :param return_date: Return date
     :param user_id: ID of the user requesting the flight
+    :param filters: Optional result count, stop, airline, price and sort filters
     :return: A FlightResponse object containing structured flight information
     """
 
@@ -35,8 +48,54 @@ def get_flights(
         f"departure_date={departure_date}, return_date={return_date}, passengers={num_passenger}"
     )
 
+    filters = filters or FlightFilters()
+    search_params = amadeus_search_params(filters)
+    route = (origin_loc_code, destination_loc_code, num_passenger, departure_date, return_date)
+
+    data = await _request_offers(*route, search_params)
+    offers = _parse_filtered_offers(data, departure_date, filters)
+
+    # the local filter left too few offers, and Amadeus listed as many as asked for (so it has more):
+    # ask once for its whole result set
+    if (
+        len(offers) < filters.max_results
+        and len(data) >= search_params["max"]
+        and search_params["max"] < AMADEUS_MAX_RESULTS
+        and _filtered_locally(filters)
+    ):
+        logger.info(
+            f"{len(offers)} offer(s) left of {len(data)} after local filtering, "
+            f"requesting up to {AMADEUS_MAX_RESULTS} offers"
+        )
+        data = await _request_offers(*route, {**search_params, "max": AMADEUS_MAX_RESULTS})
+        offers = _parse_filtered_offers(data, departure_date, filters)
+
+    flights_response = to_flight_response(user_id, offers, int(num_passenger))
+
+    logger.info(
+        f"Constructed FlightResponse with {len(flights_response.results)} flight(s) for user_id={user_id}. "
+        f"Departure date: {departure_date}, Return date: {return_date}"
+    )
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Final FlightResponse object: {flights_response}")
+
+    return flights_response
+
+
+async def _request_offers(
+    origin_loc_code: str,
+    destination_loc_code: str,
+    num_passenger: str,
+    departure_date: str,
+    return_date: str,
+    search_params: dict
+) -> list:
+    """Raw Amadeus offers for one search"""
     try:
-        data = get_flight_data(origin_loc_code, destination_loc_code, num_passenger, departure_date, return_date)
+        data = await get_flight_data(
+            origin_loc_code, destination_loc_code, num_passenger, departure_date, return_date, search_params
+        )
     except Exception as e:
         # Log at ERROR level if the external API call fails or raises an exception
         logger.error(
@@ -47,135 +106,209 @@ def get_flights(
         # Depending on your error-handling strategy, re-raise or return some fallback
         raise
 
-    # Debug the raw response for troubleshooting
-    logger.debug(f"Raw flight data response: {data}")
+    # Debug the raw response for troubleshooting (only formatted when DEBUG is on)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Raw flight data response: {data}")
 
     # Guard against missing "data" key to avoid KeyError
     if "data" not in data:
         logger.error("Flight data response is missing the 'data' key. Cannot continue.")
         raise ValueError("Flight data response does not contain 'data'.")
 
-    flights = []
     logger.info(f"Number of flights returned by the API: {len(data['data'])}")
+    return data["data"]
 
-    for idx, flight in enumerate(data["data"]):
-        # Debug-level log for each flight to aid in step-by-step tracing
-        logger.debug(f"Processing flight index {idx}: {flight}")
 
-        # Check if flight has an itinerary with more than 3 segments
-        if any(len(itin["segments"]) > 3 for itin in flight.get("itineraries", [])):
-            logger.warning(
-                f"Skipping flight index {idx} because it has an itinerary with more than 3 segments."
-            )
-            continue
+def _parse_filtered_offers(offers: list, departure_date: str, filters: FlightFilters) -> list:
+    return parse_offers(
+        offers, departure_date, airport_to_city,
+        max_segments=_max_segments(filters),
+        sort=filters.sort,
+        limit=filters.max_results
+    )
+
+
+def _filtered_locally(filters: FlightFilters) -> bool:
+    """Whether parse_offers drops or reorders offers, so Amadeus' first max_results may not be the answer"""
+    return filters.sort == "duration" or (not filters.non_stop and filters.max_stops in (1, 2))
+
+
+async def get_flexible_flights(
+    origin_loc_code: str,
+    destination_loc_code: str,
+    num_passenger: str,
+    departure_date: str,
+    return_date: str,
+    user_id: str,
+    flexible_days: int,
+    filters: Optional[FlightFilters] = None,
+    deadline: Optional[float] = None
+) -> FlightResponse:
+    """
+    Search every departure/return date pair within flexible_days of the requested dates,
+    FLEXIBLE_SEARCH_CONCURRENCY at a time, and build a price calendar plus the cheapest offers across all of them.
+    Searches go through get_flight_data, so they share its cache, rate limit and connection pool.
+    Each pair asks Amadeus for max_results offers only: stop limits and the duration sort are applied to those,
+    without the over-fetch of a single search. Searches not finished by the deadline are cancelled
+    and left out of the calendar.
 
-        # Retrieve base price; wrap in try-except in case `price` key is missing
-        try:
-            price_per_person = str(flight["price"]["base"])
-        except KeyError:
-            logger.error(
-                f"Skipping flight index {idx}: Missing 'price' or 'base' key in flight data. Flight: {flight}"
-            )
+    :param flexible_days: Days searched before and after both the departure and the return date
+    :param deadline: Seconds to wait for the searches, FLEXIBLE_SEARCH_DEADLINE by default
+    :return: A FlightResponse with the cheapest offers and the price_calendar
+    :raises ValueError: If no date pair in the window can be searched
+    """
+    filters = filters or FlightFilters()
+    deadline = FLEXIBLE_SEARCH_DEADLINE if deadline is None else deadline
+
+    departure_dates = _date_window(departure_date, flexible_days)
+    return_dates = _date_window(return_date, flexible_days)
+    date_pairs = _searchable_date_pairs(departure_dates, return_dates, date.today().isoformat())
+    if not date_pairs:
+        raise ValueError("No departure/return date pair in the flexible window can be searched.")
+
+    logger.info(
+        f"Flexible-date search: origin={origin_loc_code}, destination={destination_loc_code}, "
+        f"{len(date_pairs)} date pair(s) within {flexible_days} day(s), deadline={deadline}s"
+    )
+
+    # with up to 49 pairs, over-fetching for local filters would multiply the download; each pair's
+    # max_results offers are enough to fill the merged results
+    params = {**amadeus_search_params(filters), "max": filters.max_results}
+    slots = asyncio.Semaphore(FLEXIBLE_SEARCH_CONCURRENCY)
+
+    async def search_pair(departure: str, ret: str) -> dict:
+        async with slots:
+            return await get_flight_data(origin_loc_code, destination_loc_code, num_passenger, departure, ret, params)
+
+    searches = {
+        asyncio.ensure_future(search_pair(departure, ret)): (departure, ret)
+        for departure, ret in date_pairs
+    }
+    try:
+        done, pending = await asyncio.wait(searches, timeout=deadline)
+    finally:
+        # past the deadline (or if this request is cancelled) nobody needs the other searches
+        for search in searches:
+            search.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning(f"Flexible-date search deadline expired, cancelled {len(pending)} search(es).")
+
+    cheapest = {}
+    offers = []
+    errors = []
+    for search in done:
+        departure, ret = searches[search]
+        if search.exception() is not None:
+            logger.warning(f"Flexible-date search for {departure}/{ret} failed: {search.exception()}")
+            errors.append(search.exception())
             continue
+        records = parse_offers(
+            search.result().get("data", []), departure, airport_to_city,
+            max_segments=_max_segments(filters),
+            sort=filters.sort or "price",
+            limit=filters.max_results
+        )
+        if records:
+            cheapest[(departure, ret)] = min(records, key=lambda record: float(record.price_per_person)).price_per_person
+        offers.extend(records)
+
+    if errors and len(errors) == len(searches):
+        raise errors[0]  # nothing to show, fail like a single search would
+
+    if filters.sort == "duration":
+        offers.sort(key=lambda record: record.duration_minutes)
+    else:
+        offers.sort(key=lambda record: float(record.price_per_person))
 
-        outbound_segments = []
-        inbound_segments = []
-
-        # Iterate itineraries
-        for i, itinerary in enumerate(flight.get("itineraries", [])):
-            logger.debug(
-                f"  Processing itinerary {i} for flight index {idx}, containing "
-                f"{len(itinerary.get('segments', []))} segment(s)."
-            )
-            # Build segment info
-            for segment in itinerary.get("segments", []):
-                try:
-                    dep_date, dep_time = segment["departure"]["at"].split('T')
-                    dep_time = dep_time[:5]
-                    arr_date, arr_time = segment["arrival"]["at"].split('T')
-                    arr_time = arr_time[:5]
-                    airline_code = segment["carrierCode"]
-                    flight_code = segment["number"]
-                    dep_airport = segment["departure"]["iataCode"]
-                    arr_airport = segment["arrival"]["iataCode"]
-                    dep_city = get_city_from_airport(dep_airport)
-                    arr_city = get_city_from_airport(arr_airport)
-                except (KeyError, ValueError) as e:
-                    logger.error(
-                        f"    Skipping segment due to missing or invalid data: {segment}. Error: {e}",
-                        exc_info=True
-                    )
-                    continue
-
-                segment_info = {
-                    "num_passengers": int(num_passenger),
-                    "departure_time": dep_time,
-                    "departure_date": dep_date,
-                    "arrival_date": arr_date,
-                    "arrival_time": arr_time,
-                    "duration": segment["duration"][2:], 
-                    "departure_airport": dep_airport,
-                    "departure_city": dep_city,
-                    "destination_airport": arr_airport,
-                    "destination_city": arr_city,
-                    "airline_code": airline_code,
-                    "flight_number": flight_code,
-                    "unique_id": airline_code + flight_code + departure_date + dep_time
-                }
-
-                wrapped_segment = SegmentResponseWrapper(
-                    SegmentResponse=SegmentResponse(**segment_info)
-                )
-
-                if i == 0:
-                    outbound_segments.append(wrapped_segment)
-                else:
-                    inbound_segments.append(wrapped_segment)
-
-        # Build the flight object
-        number_of_segments = len(outbound_segments) + len(inbound_segments)
-        flight_info = {
-            "number_of_segments": number_of_segments,
-            "flight_id": str(uuid.uuid4()),
-            "outbound": outbound_segments,
-            "inbound": inbound_segments,
-            "price_per_person": price_per_person,
-            "total_price": f"{(float(price_per_person) * int(num_passenger)):.2f}"
-
-        }
-
-        flight_obj = FlightResponseObj(**flight_info)
-        flights.append(FlightResponseObjWrapper(FlightResponse=flight_obj))
-
-    # Build the final FlightResponse
-    flights_response = FlightResponse(
-        user_id=user_id,
-        results=flights
+    flights_response = to_flight_response(user_id, offers[:filters.max_results], int(num_passenger))
+    flights_response.price_calendar = PriceCalendar(
+        departure_dates=departure_dates,
+        return_dates=return_dates,
+        prices=[[cheapest.get((departure, ret)) for ret in return_dates] for departure in departure_dates],
+        complete=not errors and not pending
     )
 
     logger.info(
-        f"Constructed FlightResponse with {len(flights)} flight(s) for user_id={user_id}. "
-        f"Departure date: {departure_date}, Return date: {return_date}"
+        f"Flexible-date search for user_id={user_id}: {len(done) - len(errors)}/{len(searches)} search(es) "
+        f"answered, {len(flights_response.results)} flight(s) returned."
     )
+    return flights_response
 
-    logger.debug(f"Final FlightResponse object: {flights_response}")
 
-    return flights_response
-    
+def _searchable_date_pairs(departure_dates: List[str], return_dates: List[str], today: str) -> List[tuple]:
+    """(departure, return) pairs worth a search: not departing in the past, not returning before departing"""
+    return [
+        (departure, ret) for departure in departure_dates for ret in return_dates
+        if today <= departure <= ret
+    ]
+
 
-def get_city_from_airport(airport: str):
-    current_dir = os.path.dirname(__file__)
+def _date_window(day: str, flexible_days: int) -> List[str]:
+    """'YYYY-MM-DD' and the flexible_days days before and after it, in order"""
+    center = date.fromisoformat(day)
+    return [(center + timedelta(days=offset)).isoformat() for offset in range(-flexible_days, flexible_days + 1)]
 
-    file_path = os.path.join(current_dir, "airport_to_city.json")
 
-    with open(file_path, "r") as file:
+def _max_segments(filters: FlightFilters) -> int:
+    # Amadeus only filters non-stop flights, other stop limits are applied while parsing
+    max_stops = 0 if filters.non_stop else filters.max_stops
+    return MAX_SEGMENTS_PER_ITINERARY if max_stops is None else max_stops + 1
+
+
+def amadeus_search_params(filters: FlightFilters) -> dict:
+    """
+    Amadeus flight-offers query parameters for the filters it supports.
+    When a stop limit or the duration sort is applied locally, LOCAL_FILTER_OVERFETCH times max_results offers
+    are requested, so the local pass has some to choose from without downloading the whole result set.
+    """
+    max_offers = filters.max_results
+    if _filtered_locally(filters):
+        max_offers = min(AMADEUS_MAX_RESULTS, max_offers * LOCAL_FILTER_OVERFETCH)
+    params = {"max": max_offers}
+    if filters.non_stop or filters.max_stops == 0:
+        params["nonStop"] = "true"
+    if filters.included_airlines:
+        params["includedAirlineCodes"] = ",".join(filters.included_airlines)
+    if filters.excluded_airlines:
+        params["excludedAirlineCodes"] = ",".join(filters.excluded_airlines)
+    if filters.max_price is not None:
+        params["maxPrice"] = filters.max_price
+    return params
+
+
+def _load_airport_index(file_path: Path):
+    """
+    Build the airport -> city and city -> airports lookups from the bundled JSON file.
+    The first city listed for an airport wins, matching the order of the file.
+    """
+    with open(file_path, "r", encoding="utf-8") as file:
         data = json.load(file)
-    
+
+    airport_to_city = {}
+    city_to_airports = {}
     for entry in data:
-        if airport in entry["airports"]:
-            return entry["city"]
-    
-    return "Unknown"
+        city = entry["city"]
+        for airport in entry["airports"]:
+            airport_to_city.setdefault(airport, city)
+        city_to_airports.setdefault(city, []).extend(entry["airports"])
+
+    return airport_to_city, {city: tuple(airports) for city, airports in city_to_airports.items()}
+
+
+# airport/city mapping, loaded once at startup
+BASE_DIR = Path(__file__).resolve().parent
+AIRPORT_FILE = BASE_DIR / "airport_to_city.json"
+
+airport_to_city, city_to_airports = _load_airport_index(AIRPORT_FILE)
+
+
+def get_city_from_airport(airport: str) -> str:
+    return airport_to_city.get(airport, "Unknown")
+
+
+def get_airports_for_city(city: str) -> tuple:
+    return city_to_airports.get(city, ())
 
 # def extract_flight_info(flights: FlightResponse):
 #     segments = flights.segment_info
@@ -0,0 +1,192 @@
+import logging
+import re
+import uuid
+from operator import itemgetter
+from typing import List, Optional
+
+from ..models.flight_model import FlightResponse
+
+logger = logging.getLogger("flight_microservice")
+
+MAX_SEGMENTS_PER_ITINERARY = 3
+
+# precompiled field extraction, one C-level call per segment instead of a chain of lookups
+_segment_fields = itemgetter("departure", "arrival", "carrierCode", "number", "duration")
+_endpoint_fields = itemgetter("iataCode", "at")
+_iso_duration = re.compile(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?")
+
+
+class SegmentRecord:
+    """One flight segment, already in the shape of a SegmentResponse"""
+
+    __slots__ = (
+        "departure_date", "departure_time", "arrival_date", "arrival_time", "duration",
+        "departure_airport", "departure_city", "destination_airport", "destination_city",
+        "airline_code", "flight_number", "unique_id"
+    )
+
+    def __init__(
+        self, departure_date, departure_time, arrival_date, arrival_time, duration,
+        departure_airport, departure_city, destination_airport, destination_city,
+        airline_code, flight_number, unique_id
+    ):
+        self.departure_date = departure_date
+        self.departure_time = departure_time
+        self.arrival_date = arrival_date
+        self.arrival_time = arrival_time
+        self.duration = duration
+        self.departure_airport = departure_airport
+        self.departure_city = departure_city
+        self.destination_airport = destination_airport
+        self.destination_city = destination_city
+        self.airline_code = airline_code
+        self.flight_number = flight_number
+        self.unique_id = unique_id
+
+
+class OfferRecord:
+    """One bookable flight offer: its price and outbound/inbound segments"""
+
+    __slots__ = ("price_per_person", "outbound", "inbound", "duration_minutes")
+
+    def __init__(
+        self,
+        price_per_person: str,
+        outbound: List[SegmentRecord],
+        inbound: List[SegmentRecord],
+        duration_minutes: Optional[int] = None
+    ):
+        self.price_per_person = price_per_person
+        self.outbound = outbound
+        self.inbound = inbound
+        self.duration_minutes = duration_minutes  # only computed when sorting by duration
+
+
+def _split_timestamp(timestamp: str) -> tuple:
+    """'2025-03-10T08:00:00' -> ('2025-03-10', '08:00')"""
+    date, separator, time = timestamp.partition("T")
+    if not separator:
+        raise ValueError(f"Invalid timestamp: {timestamp}")
+    return date, time[:5]
+
+
+def _duration_minutes(itineraries: list) -> float:
+    """Total travel time of the offer from the itinerary durations ('PT16H35M'), inf if one is missing"""
+    total = 0
+    for itinerary in itineraries:
+        match = _iso_duration.fullmatch(itinerary.get("duration") or "")
+        if match is None:
+            return float("inf")
+        days, hours, minutes = (int(value or 0) for value in match.groups())
+        total += days * 1440 + hours * 60 + minutes
+    return total
+
+
+def parse_offers(
+    offers: list,
+    departure_date: str,
+    airport_to_city: dict,
+    max_segments: int = MAX_SEGMENTS_PER_ITINERARY,
+    sort: Optional[str] = None,
+    limit: Optional[int] = None
+) -> List[OfferRecord]:
+    """
+    Single pass over the Amadeus flight offers.
+    Offers with an itinerary of more than max_segments segments (capped at MAX_SEGMENTS_PER_ITINERARY)
+    or without a base price are skipped, as are segments with missing or invalid fields. The first
+    itinerary is the outbound journey, any other one is inbound.
+    sort ('price' or 'duration') orders the kept offers, None keeps the upstream order; at most limit
+    offers are returned, and without sort the pass stops as soon as limit offers are kept.
+    """
+    debug = logger.isEnabledFor(logging.DEBUG)
+    max_segments = min(max_segments, MAX_SEGMENTS_PER_ITINERARY)
+    records = []
+
+    for idx, offer in enumerate(offers):
+        if debug:
+            logger.debug(f"Processing flight index {idx}: {offer}")
+
+        itineraries = offer.get("itineraries", [])
+        if any(len(itinerary["segments"]) > max_segments for itinerary in itineraries):
+            logger.warning(
+                f"Skipping flight index {idx} because it has an itinerary with more than "
+                f"{max_segments} segments."
+            )
+            continue
+
+        try:
+            price_per_person = str(offer["price"]["base"])
+        except KeyError:
+            logger.error(f"Skipping flight index {idx}: Missing 'price' or 'base' key in flight data. Flight: {offer}")
+            continue
+
+        outbound, inbound = [], []
+        for i, itinerary in enumerate(itineraries):
+            segments = outbound if i == 0 else inbound
+            for segment in itinerary.get("segments", ()):
+                try:
+                    departure, arrival, airline_code, flight_number, duration = _segment_fields(segment)
+                    departure_airport, departure_at = _endpoint_fields(departure)
+                    arrival_airport, arrival_at = _endpoint_fields(arrival)
+                    dep_date, dep_time = _split_timestamp(departure_at)
+                    arr_date, arr_time = _split_timestamp(arrival_at)
+                except (KeyError, ValueError) as e:
+                    logger.error(f"Skipping segment due to missing or invalid data: {segment}. Error: {e}", exc_info=True)
+                    continue
+
+                segments.append(SegmentRecord(
+                    dep_date, dep_time, arr_date, arr_time, duration[2:],  # 'PT8H' -> '8H'
+                    departure_airport, airport_to_city.get(departure_airport, "Unknown"),
+                    arrival_airport, airport_to_city.get(arrival_airport, "Unknown"),
+                    airline_code, flight_number,
+                    airline_code + flight_number + departure_date + dep_time
+                ))
+
+        records.append(OfferRecord(
+            price_per_person, outbound, inbound,
+            _duration_minutes(itineraries) if sort == "duration" else None
+        ))
+        if sort is None and limit is not None and len(records) >= limit:
+            break
+
+    if sort == "price":
+        records.sort(key=lambda record: float(record.price_per_person))
+    elif sort == "duration":
+        records.sort(key=lambda record: record.duration_minutes)
+    return records[:limit]
+
+
+def _segment_dict(segment: SegmentRecord, num_passengers: int) -> dict:
+    return {"SegmentResponse": {
+        "num_passengers": num_passengers,
+        "departure_time": segment.departure_time,
+        "departure_date": segment.departure_date,
+        "arrival_date": segment.arrival_date,
+        "arrival_time": segment.arrival_time,
+        "duration": segment.duration,
+        "departure_airport": segment.departure_airport,
+        "departure_city": segment.departure_city,
+        "destination_airport": segment.destination_airport,
+        "destination_city": segment.destination_city,
+        "airline_code": segment.airline_code,
+        "flight_number": segment.flight_number,
+        "unique_id": segment.unique_id
+    }}
+
+
+def to_flight_response(user_id: str, offers: List[OfferRecord], num_passengers: int) -> FlightResponse:
+    """Build the whole FlightResponse from parsed offers with a single validation call."""
+    return FlightResponse.model_validate({
+        "user_id": user_id,
+        "results": [
+            {"FlightResponse": {
+                "number_of_segments": len(offer.outbound) + len(offer.inbound),
+                "flight_id": str(uuid.uuid4()),
+                "outbound": [_segment_dict(segment, num_passengers) for segment in offer.outbound],
+                "inbound": [_segment_dict(segment, num_passengers) for segment in offer.inbound],
+                "price_per_person": offer.price_per_person,
+                "total_price": f"{float(offer.price_per_person) * num_passengers:.2f}"
+            }}
+            for offer in offers
+        ]
+    })
@@ -1,15 +1,142 @@
+import asyncio
 import logging
-import requests
-from .api_token_refresh import get_valid_token
+import os
+from typing import Optional
+
+import httpx
+from .api_token_refresh import get_valid_token, refresh_token
+from .cache import CacheBackend, SQLiteCache, TTLCache
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .coalesce import RequestCoalescer
+from .hedging import HedgingPolicy
+from .rate_limit import UpstreamLimiter
 
 logger = logging.getLogger("flight_microservice")
 
-def get_flight_data(
+AMADEUS_FLIGHT_OFFERS_URL = "https://test.api.amadeus.com/v2/shopping/flight-offers"
+DEFAULT_MAX_RESULTS = 5
+
+# connection pool settings, shared by every request handled by this worker
+AMADEUS_MAX_CONNECTIONS = int(os.getenv("AMADEUS_MAX_CONNECTIONS", "20"))
+AMADEUS_MAX_KEEPALIVE = int(os.getenv("AMADEUS_MAX_KEEPALIVE", "10"))
+AMADEUS_TIMEOUT = float(os.getenv("AMADEUS_TIMEOUT", "30"))
+AMADEUS_CONNECT_TIMEOUT = float(os.getenv("AMADEUS_CONNECT_TIMEOUT", "5"))
+
+# how hard one worker may hit the flight-offers endpoint; retried 429s count against AMADEUS_MAX_RETRIES
+AMADEUS_RATE_LIMIT = float(os.getenv("AMADEUS_RATE_LIMIT", "10"))  # requests per second, 0 disables
+AMADEUS_BURST = int(os.getenv("AMADEUS_BURST", "10"))
+AMADEUS_CONCURRENCY = int(os.getenv("AMADEUS_CONCURRENCY", "5"))
+AMADEUS_MIN_CONCURRENCY = int(os.getenv("AMADEUS_MIN_CONCURRENCY", "1"))
+AMADEUS_LATENCY_TARGET = float(os.getenv("AMADEUS_LATENCY_TARGET", "5"))  # seconds, 0 ignores latency
+AMADEUS_MAX_RETRIES = int(os.getenv("AMADEUS_MAX_RETRIES", "3"))
+AMADEUS_BACKOFF_BASE = float(os.getenv("AMADEUS_BACKOFF_BASE", "0.5"))
+AMADEUS_BACKOFF_MAX = float(os.getenv("AMADEUS_BACKOFF_MAX", "8"))
+
+# flight search response cache (FLIGHT_CACHE_TTL=0 disables caching)
+FLIGHT_CACHE_TTL = float(os.getenv("FLIGHT_CACHE_TTL", "300"))
+FLIGHT_CACHE_MAX_ENTRIES = int(os.getenv("FLIGHT_CACHE_MAX_ENTRIES", "1024"))
+# path of a SQLite file to share the cache between the workers of a host; unset keeps it in process
+FLIGHT_CACHE_FILE = os.getenv("FLIGHT_CACHE_FILE")
+
+# circuit breaker: stop calling Amadeus while it keeps failing or answering slowly
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "10"))
+CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.5"))
+CIRCUIT_WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+# opt-in hedging: repeat a search that is slower than HEDGING_PERCENTILE of recent ones, within HEDGING_BUDGET of traffic
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGING_PERCENTILE = float(os.getenv("HEDGING_PERCENTILE", "95"))
+HEDGING_INITIAL_DELAY = float(os.getenv("HEDGING_INITIAL_DELAY", "3"))
+HEDGING_BUDGET = float(os.getenv("HEDGING_BUDGET", "0.05"))
+
+# last good response per search, served while the circuit is open (STALE_FALLBACK_TTL=0 disables it)
+STALE_FALLBACK_TTL = float(os.getenv("STALE_FALLBACK_TTL", "3600"))
+STALE_FALLBACK_MAX_ENTRIES = int(os.getenv("STALE_FALLBACK_MAX_ENTRIES", "1024"))
+
+_client: Optional[httpx.AsyncClient] = None
+flight_cache: CacheBackend = (
+    SQLiteCache(FLIGHT_CACHE_FILE, max_entries=FLIGHT_CACHE_MAX_ENTRIES, ttl=FLIGHT_CACHE_TTL) if FLIGHT_CACHE_FILE
+    else TTLCache(max_entries=FLIGHT_CACHE_MAX_ENTRIES, ttl=FLIGHT_CACHE_TTL)
+)
+flight_fallback_cache = TTLCache(max_entries=STALE_FALLBACK_MAX_ENTRIES, ttl=STALE_FALLBACK_TTL)
+# a search every caller gave up on (e.g. past a flexible-date deadline) is cancelled upstream too
+flight_coalescer = RequestCoalescer(cancel_abandoned=True)
+amadeus_hedging = HedgingPolicy(
+    enabled=HEDGING_ENABLED,
+    percentile=HEDGING_PERCENTILE,
+    initial_delay=HEDGING_INITIAL_DELAY,
+    budget=HEDGING_BUDGET
+)
+amadeus_breaker = CircuitBreaker(
+    "Amadeus",
+    failure_rate=CIRCUIT_FAILURE_RATE,
+    slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS,
+    slow_call_rate=CIRCUIT_SLOW_CALL_RATE,
+    window_size=CIRCUIT_WINDOW_SIZE,
+    min_calls=CIRCUIT_MIN_CALLS,
+    open_seconds=CIRCUIT_OPEN_SECONDS
+)
+amadeus_limiter = UpstreamLimiter(
+    rate=AMADEUS_RATE_LIMIT,
+    burst=AMADEUS_BURST,
+    max_concurrency=AMADEUS_CONCURRENCY,
+    min_concurrency=AMADEUS_MIN_CONCURRENCY,
+    latency_target=AMADEUS_LATENCY_TARGET,
+    max_retries=AMADEUS_MAX_RETRIES,
+    backoff_base=AMADEUS_BACKOFF_BASE,
+    backoff_max=AMADEUS_BACKOFF_MAX
+)
+
+
+def set_flight_cache(cache: CacheBackend) -> None:
+    """Replace the flight search cache, e.g. with a backend shared between workers."""
+    global flight_cache
+    flight_cache = cache
+
+
+def open_client() -> httpx.AsyncClient:
+    """
+    Create the shared Amadeus HTTP client (called from the FastAPI lifespan).
+    Connections are kept alive and reused across searches, bounded by AMADEUS_MAX_CONNECTIONS.
+    """
+    global _client
+
+    if _client is None or _client.is_closed:
+        logger.info(
+            f"Opening Amadeus HTTP client: max_connections={AMADEUS_MAX_CONNECTIONS}, "
+            f"max_keepalive={AMADEUS_MAX_KEEPALIVE}, timeout={AMADEUS_TIMEOUT}s, "
+            f"connect_timeout={AMADEUS_CONNECT_TIMEOUT}s"
+        )
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=AMADEUS_MAX_CONNECTIONS,
+                max_keepalive_connections=AMADEUS_MAX_KEEPALIVE
+            ),
+            timeout=httpx.Timeout(AMADEUS_TIMEOUT, connect=AMADEUS_CONNECT_TIMEOUT)
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared Amadeus HTTP client and release its pooled connections."""
+    global _client
+
+    if _client is not None:
+        logger.info("Closing Amadeus HTTP client.")
+        await _client.aclose()
+        _client = None
+
+
+async def get_flight_data(
     origin_loc_code: str,
     destination_loc_code: str,
     num_passenger: str,
     departure_date: str,
-    return_date: str
+    return_date: str,
+    search_params: Optional[dict] = None
 ) -> dict:
     """
     Fetch flight data from the Amadeus API for the given parameters.
@@ -19,47 +146,103 @@ def get_flight_data(
     :param num_passenger: Number of passengers (adults)
     :param departure_date: Departure date in 'YYYY-MM-DD'
     :param return_date: Return date in 'YYYY-MM-DD'
+    :param search_params: Extra Amadeus query parameters (max, nonStop, airline codes, maxPrice);
+                          defaults to the DEFAULT_MAX_RESULTS cheapest offers
     :return: Parsed JSON response from Amadeus as a dictionary
-    :raises requests.exceptions.HTTPError: For any non-200 status codes
+    :raises httpx.HTTPStatusError: For any non-200 status codes
+    :raises CircuitOpenError: While Amadeus is failing and no earlier response can stand in
     """
-    
-    # Build the request URL
-    AMADEUS_URL = (
-        "https://test.api.amadeus.com/v2/shopping/flight-offers?"
-        f"originLocationCode={origin_loc_code}&destinationLocationCode={destination_loc_code}&"
-        f"departureDate={departure_date}&returnDate={return_date}&adults={num_passenger}&max=5"
+
+    search_params = search_params or {"max": DEFAULT_MAX_RESULTS}
+    # the filters change what Amadeus returns, so they are part of the key
+    cache_key = (
+        origin_loc_code.upper(), destination_loc_code.upper(),
+        departure_date, return_date, str(num_passenger),
+        tuple(sorted((name, str(value)) for name, value in search_params.items()))
     )
+    cached = flight_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Serving flight data from cache for {cache_key}")
+        return cached
 
-    # Prepare headers with a valid token
-    token = get_valid_token()
-    headers = {
-        "Authorization": f"Bearer {token}"
+    params = {
+        "originLocationCode": origin_loc_code,
+        "destinationLocationCode": destination_loc_code,
+        "departureDate": departure_date,
+        "returnDate": return_date,
+        "adults": num_passenger,
+        **search_params
     }
 
     logger.info(
         f"Attempting to fetch flight data from Amadeus: "
         f"origin={origin_loc_code}, destination={destination_loc_code}, "
-        f"departure_date={departure_date}, return_date={return_date}, passengers={num_passenger}"
+        f"departure_date={departure_date}, return_date={return_date}, passengers={num_passenger}, "
+        f"filters={search_params}"
     )
 
-    logger.debug(f"Amadeus GET URL: {AMADEUS_URL}")
-    logger.debug(f"Request headers: {headers}")
+    # cache miss: identical searches already waiting on Amadeus await that call instead of starting their own
+    try:
+        return await flight_coalescer.run(cache_key, _request_flight_data, cache_key, params)
+    except CircuitOpenError:
+        stale = flight_fallback_cache.get(cache_key)
+        if stale is None:
+            raise
+        logger.warning(f"Amadeus circuit is open, serving stale flight data for {cache_key}")
+        return stale
+
+
+def is_upstream_failure(response: httpx.Response) -> bool:
+    """Responses that count against the circuit breaker (client errors are the caller's fault)"""
+    return response.status_code >= 500 or response.status_code == 429
+
+
+async def _send(client: httpx.AsyncClient, params: dict, headers: dict) -> httpx.Response:
+    # limiter outside, breaker inside: a search queued behind the rate limit is not a slow Amadeus response;
+    # a hedged search takes its own token and slot
+    return await amadeus_hedging.run(
+        lambda: amadeus_limiter.send(
+            lambda: amadeus_breaker.call_async(
+                lambda: client.get(AMADEUS_FLIGHT_OFFERS_URL, params=params, headers=headers),
+                is_failure=is_upstream_failure
+            )
+        )
+    )
+
+
+async def _request_flight_data(cache_key: tuple, params: dict) -> dict:
+    """
+    Call the Amadeus flight offers endpoint, refreshing the token once on a 401,
+    and cache the successful response under cache_key.
+    """
+
+    # Prepare headers with a valid token (token refresh is blocking, keep it off the event loop)
+    token = await asyncio.to_thread(get_valid_token)
+    headers = {
+        "Authorization": f"Bearer {token}"
+    }
+
+    logger.debug(f"Amadeus GET URL: {AMADEUS_FLIGHT_OFFERS_URL}, params: {params}")
+
+    client = open_client()
 
     try:
-        response = requests.get(AMADEUS_URL, headers=headers)
+        response = await _send(client, params, headers)
         logger.debug(f"Initial response status code: {response.status_code}")
 
         if response.status_code == 401:
             logger.warning("Received 401 Unauthorized from Amadeus. Refreshing token and retrying...")
-            new_token = get_valid_token()  # Attempt to get/refresh token
+            new_token = await asyncio.to_thread(refresh_token, token)  # Replace the rejected token
             headers["Authorization"] = f"Bearer {new_token}"
-            response = requests.get(AMADEUS_URL, headers=headers)
+            response = await _send(client, params, headers)
             logger.debug(f"Retry response status code after token refresh: {response.status_code}")
 
         if response.status_code == 200:
             logger.info("Successfully retrieved flight data from Amadeus (status 200).")
             logger.debug(f"Amadeus response body: {response.text}")
             data = response.json()
+            flight_cache.set(cache_key, data)
+            flight_fallback_cache.set(cache_key, data)
             return data
         else:
             logger.error(
@@ -68,11 +251,6 @@ def get_flight_data(
             )
             response.raise_for_status()
 
-    except requests.exceptions.RequestException as req_err:
+    except httpx.HTTPError:
         logger.error("Exception occurred while requesting data from Amadeus.", exc_info=True)
-        raise req_err
-
-
-
-
-
+        raise
@@ -0,0 +1,192 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class CacheBackend(ABC):
+    """
+    Interface for flight search caches.
+    Any backend (in-process, or shared between workers) can be plugged in with set_flight_cache
+    as long as it implements get/set/clear/stats.
+    """
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class TTLCache(CacheBackend):
+    """
+    Thread-safe in-process LRU cache whose entries expire after ttl seconds.
+    Once max_entries is reached, the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class SQLiteCache(CacheBackend):
+    """
+    LRU cache with a TTL kept in a SQLite file, shared by every worker on the host that opens the same path,
+    so a search answered by one worker is a hit for the others.
+    Values must be JSON-serialisable; keys are stored by their repr. Expiry uses wall-clock time, as it is
+    compared across processes. Hit/miss/eviction counters are per worker.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024, ttl: float = 300):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # workers write concurrently: WAL lets readers proceed, the timeout waits out other writers
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS flight_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, expires_at FROM flight_cache WHERE key = ?", (repr(key),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = row
+            if now >= expires_at:
+                self._db.execute("DELETE FROM flight_cache WHERE key = ?", (repr(key),))
+                self._db.commit()
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._db.execute("UPDATE flight_cache SET used_at = ? WHERE key = ?", (now, repr(key)))
+            self._db.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO flight_cache VALUES (?, ?, ?, ?)", (repr(key), payload, now + self.ttl, now)
+            )
+            evicted = self._db.execute(
+                "DELETE FROM flight_cache WHERE key IN "
+                "(SELECT key FROM flight_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self._db.commit()
+            self.evictions += evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM flight_cache")
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM flight_cache").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "path": self.path
+            }
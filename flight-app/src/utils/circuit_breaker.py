@@ -0,0 +1,129 @@
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable, circuit breaker is open (retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for Amadeus flight searches, over the last window_size searches.
+    closed: searches go through. The circuit opens once at least min_calls were recorded and either
+    the share of failed searches reaches failure_rate, or the share slower than slow_call_seconds
+    reaches slow_call_rate.
+    open: searches fail fast with CircuitOpenError for open_seconds (get_flight_data then serves the
+    stale fallback cache, if it has the search).
+    half-open: a single trial search goes through; it closes the circuit on success, reopens it otherwise.
+    Only used from the event loop, so state changes need no lock.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 5,
+        slow_call_rate: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds  # 0 ignores latency
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._calls = deque(maxlen=window_size)  # (failed, slow) per recorded call
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+        self.opened = 0    # closed/half-open -> open transitions
+        self.rejected = 0  # calls failed fast while open
+
+    def before_call(self) -> None:
+        """Let a call through, or raise CircuitOpenError"""
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, remaining)
+            self.state = self.HALF_OPEN
+
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 0)
+            self._trial_in_flight = True
+
+    def record(self, failed: bool, latency: float) -> None:
+        slow = bool(self.slow_call_seconds) and latency > self.slow_call_seconds
+        if self.state == self.HALF_OPEN:
+            self._trial_in_flight = False
+            if failed or slow:
+                self._open()
+            else:
+                self.state = self.CLOSED
+                self._calls.clear()
+            return
+
+        self._calls.append((failed, slow))
+        if self.state == self.CLOSED and len(self._calls) >= self.min_calls:
+            failures = sum(1 for call_failed, _ in self._calls if call_failed)
+            slow_calls = sum(1 for _, call_slow in self._calls if call_slow)
+            if (
+                failures / len(self._calls) >= self.failure_rate
+                or (self.slow_call_seconds and slow_calls / len(self._calls) >= self.slow_call_rate)
+            ):
+                self._open()
+
+    def cancel(self) -> None:
+        """The call was abandoned (e.g. cancelled) without an outcome"""
+        self._trial_in_flight = False
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self.opened += 1
+
+    async def call_async(
+        self,
+        func: Callable[[], Awaitable[Any]],
+        is_failure: Callable[[Any], bool] = lambda result: False
+    ) -> Any:
+        """Await func() through the breaker; exceptions and results matching is_failure count as failures."""
+        self.before_call()
+        started = time.monotonic()
+        try:
+            result = await func()
+        except Exception:
+            self.record(True, time.monotonic() - started)
+            raise
+        except BaseException:
+            self.cancel()
+            raise
+        self.record(is_failure(result), time.monotonic() - started)
+        return result
+
+    def stats(self) -> dict:
+        calls = len(self._calls)
+        return {
+            "state": self.state,
+            "calls": calls,
+            "failure_rate": round(sum(1 for failed, _ in self._calls if failed) / calls, 4) if calls else 0.0,
+            "slow_call_rate": round(sum(1 for _, slow in self._calls if slow) / calls, 4) if calls else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class RequestCoalescer:
+    """
+    Collapses concurrent identical flight searches on this worker's event loop.
+    The first search for a key starts the Amadeus call as a task; searches arriving before it completes
+    await that task, so a burst of users asking for the same route costs one request and one rate-limit token.
+    With cancel_abandoned, the Amadeus call is cancelled once every search awaiting it was cancelled.
+    """
+
+    def __init__(self, cancel_abandoned: bool = False):
+        self.cancel_abandoned = cancel_abandoned
+        self._in_flight = {}  # key -> asyncio.Task
+        self._waiters = {}    # asyncio.Task -> callers awaiting it
+
+        self.calls = 0
+        self.collapsed = 0
+        self.abandoned = 0  # calls cancelled because nobody was waiting anymore
+
+    async def run(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        task = self._in_flight.get(key)
+
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.collapsed += 1
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # shield so a caller that is cancelled (e.g. client disconnect) does not cancel the call for the others
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self.cancel_abandoned and self._waiters[task] == 1 and not task.done():
+                self.abandoned += 1
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._in_flight)
+        }
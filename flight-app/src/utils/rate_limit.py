@@ -0,0 +1,237 @@
+import asyncio
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+
+class TokenBucket:
+    """
+    Flight searches this worker may send to Amadeus: rate per second, with bursts of up to burst searches.
+    Searches over the limit queue in arrival order; pause() holds all of them back after a Retry-After.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+        self.queued = 0   # callers currently waiting for a token
+        self.delayed = 0  # acquisitions that had to wait
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:  # rate limiting disabled
+            return
+
+        now = time.monotonic()
+        self._refill(now)
+        # take the token now, even if that leaves the bucket in debt; the debt is the wait
+        self._tokens -= 1
+        delay = max(-self._tokens / self.rate, self._paused_until - now)
+        if delay <= 0:
+            return
+
+        self.queued += 1
+        self.delayed += 1
+        try:
+            await asyncio.sleep(delay)
+            # a pause may have started while we were waiting
+            while (remaining := self._paused_until - time.monotonic()) > 0:
+                await asyncio.sleep(remaining)
+        except asyncio.CancelledError:
+            self._tokens += 1  # give back the token this caller will not use
+            raise
+        finally:
+            self.queued -= 1
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "queued": self.queued,
+            "delayed": self.delayed,
+            "paused_for": round(max(self._paused_until - time.monotonic(), 0.0), 3)
+        }
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    AIMD limit on flight searches in flight at Amadeus. Each search answered without a sign of overload
+    raises the limit by 1/limit (about +1 per round of searches); a 429, a timeout or a search slower than
+    latency_target multiplies it by backoff_ratio. Searches over the limit queue in arrival order.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        min_limit: int = 1,
+        latency_target: float = 0,
+        backoff_ratio: float = 0.5
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.latency_target = latency_target  # seconds, 0 ignores latency
+        self.backoff_ratio = backoff_ratio
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._waiters = deque()  # asyncio.Future per queued caller
+
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _has_slot(self) -> bool:
+        return self.in_flight < max(int(self.limit), self.min_limit)
+
+    async def acquire(self) -> None:
+        if self._has_slot() and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over just before the cancellation, pass it on
+                self.in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:  # _wake() may already have dropped the cancelled future
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency: Optional[float], overloaded: bool = False) -> None:
+        """Free a slot; latency=None (request failed for an unrelated reason) leaves the limit as is."""
+        if overloaded or (latency is not None and self.latency_target and latency > self.latency_target):
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            self.decreases += 1
+        elif latency is not None and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.increases += 1
+
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._has_slot():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "increases": self.increases,
+            "decreases": self.decreases
+        }
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Seconds to wait according to the Retry-After header (delay or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamLimiter:
+    """
+    Everything a flight search goes through before reaching Amadeus: the token bucket, then the
+    concurrency limit. A 429 lowers the limit and is retried after Retry-After (pausing the bucket for
+    every search) or after an exponential backoff with full jitter. The last 429 is returned as is;
+    get_flight_data raises it and app.py answers the client with a 429 and Retry-After.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        latency_target: float = 0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8
+    ):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrencyLimit(max_concurrency, min_concurrency, latency_target)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.requests = 0
+        self.throttled = 0  # 429 responses
+        self.retries = 0
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def send(self, request: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Await request() within the limits, retrying it while the upstream answers 429."""
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            await self.concurrency.acquire()
+            self.requests += 1
+            started = time.monotonic()
+            try:
+                response = await request()
+            except httpx.TimeoutException:
+                self.concurrency.release(time.monotonic() - started, overloaded=True)
+                raise
+            except BaseException:
+                self.concurrency.release(None)
+                raise
+            self.concurrency.release(time.monotonic() - started, response.status_code == 429)
+
+            if response.status_code != 429:
+                return response
+
+            self.throttled += 1
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                self.bucket.pause(retry_after)
+
+            if attempt >= self.max_retries or (retry_after or 0) > self.backoff_max:
+                return response
+
+            await asyncio.sleep(retry_after if retry_after is not None else self.backoff(attempt))
+            attempt += 1
+            self.retries += 1
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "queue_depth": self.bucket.queued + self.concurrency.queued,
+            "rate_limit": self.bucket.stats(),
+            "concurrency": self.concurrency.stats()
+        }
@@ -0,0 +1,246 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+import src.utils.api_client as client_module
+from src.utils.api_client import get_flight_data
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.utils.hedging import HedgingPolicy
+from src.utils.rate_limit import UpstreamLimiter
+
+
+def use_mock_transport(handler):
+    """
+    Swap the shared Amadeus client for one backed by an httpx.MockTransport,
+    so no real network calls are made.
+    """
+    client_module._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.fixture(autouse=True)
+def reset_client(monkeypatch):
+    client_module._client = None
+    monkeypatch.setattr(client_module, "amadeus_limiter", UpstreamLimiter(rate=0, burst=1, max_concurrency=5, backoff_base=0.001))
+    monkeypatch.setattr(client_module, "amadeus_breaker", CircuitBreaker("Amadeus", min_calls=3, open_seconds=30))
+    client_module.flight_cache.clear()
+    client_module.flight_fallback_cache.clear()
+    yield
+    client_module.flight_cache.clear()
+    asyncio.run(client_module.close_client())
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_flight_data_returns_json_on_200(mock_get_valid_token):
+    """
+    GIVEN Amadeus responds with 200
+    WHEN get_flight_data is awaited
+    THEN it should return the parsed JSON and send the query as request params.
+    """
+    seen_requests = []
+
+    def handler(request):
+        seen_requests.append(request)
+        return httpx.Response(200, json={"data": []})
+
+    use_mock_transport(handler)
+
+    data = asyncio.run(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17"))
+
+    assert data == {"data": []}
+    assert len(seen_requests) == 1
+    assert seen_requests[0].headers["Authorization"] == "Bearer valid_token"
+    assert seen_requests[0].url.params["originLocationCode"] == "SYD"
+    assert seen_requests[0].url.params["adults"] == "1"
+
+
+@patch("src.utils.api_client.refresh_token", return_value="refreshed_token")
+@patch("src.utils.api_client.get_valid_token", return_value="stale_token")
+def test_get_flight_data_refreshes_token_and_retries_on_401(mock_get_valid_token, mock_refresh_token):
+    """
+    GIVEN Amadeus rejects the first request with 401
+    WHEN get_flight_data is awaited
+    THEN it should force a token refresh and retry once with the new token.
+    """
+    seen_tokens = []
+
+    def handler(request):
+        seen_tokens.append(request.headers["Authorization"])
+        if request.headers["Authorization"] == "Bearer stale_token":
+            return httpx.Response(401, json={"errors": []})
+        return httpx.Response(200, json={"data": ["offer"]})
+
+    use_mock_transport(handler)
+
+    data = asyncio.run(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17"))
+
+    assert data == {"data": ["offer"]}
+    assert seen_tokens == ["Bearer stale_token", "Bearer refreshed_token"]
+    mock_refresh_token.assert_called_once_with("stale_token")
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_flight_data_raises_on_error_status(mock_get_valid_token):
+    """
+    GIVEN Amadeus responds with a 500
+    WHEN get_flight_data is awaited
+    THEN an httpx.HTTPStatusError should propagate to the caller.
+    """
+    use_mock_transport(lambda request: httpx.Response(500, text="server error"))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17"))
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_flight_data_serves_repeated_search_from_cache(mock_get_valid_token):
+    """
+    GIVEN a search that has already been answered by Amadeus
+    WHEN the same route, dates and passenger count are requested again
+    THEN the cached response should be returned without another upstream call.
+    """
+    seen_requests = []
+
+    def handler(request):
+        seen_requests.append(request)
+        return httpx.Response(200, json={"data": ["offer"]})
+
+    use_mock_transport(handler)
+
+    first = asyncio.run(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17"))
+    second = asyncio.run(get_flight_data("syd", "sin", "1", "2025-03-10", "2025-03-17"))
+    third = asyncio.run(get_flight_data("SYD", "SIN", "2", "2025-03-10", "2025-03-17"))
+
+    assert first == second == third == {"data": ["offer"]}
+    assert len(seen_requests) == 2  # different passenger count is a separate cache entry
+    assert client_module.flight_cache.stats()["hits"] == 1
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_flight_data_sends_filters_upstream_and_caches_per_filter(mock_get_valid_token):
+    """
+    GIVEN searches for the same route with and without filters
+    WHEN get_flight_data is awaited
+    THEN the filters should be sent as Amadeus query parameters and cached as separate searches.
+    """
+    seen_requests = []
+
+    def handler(request):
+        seen_requests.append(request)
+        return httpx.Response(200, json={"data": ["offer"]})
+
+    use_mock_transport(handler)
+    filters = {"max": 20, "nonStop": "true", "includedAirlineCodes": "QF,SQ", "maxPrice": 900}
+    hits = client_module.flight_cache.stats()["hits"]
+
+    asyncio.run(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17"))
+    asyncio.run(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17", filters))
+    asyncio.run(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17", dict(reversed(filters.items()))))
+
+    assert len(seen_requests) == 2
+    assert seen_requests[0].url.params["max"] == "5"
+    params = seen_requests[1].url.params
+    assert (params["max"], params["nonStop"], params["includedAirlineCodes"], params["maxPrice"]) == \
+        ("20", "true", "QF,SQ", "900")
+    assert client_module.flight_cache.stats()["hits"] == hits + 1
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_flight_data_coalesces_concurrent_identical_searches(mock_get_valid_token):
+    """
+    GIVEN several identical searches arriving at the same time
+    WHEN get_flight_data is awaited concurrently
+    THEN a single request should be sent to Amadeus and shared by all callers.
+    """
+    seen_requests = []
+
+    def handler(request):
+        seen_requests.append(request)
+        return httpx.Response(200, json={"data": ["offer"]})
+
+    use_mock_transport(handler)
+    collapsed_before = client_module.flight_coalescer.collapsed
+
+    async def main():
+        return await asyncio.gather(
+            *(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17") for _ in range(5))
+        )
+
+    results = asyncio.run(main())
+
+    assert results == [{"data": ["offer"]}] * 5
+    assert len(seen_requests) == 1
+    assert client_module.flight_coalescer.collapsed - collapsed_before == 4
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_flight_data_retries_when_rate_limited(mock_get_valid_token):
+    """
+    GIVEN Amadeus answers the first search with 429 and a Retry-After header
+    WHEN get_flight_data is awaited
+    THEN the search is retried after the delay and the throttle event is counted.
+    """
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0.01"}),
+        httpx.Response(200, json={"data": ["offer"]})
+    ]
+    use_mock_transport(lambda request: responses.pop(0))
+
+    data = asyncio.run(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17"))
+
+    assert data == {"data": ["offer"]}
+    assert client_module.amadeus_limiter.stats()["throttled"] == 1
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_flight_data_serves_stale_result_while_circuit_is_open(mock_get_valid_token):
+    """
+    GIVEN a search answered once, then Amadeus failing until its circuit opens
+    WHEN the same search is made after the fresh cache entry expired
+    THEN the last good result is served without calling Amadeus, and other searches fail fast.
+    """
+    seen_requests = []
+    responses = [httpx.Response(200, json={"data": ["offer"]})] + [httpx.Response(503)] * 2
+
+    def handler(request):
+        seen_requests.append(request)
+        return responses.pop(0)
+
+    use_mock_transport(handler)
+
+    assert asyncio.run(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17")) == {"data": ["offer"]}
+    client_module.flight_cache.clear()
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(get_flight_data("SYD", "MEL", "1", "2025-03-10", "2025-03-17"))
+
+    stale = asyncio.run(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17"))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(get_flight_data("SYD", "MEL", "1", "2025-03-10", "2025-03-17"))
+
+    assert stale == {"data": ["offer"]}
+    assert len(seen_requests) == 3
+    assert client_module.amadeus_breaker.stats()["state"] == "open"
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_flight_data_hedges_a_slow_search(mock_get_valid_token, monkeypatch):
+    """
+    GIVEN hedging enabled and a first Amadeus request that hangs
+    WHEN get_flight_data is awaited
+    THEN a hedged request is sent after the hedging delay and its response is used.
+    """
+    monkeypatch.setattr(client_module, "amadeus_hedging", HedgingPolicy(enabled=True, initial_delay=0.01, budget=1.0))
+    seen_requests = []
+
+    async def handler(request):
+        seen_requests.append(request)
+        if len(seen_requests) == 1:
+            await asyncio.sleep(1)
+        return httpx.Response(200, json={"data": [f"offer {len(seen_requests)}"]})
+
+    use_mock_transport(handler)
+
+    data = asyncio.run(get_flight_data("SYD", "SIN", "1", "2025-03-10", "2025-03-17"))
+
+    assert data == {"data": ["offer 2"]}
+    assert client_module.amadeus_hedging.stats()["won"] == 1
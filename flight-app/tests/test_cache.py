@@ -0,0 +1,134 @@
+import pytest
+from unittest.mock import patch
+from src.utils.cache import CacheBackend, SQLiteCache, TTLCache
+
+
+def test_ttl_cache_returns_stored_value_and_counts_hits_and_misses():
+    """
+    GIVEN an empty TTLCache
+    WHEN a key is looked up before and after being set
+    THEN the first lookup is a miss and the second a hit returning the stored value.
+    """
+    cache = TTLCache(max_entries=10, ttl=60)
+
+    assert cache.get("key") is None
+    cache.set("key", {"data": []})
+    assert cache.get("key") == {"data": []}
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_ttl_cache_expires_entries_after_ttl():
+    """
+    GIVEN an entry stored with a 60s TTL
+    WHEN it is looked up after the TTL has elapsed
+    THEN it should be treated as a miss and counted as an expiration.
+    """
+    cache = TTLCache(max_entries=10, ttl=60)
+
+    with patch("src.utils.cache.time.monotonic", return_value=1000):
+        cache.set("key", "value")
+    with patch("src.utils.cache.time.monotonic", return_value=1059):
+        assert cache.get("key") == "value"
+    with patch("src.utils.cache.time.monotonic", return_value=1060):
+        assert cache.get("key") is None
+
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_cache_evicts_least_recently_used_entry_when_full():
+    """
+    GIVEN a cache bounded to 2 entries
+    WHEN a third entry is added after the first one was read
+    THEN the least recently used entry (the second) should be evicted.
+    """
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.parametrize("max_entries, ttl", [(0, 60), (10, 0)])
+def test_ttl_cache_disabled_when_size_or_ttl_is_zero(max_entries, ttl):
+    cache = TTLCache(max_entries=max_entries, ttl=ttl)
+    cache.set("key", "value")
+    assert cache.get("key") is None
+
+
+def test_cache_backend_without_every_method_cannot_be_created():
+    """
+    GIVEN a backend that only implements get and set
+    WHEN it is instantiated
+    THEN it should be rejected, as the client also relies on clear and stats.
+    """
+    class PartialCache(CacheBackend):
+        def get(self, key):
+            return None
+
+        def set(self, key, value):
+            pass
+
+    with pytest.raises(TypeError):
+        PartialCache()
+
+
+def test_sqlite_cache_is_shared_between_instances_on_the_same_file(tmp_path):
+    """
+    GIVEN two SQLite caches opened on the same file, as two workers would
+    WHEN one of them stores a response
+    THEN the other should return it as a hit.
+    """
+    path = str(tmp_path / "flight_cache.db")
+    first = SQLiteCache(path, max_entries=10, ttl=60)
+    second = SQLiteCache(path, max_entries=10, ttl=60)
+
+    first.set(("PAR", "NYC", "2025-06-01", None, 1), {"data": [{"id": "1"}]})
+
+    assert second.get(("PAR", "NYC", "2025-06-01", None, 1)) == {"data": [{"id": "1"}]}
+    assert second.stats()["hits"] == 1
+    assert second.stats()["size"] == 1
+    first.close()
+    second.close()
+
+
+def test_sqlite_cache_expires_and_evicts_least_recently_used_entry(tmp_path):
+    """
+    GIVEN a SQLite cache bounded to 2 entries with a 60s TTL
+    WHEN a third entry is added after the first one was read, and later the TTL elapses
+    THEN the second entry should be evicted, and the others should expire.
+    """
+    cache = SQLiteCache(str(tmp_path / "flight_cache.db"), max_entries=2, ttl=60)
+    with patch("src.utils.cache.time.time", side_effect=[1000, 1001, 1002, 1003, 1004, 1005, 1006]):
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+    with patch("src.utils.cache.time.time", return_value=1100):
+        assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 1
+    cache.close()
+
+
+@pytest.mark.parametrize("max_entries, ttl", [(0, 60), (10, 0)])
+def test_sqlite_cache_disabled_when_size_or_ttl_is_zero(tmp_path, max_entries, ttl):
+    cache = SQLiteCache(str(tmp_path / "flight_cache.db"), max_entries=max_entries, ttl=ttl)
+    cache.set("key", "value")
+    assert cache.get("key") is None
+    cache.close()
@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+async def fail():
+    raise ConnectionError("Amadeus down")
+
+
+async def ok():
+    return "ok"
+
+
+def call(breaker, func, **kwargs):
+    return asyncio.run(breaker.call_async(func, **kwargs))
+
+
+def test_breaker_opens_when_failure_rate_reaches_threshold():
+    """
+    GIVEN a breaker needing 4 searches with a 50% failure rate
+    WHEN 2 of 4 searches fail
+    THEN the circuit opens and further searches fail fast without reaching Amadeus.
+    """
+    breaker = CircuitBreaker("Amadeus", failure_rate=0.5, min_calls=4, open_seconds=30)
+    upstream_calls = []
+
+    async def succeed():
+        upstream_calls.append(1)
+        return "ok"
+
+    call(breaker, succeed)
+    call(breaker, succeed)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            call(breaker, fail)
+
+    with pytest.raises(CircuitOpenError) as excinfo:
+        call(breaker, succeed)
+
+    assert len(upstream_calls) == 2
+    assert 0 < excinfo.value.retry_after <= 30
+    assert breaker.stats()["state"] == "open"
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_opens_on_slow_searches_and_failing_responses():
+    breaker = CircuitBreaker("Amadeus", slow_call_seconds=0.01, slow_call_rate=0.5, min_calls=2)
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    call(breaker, slow)
+    call(breaker, slow)
+
+    assert breaker.stats()["state"] == "open"
+
+    async def unavailable():
+        return 503
+
+    breaker = CircuitBreaker("Amadeus", min_calls=2)
+    call(breaker, unavailable, is_failure=lambda status: status >= 500)
+    call(breaker, unavailable, is_failure=lambda status: status >= 500)
+
+    assert breaker.stats()["state"] == "open"
+
+
+def test_half_open_trial_search_closes_or_reopens_the_circuit():
+    """
+    GIVEN an open circuit whose open period has elapsed
+    WHEN a trial search is made
+    THEN a failing trial reopens the circuit and a successful one closes it.
+    """
+    breaker = CircuitBreaker("Amadeus", min_calls=1, open_seconds=0)
+
+    with pytest.raises(ConnectionError):
+        call(breaker, fail)
+    assert breaker.stats()["state"] == "open"
+
+    with pytest.raises(ConnectionError):
+        call(breaker, fail)  # trial search
+    assert breaker.stats()["opened"] == 2
+
+    assert call(breaker, ok) == "ok"
+    assert breaker.stats()["state"] == "closed"
+
+
+def test_half_open_lets_a_single_trial_search_through():
+    breaker = CircuitBreaker("Amadeus", min_calls=1, open_seconds=0)
+    with pytest.raises(ConnectionError):
+        call(breaker, fail)
+
+    async def slow_trial():
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def main():
+        return await asyncio.gather(
+            breaker.call_async(slow_trial), breaker.call_async(slow_trial), return_exceptions=True
+        )
+
+    first, second = asyncio.run(main())
+
+    assert first == "ok"
+    assert isinstance(second, CircuitOpenError)
+    assert breaker.stats()["state"] == "closed"
@@ -0,0 +1,99 @@
+import asyncio
+from src.utils.coalesce import RequestCoalescer
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    """
+    GIVEN several concurrent callers asking for the same key
+    WHEN they go through the coalescer
+    THEN the upstream function should run once and every caller gets its result.
+    """
+    coalescer = RequestCoalescer()
+    upstream_calls = []
+
+    async def upstream(value):
+        upstream_calls.append(value)
+        await asyncio.sleep(0.01)
+        return {"value": value}
+
+    async def main():
+        return await asyncio.gather(*(coalescer.run("key", upstream, 1) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert results == [{"value": 1}] * 5
+    assert upstream_calls == [1]
+    assert coalescer.stats() == {"calls": 1, "collapsed": 4, "abandoned": 0, "in_flight": 0}
+
+
+def test_different_keys_are_not_coalesced():
+    coalescer = RequestCoalescer()
+
+    async def upstream(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    async def main():
+        return await asyncio.gather(coalescer.run("a", upstream, 1), coalescer.run("b", upstream, 2))
+
+    assert asyncio.run(main()) == [1, 2]
+    assert coalescer.stats()["calls"] == 2
+    assert coalescer.stats()["collapsed"] == 0
+
+
+def test_upstream_error_is_raised_to_every_waiting_caller():
+    """
+    GIVEN the shared upstream call fails
+    WHEN several callers are waiting on it
+    THEN each of them should see the exception, and the key is released for the next call.
+    """
+    coalescer = RequestCoalescer()
+
+    async def failing_upstream():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        return await asyncio.gather(
+            *(coalescer.run("key", failing_upstream) for _ in range(3)),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert coalescer.stats()["in_flight"] == 0
+
+
+def test_abandoned_call_is_cancelled_only_when_every_caller_is_gone():
+    """
+    GIVEN a coalescer with cancel_abandoned and two callers waiting on the same call
+    WHEN the first caller is cancelled, then the second one
+    THEN the shared call keeps running for the second caller and is cancelled after it leaves.
+    """
+    coalescer = RequestCoalescer(cancel_abandoned=True)
+    upstream_cancelled = asyncio.Event()
+
+    async def slow_upstream():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            upstream_cancelled.set()
+            raise
+
+    async def main():
+        first = asyncio.ensure_future(coalescer.run("key", slow_upstream))
+        second = asyncio.ensure_future(coalescer.run("key", slow_upstream))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        await asyncio.sleep(0.01)
+        still_running = not upstream_cancelled.is_set()
+
+        second.cancel()
+        await asyncio.wait_for(upstream_cancelled.wait(), 1)
+        return still_running
+
+    assert asyncio.run(main())
+    assert coalescer.stats()["abandoned"] == 1
+    assert coalescer.stats()["in_flight"] == 0
@@ -5,8 +5,11 @@ CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 FLIGHT_APP_DIR = os.path.join(CURRENT_DIR, '..')  
 sys.path.insert(0, FLIGHT_APP_DIR)
 
+import httpx
 import pytest
 from app import app
+from src.models.flight_model import FlightFilters, FlightResponse, PriceCalendar
+from src.utils.circuit_breaker import CircuitOpenError
 from unittest.mock import patch
 from fastapi.testclient import TestClient
 
@@ -102,7 +105,7 @@ def test_post_flight_with_valid_data_returns_200_and_flight_response(
     THEN it should return status 200 and a well-structured FlightResponse in the JSON body.
     """
     # Arrange
-    mock_get_flights.return_value = mock_flight_response()
+    mock_get_flights.return_value = FlightResponse(**mock_flight_response())
 
     # Act
     response = client.post("/flight", json=valid_flight_request_payload)
@@ -128,7 +131,7 @@ def test_post_flight_with_valid_data_returns_200_and_flight_response(
 
     # Confirm the service was called with the right arguments
     mock_get_flights.assert_called_once_with(
-        "SYD", "SIN", "1", "2025-03-10", "2025-03-17", "testuser123"
+        "SYD", "SIN", "1", "2025-03-10", "2025-03-17", "testuser123", FlightFilters()
     )
 
 
@@ -151,6 +154,42 @@ def test_post_flight_service_raises_exception_returns_400(
     mock_get_flights.assert_called_once()
 
 
+@patch("app.get_flights")
+def test_post_flight_still_rate_limited_returns_429(
+    mock_get_flights, client, valid_flight_request_payload
+):
+    """
+    GIVEN Amadeus keeps answering 429 after the limiter's retries
+    WHEN the /flight endpoint is called
+    THEN the endpoint should respond with 429 and pass on the Retry-After header.
+    """
+    request = httpx.Request("GET", "https://test.api.amadeus.com/v2/shopping/flight-offers")
+    response_429 = httpx.Response(429, headers={"Retry-After": "2"}, request=request)
+    mock_get_flights.side_effect = httpx.HTTPStatusError("Too Many Requests", request=request, response=response_429)
+
+    response = client.post("/flight", json=valid_flight_request_payload)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+
+
+@patch("app.get_flights")
+def test_post_flight_with_open_circuit_returns_503(
+    mock_get_flights, client, valid_flight_request_payload
+):
+    """
+    GIVEN the Amadeus circuit breaker is open and no stale result is available
+    WHEN the /flight endpoint is called
+    THEN the endpoint should respond with 503 and a Retry-After header.
+    """
+    mock_get_flights.side_effect = CircuitOpenError("Amadeus", 12.5)
+
+    response = client.post("/flight", json=valid_flight_request_payload)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "13"
+
+
 @patch("app.get_flights")
 def test_post_flight_service_returns_empty_flights_is_still_200(
     mock_get_flights, client, valid_flight_request_payload
@@ -160,10 +199,10 @@ def test_post_flight_service_returns_empty_flights_is_still_200(
     WHEN the service returns a FlightResponse with zero results
     THEN the endpoint should respond with 200 and an empty results list.
     """
-    mock_get_flights.return_value = {
-        "user_id": "testuser123",
-        "results": []
-    }
+    mock_get_flights.return_value = FlightResponse(
+        user_id="testuser123",
+        results=[]
+    )
 
     response = client.post("/flight", json=valid_flight_request_payload)
     assert response.status_code == 200
@@ -195,3 +234,102 @@ def test_post_flight_with_missing_required_field_results_in_422(
     # but you can at least check the top-level keys or an error substring:
     assert "detail" in response.json()
     assert any("origin_loc_code" in str(err) for err in response.json()["detail"])
+
+
+@patch("app.get_flights")
+def test_post_flight_with_filters_passes_them_to_the_service(
+    mock_get_flights, client, valid_flight_request_payload
+):
+    """
+    GIVEN a request body with search filters
+    WHEN the /flight endpoint is called
+    THEN the normalized filters should be passed to get_flights.
+    """
+    mock_get_flights.return_value = FlightResponse(user_id="testuser123", results=[])
+    valid_flight_request_payload["flights"]["filters"] = {
+        "max_results": 20, "max_stops": 1, "excluded_airlines": ["xy", "AB"], "sort": "duration"
+    }
+
+    response = client.post("/flight", json=valid_flight_request_payload)
+
+    assert response.status_code == 200
+    filters = mock_get_flights.call_args.args[6]
+    assert (filters.max_results, filters.max_stops, filters.sort) == (20, 1, "duration")
+    assert filters.excluded_airlines == ["AB", "XY"]
+
+
+@pytest.mark.parametrize("filters", [
+    {"included_airlines": ["QF"], "excluded_airlines": ["SQ"]},
+    {"included_airlines": ["QANTAS"]},
+    {"max_results": 251},
+    {"sort": "cheapest"}
+])
+def test_post_flight_with_invalid_filters_results_in_422(client, valid_flight_request_payload, filters):
+    """
+    GIVEN filters Amadeus would reject or the service does not support
+    WHEN the /flight endpoint is called
+    THEN FastAPI should respond with 422 before any search is made.
+    """
+    valid_flight_request_payload["flights"]["filters"] = filters
+
+    response = client.post("/flight", json=valid_flight_request_payload)
+
+    assert response.status_code == 422
+
+
+@patch("app.get_flights")
+@patch("app.get_flexible_flights")
+def test_post_flight_with_flexible_days_uses_flexible_search(
+    mock_get_flexible_flights, mock_get_flights, client, valid_flight_request_payload
+):
+    """
+    GIVEN a request body with flexible_days
+    WHEN the /flight endpoint is called
+    THEN the flexible-date search should answer it, price calendar included.
+    """
+    mock_get_flexible_flights.return_value = FlightResponse(
+        user_id="testuser123",
+        price_calendar=PriceCalendar(
+            departure_dates=["2025-03-09", "2025-03-10", "2025-03-11"],
+            return_dates=["2025-03-16", "2025-03-17", "2025-03-18"],
+            prices=[["310", None, "305"], ["300", "290", None], [None, None, "280"]],
+            complete=False
+        )
+    )
+    valid_flight_request_payload["flights"]["flexible_days"] = 1
+
+    response = client.post("/flight", json=valid_flight_request_payload)
+
+    assert response.status_code == 200
+    assert response.json()["price_calendar"]["prices"][1] == ["300", "290", None]
+    assert mock_get_flexible_flights.call_args.args[6] == 1
+    mock_get_flights.assert_not_called()
+
+
+def test_post_flight_with_too_wide_flexible_window_results_in_422(client, valid_flight_request_payload):
+    """
+    GIVEN flexible_days above 3
+    WHEN the /flight endpoint is called
+    THEN FastAPI should respond with 422.
+    """
+    valid_flight_request_payload["flights"]["flexible_days"] = 4
+
+    response = client.post("/flight", json=valid_flight_request_payload)
+
+    assert response.status_code == 422
+
+
+def test_get_metrics_exposes_flight_cache_counters(client):
+    """
+    GIVEN the flight service is running
+    WHEN GET /metrics is called
+    THEN the flight cache hit/miss/eviction counters should be returned.
+    """
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    cache_stats = response.json()["flight_cache"]
+    for key in ("hits", "misses", "evictions", "size"):
+        assert key in cache_stats
+    assert "queue_depth" in response.json()["amadeus_limiter"]
+    assert response.json()["amadeus_breaker"]["state"] == "closed"
@@ -1,6 +1,12 @@
+import asyncio
+from datetime import date, timedelta
 import pytest
 from unittest.mock import patch
-from src.services.flight_service import get_flights
+from src.models.flight_model import FlightFilters
+from src.services.flight_service import (
+    get_flights, get_flexible_flights, get_city_from_airport, get_airports_for_city, amadeus_search_params
+)
+from src.utils.circuit_breaker import CircuitOpenError
 
 
 @pytest.fixture
@@ -74,17 +80,17 @@ def test_call_get_flights_with_valid_data_gives_correct_response_structure(
     return_date = "2025-03-17"
     user_id = "testuser123"
 
-    response = get_flights(
+    response = asyncio.run(get_flights(
         origin,
         destination,
         num_passenger,
         departure_date,
         return_date,
         user_id
-    )
+    ))
 
     mock_get_flight_data.assert_called_once_with(
-        origin, destination, num_passenger, departure_date, return_date
+        origin, destination, num_passenger, departure_date, return_date, {"max": 5}
     )
 
     assert response.user_id == user_id
@@ -117,14 +123,14 @@ def test_call_get_flights_with_no_data_returns_empty_results():
     with patch("src.services.flight_service.get_flight_data") as mock_get_flight_data:
         mock_get_flight_data.return_value = {"data": []}
 
-        response = get_flights(
+        response = asyncio.run(get_flights(
             origin_loc_code="SYD",
             destination_loc_code="SIN",
             num_passenger="1",
             departure_date="2025-03-10",
             return_date="2025-03-17",
             user_id="testuser123"
-        )
+        ))
 
         mock_get_flight_data.assert_called_once()
         assert response.user_id == "testuser123"
@@ -202,7 +208,7 @@ def test_call_get_flights_with_multiple_itineraries_returns_correct_flights(
     mock_get_flight_data.return_value = mock_data
 
     user_id = "testuser999"
-    response = get_flights("SYD", "LAX", "1", "2025-04-01", "2025-04-10", user_id)
+    response = asyncio.run(get_flights("SYD", "LAX", "1", "2025-04-01", "2025-04-10", user_id))
 
     assert response.user_id == user_id
     assert len(response.results) == 2
@@ -230,7 +236,7 @@ def test_call_get_flights_when_get_flight_data_raises_exception_propagates_error
     mock_get_flight_data.side_effect = Exception("Network error / invalid token")
 
     with pytest.raises(Exception) as excinfo:
-        get_flights("SYD", "SIN", "2", "2025-03-10", "2025-03-17", "exception_user")
+        asyncio.run(get_flights("SYD", "SIN", "2", "2025-03-10", "2025-03-17", "exception_user"))
 
     assert "Network error / invalid token" in str(excinfo.value)
     mock_get_flight_data.assert_called_once()
@@ -283,7 +289,289 @@ def test_call_get_flights_ignores_itineraries_with_more_than_three_segments(
     }
     mock_get_flight_data.return_value = mock_data
 
-    response = get_flights("XXX", "CCC", "1", "2025-01-01", "2025-01-05", "4_segments_test")
+    response = asyncio.run(get_flights("XXX", "CCC", "1", "2025-01-01", "2025-01-05", "4_segments_test"))
     mock_get_flight_data.assert_called_once()
 
     assert len(response.results) == 0, "Itinerary with 4 segments should be ignored completely."
+
+
+@patch("src.services.flight_service.get_flight_data")
+def test_call_get_flights_with_filters_pushes_supported_ones_down_and_applies_the_rest(
+    mock_get_flight_data, single_round_trip_mock_data
+):
+    """
+    GIVEN filters with a result count, an airline list, a price ceiling and a one-stop limit
+    WHEN get_flights is called
+    THEN Amadeus should get the parameters it supports, and offers with more stops should be dropped locally.
+    """
+    direct = single_round_trip_mock_data["data"][0]
+    one_stop = {
+        "price": {"base": "250"},
+        "itineraries": [{"segments": direct["itineraries"][0]["segments"] * 2}, direct["itineraries"][1]]
+    }
+    two_stops = {"price": {"base": "200"}, "itineraries": [{"segments": direct["itineraries"][0]["segments"] * 3}]}
+    mock_get_flight_data.return_value = {"data": [two_stops, one_stop, direct]}
+    filters = FlightFilters(max_results=10, max_stops=1, included_airlines=["qf"], max_price=500, sort="price")
+
+    response = asyncio.run(get_flights("SYD", "SIN", "1", "2025-03-10", "2025-03-17", "filters_test", filters))
+
+    mock_get_flight_data.assert_called_once_with(
+        "SYD", "SIN", "1", "2025-03-10", "2025-03-17",
+        {"max": 40, "includedAirlineCodes": "QF", "maxPrice": 500}
+    )
+    assert [result.FlightResponse.price_per_person for result in response.results] == ["250", "300"]
+
+
+def offer_with(base_price, stops=0, duration="PT8H"):
+    segment = {
+        "departure": {"iataCode": "SYD", "at": "2025-03-10T08:00:00"},
+        "arrival": {"iataCode": "SIN", "at": "2025-03-10T16:00:00"},
+        "carrierCode": "QF",
+        "number": "1",
+        "duration": duration,
+        "id": base_price
+    }
+    return {"price": {"base": base_price}, "itineraries": [{"duration": duration, "segments": [segment] * (stops + 1)}]}
+
+
+@patch("src.services.flight_service.get_flight_data")
+def test_call_get_flights_sorted_by_duration_over_fetches_a_few_offers(mock_get_flight_data):
+    """
+    GIVEN a shortest offer that is not among the max_results cheapest ones Amadeus lists first
+    WHEN get_flights is called with sort="duration" and max_results=2
+    THEN LOCAL_FILTER_OVERFETCH times max_results offers should be requested and the shortest returned first.
+    """
+    mock_get_flight_data.return_value = {"data": [
+        offer_with("100", duration="PT20H"), offer_with("200", duration="PT18H"),
+        offer_with("300", duration="PT12H"), offer_with("400", duration="PT8H")
+    ]}
+
+    response = asyncio.run(get_flights(
+        "SYD", "SIN", "1", "2025-03-10", "2025-03-17", "duration_user", FlightFilters(max_results=2, sort="duration")
+    ))
+
+    mock_get_flight_data.assert_called_once_with("SYD", "SIN", "1", "2025-03-10", "2025-03-17", {"max": 8})
+    assert [result.FlightResponse.price_per_person for result in response.results] == ["400", "300"]
+
+
+@patch("src.services.flight_service.get_flight_data")
+def test_call_get_flights_requests_more_offers_when_the_stop_limit_leaves_too_few(mock_get_flight_data):
+    """
+    GIVEN Amadeus listing 8 offers, only one of them with at most one stop, and more offers behind them
+    WHEN get_flights is called with max_stops=1 and max_results=2
+    THEN the search should be repeated once for up to 250 offers and the matching ones returned.
+    """
+    first_page = {"data": [offer_with("100")] + [offer_with(str(200 + i), stops=2) for i in range(7)]}
+    full_results = {"data": first_page["data"] + [offer_with("900", stops=1)]}
+    mock_get_flight_data.side_effect = [first_page, full_results]
+
+    response = asyncio.run(get_flights(
+        "SYD", "SIN", "1", "2025-03-10", "2025-03-17", "stops_user", FlightFilters(max_results=2, max_stops=1)
+    ))
+
+    assert [call.args[5] for call in mock_get_flight_data.call_args_list] == [{"max": 8}, {"max": 250}]
+    assert [result.FlightResponse.price_per_person for result in response.results] == ["100", "900"]
+
+
+@patch("src.services.flight_service.get_flight_data")
+def test_call_get_flights_does_not_repeat_a_search_amadeus_had_no_more_offers_for(mock_get_flight_data):
+    mock_get_flight_data.return_value = {"data": [offer_with("100"), offer_with("200", stops=2)]}
+
+    response = asyncio.run(get_flights(
+        "SYD", "SIN", "1", "2025-03-10", "2025-03-17", "stops_user", FlightFilters(max_results=2, max_stops=1)
+    ))
+
+    mock_get_flight_data.assert_called_once()
+    assert len(response.results) == 1
+
+
+def test_amadeus_search_params_maps_non_stop_and_excluded_airlines():
+    """
+    GIVEN a zero-stop limit and excluded airlines
+    WHEN amadeus_search_params is called
+    THEN nonStop and excludedAirlineCodes should be set.
+    """
+    params = amadeus_search_params(FlightFilters(max_stops=0, excluded_airlines=["SQ", "EK"]))
+
+    assert params == {"max": 5, "nonStop": "true", "excludedAirlineCodes": "EK,SQ"}
+    assert amadeus_search_params(FlightFilters(max_stops=2))["max"] == 20
+    assert amadeus_search_params(FlightFilters(max_results=100, sort="duration"))["max"] == 250
+    assert amadeus_search_params(FlightFilters(sort="price"))["max"] == 5
+
+
+def future_date(days: int) -> str:
+    return (date.today() + timedelta(days=days)).isoformat()
+
+
+def priced_offer(departure: str, ret: str, price: str) -> dict:
+    def segment(origin, destination, day):
+        return {
+            "departure": {"iataCode": origin, "at": f"{day}T08:00:00"},
+            "arrival": {"iataCode": destination, "at": f"{day}T14:00:00"},
+            "carrierCode": "QF", "number": "81", "duration": "PT8H"
+        }
+    return {
+        "price": {"base": price},
+        "itineraries": [{"segments": [segment("SYD", "SIN", departure)]}, {"segments": [segment("SIN", "SYD", ret)]}]
+    }
+
+
+@patch("src.services.flight_service.get_flight_data")
+def test_get_flexible_flights_builds_price_calendar_and_cheapest_offers(mock_get_flight_data):
+    """
+    GIVEN a one day flexible window where every date pair has one offer
+    WHEN get_flexible_flights is called
+    THEN every searchable pair should be searched once, the calendar holds each pair's price,
+         and the results are the cheapest offers across the window.
+    """
+    departure, ret = future_date(30), future_date(37)
+
+    async def fake_search(origin, destination, passengers, departure_date, return_date, params):
+        price = str(100 + int(departure_date[-2:]) + int(return_date[-2:]))
+        return {"data": [priced_offer(departure_date, return_date, price)]}
+
+    mock_get_flight_data.side_effect = fake_search
+
+    response = asyncio.run(get_flexible_flights(
+        "SYD", "SIN", "1", departure, ret, "flexible_user", 1, FlightFilters(max_results=3)
+    ))
+
+    calendar = response.price_calendar
+    assert mock_get_flight_data.call_count == 9
+    assert calendar.departure_dates == [future_date(29), departure, future_date(31)]
+    assert calendar.return_dates == [future_date(36), ret, future_date(38)]
+    assert calendar.complete
+    assert calendar.prices[1][1] == str(100 + int(departure[-2:]) + int(ret[-2:]))
+
+    prices = [float(result.FlightResponse.price_per_person) for result in response.results]
+    all_prices = sorted(float(price) for row in calendar.prices for price in row)
+    assert prices == all_prices[:3]
+
+
+@patch("src.services.flight_service.get_flight_data")
+def test_get_flexible_flights_cancels_searches_still_running_at_the_deadline(mock_get_flight_data):
+    """
+    GIVEN one date pair whose search never finishes
+    WHEN get_flexible_flights is called with a short deadline
+    THEN that search should be cancelled, its calendar cell left empty and the calendar marked incomplete.
+    """
+    departure, ret = future_date(30), future_date(31)
+    cancelled = []
+
+    async def fake_search(origin, destination, passengers, departure_date, return_date, params):
+        if departure_date == departure and return_date == ret:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append((departure_date, return_date))
+                raise
+        return {"data": [priced_offer(departure_date, return_date, "300")]}
+
+    mock_get_flight_data.side_effect = fake_search
+
+    response = asyncio.run(get_flexible_flights(
+        "SYD", "SIN", "1", departure, ret, "deadline_user", 1, deadline=0.1
+    ))
+
+    calendar = response.price_calendar
+    assert cancelled == [(departure, ret)]
+    assert not calendar.complete
+    assert calendar.prices[1][1] is None
+    assert calendar.prices[1][2] == "300"
+    assert calendar.prices[2][0] is None  # return before departure, never searched
+    assert len(response.results) == 5
+
+
+@patch("src.services.flight_service.get_flight_data")
+def test_get_flexible_flights_skips_impossible_pairs_before_searching(mock_get_flight_data):
+    """
+    GIVEN a one day window around a departure tomorrow and a return the same day
+    WHEN get_flexible_flights is called
+    THEN only pairs departing from today on and returning on or after the departure should be searched.
+    """
+    searched = []
+
+    async def fake_search(origin, destination, passengers, departure_date, return_date, params):
+        searched.append((departure_date, return_date))
+        return {"data": [priced_offer(departure_date, return_date, "300")]}
+
+    mock_get_flight_data.side_effect = fake_search
+
+    response = asyncio.run(get_flexible_flights(
+        "SYD", "SIN", "1", future_date(1), future_date(1), "same_day_user", 1
+    ))
+
+    assert sorted(searched) == [
+        (future_date(0), future_date(0)), (future_date(0), future_date(1)), (future_date(0), future_date(2)),
+        (future_date(1), future_date(1)), (future_date(1), future_date(2)),
+        (future_date(2), future_date(2))
+    ]
+    assert response.price_calendar.prices[2][0] is None
+    assert response.price_calendar.complete
+
+
+@patch("src.services.flight_service.FLEXIBLE_SEARCH_CONCURRENCY", 3)
+@patch("src.services.flight_service.get_flight_data")
+def test_get_flexible_flights_bounds_concurrent_searches_and_requests_max_results(mock_get_flight_data):
+    """
+    GIVEN a three day window (49 date pairs), a concurrency of 3 and a stop limit applied locally
+    WHEN get_flexible_flights is called
+    THEN at most 3 searches should run at once, and each asks Amadeus for max_results offers only.
+    """
+    running, peak, params_seen = 0, 0, []
+
+    async def fake_search(origin, destination, passengers, departure_date, return_date, params):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        params_seen.append(params)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return {"data": [priced_offer(departure_date, return_date, "300")]}
+
+    mock_get_flight_data.side_effect = fake_search
+
+    asyncio.run(get_flexible_flights(
+        "SYD", "SIN", "1", future_date(30), future_date(40), "bounded_user", 3, FlightFilters(max_stops=1)
+    ))
+
+    assert mock_get_flight_data.call_count == 49
+    assert peak == 3
+    assert all(params == {"max": 5} for params in params_seen)
+
+
+@patch("src.services.flight_service.get_flight_data")
+def test_get_flexible_flights_raises_when_every_search_fails(mock_get_flight_data):
+    """
+    GIVEN Amadeus failing for every date pair
+    WHEN get_flexible_flights is called
+    THEN the error should be raised like for a single search.
+    """
+    mock_get_flight_data.side_effect = CircuitOpenError("Amadeus", 30)
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(get_flexible_flights("SYD", "SIN", "1", future_date(30), future_date(37), "failing_user", 2))
+
+    assert mock_get_flight_data.call_count == 25
+
+
+def test_get_city_from_airport_uses_index_and_falls_back_to_unknown():
+    """
+    GIVEN the airport index built at startup
+    WHEN get_city_from_airport is called with known and unknown IATA codes
+    THEN it should return the mapped city, or "Unknown" if the code is not indexed.
+    """
+    assert get_city_from_airport("LHR") == "London"
+    assert get_city_from_airport("XXX") == "Unknown"
+
+
+def test_get_airports_for_city_returns_all_airports_for_city():
+    """
+    GIVEN the reverse city -> airports index
+    WHEN get_airports_for_city is called
+    THEN every airport mapped to that city should be returned, and unknown cities give an empty tuple.
+    """
+    airports = get_airports_for_city("London")
+    assert "LHR" in airports
+    assert "LCY" in airports
+    assert get_airports_for_city("Atlantis") == ()
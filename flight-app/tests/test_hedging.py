@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from src.utils.hedging import HedgingPolicy
+
+
+def test_slow_call_is_hedged_and_the_faster_response_wins():
+    """
+    GIVEN a hedging policy with a 10 ms delay and a first call that hangs
+    WHEN the call is run through the policy
+    THEN a second call is sent, its response is returned and the first call is cancelled.
+    """
+    policy = HedgingPolicy(enabled=True, initial_delay=0.01, budget=1.0)
+    attempts, cancelled = [], []
+
+    async def call():
+        attempt = len(attempts)
+        attempts.append(attempt)
+        try:
+            await asyncio.sleep(1 if attempt == 0 else 0)
+        except asyncio.CancelledError:
+            cancelled.append(attempt)
+            raise
+        return f"response {attempt}"
+
+    async def main():
+        result = await policy.run(call)
+        await asyncio.sleep(0)  # let the cancellation reach the first call
+        return result
+
+    assert asyncio.run(main()) == "response 1"
+    assert cancelled == [0]
+    assert policy.stats()["fired"] == 1
+    assert policy.stats()["won"] == 1
+
+
+def test_fast_call_is_not_hedged():
+    policy = HedgingPolicy(enabled=True, initial_delay=1, budget=1.0)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        return "ok"
+
+    assert asyncio.run(policy.run(call)) == "ok"
+    assert len(attempts) == 1
+    assert policy.stats()["fired"] == 0
+
+
+def test_hedges_stay_within_budget():
+    """
+    GIVEN a 10% hedging budget and calls that are all slower than the hedging delay
+    WHEN 20 calls are run
+    THEN only 2 of them are hedged.
+    """
+    policy = HedgingPolicy(enabled=True, initial_delay=0.001, budget=0.1, min_samples=100)
+
+    async def call():
+        await asyncio.sleep(0.005)
+        return "ok"
+
+    async def main():
+        for _ in range(20):
+            await policy.run(call)
+
+    asyncio.run(main())
+
+    assert policy.stats()["fired"] == 2
+    assert policy.stats()["budget_exceeded"] == 18
+
+
+def test_failed_hedge_falls_back_to_the_first_call():
+    policy = HedgingPolicy(enabled=True, initial_delay=0.01, budget=1.0)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) == 2:
+            raise ConnectionError("hedge failed")
+        await asyncio.sleep(0.03)
+        return "first"
+
+    assert asyncio.run(policy.run(call)) == "first"
+    assert policy.stats()["won"] == 0
+
+
+def test_error_of_first_call_is_raised_when_both_fail():
+    policy = HedgingPolicy(enabled=True, initial_delay=0.01, budget=1.0)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        await asyncio.sleep(0.02 if len(attempts) == 1 else 0)
+        raise ConnectionError(f"call {len(attempts)} failed")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(policy.run(call))
+    assert len(attempts) == 2
+
+
+def test_delay_follows_the_latency_percentile():
+    policy = HedgingPolicy(enabled=True, percentile=90, initial_delay=5, min_delay=0, min_samples=10)
+    assert policy.delay() == 5
+
+    policy._latencies.extend(i / 100 for i in range(1, 101))
+
+    assert policy.delay() == 0.9
@@ -0,0 +1,140 @@
+import logging
+import pytest
+from src.services.offer_parser import parse_offers, to_flight_response, SegmentRecord
+
+AIRPORT_TO_CITY = {"SYD": "Sydney", "SIN": "Singapore"}
+
+
+def make_segment(origin="SYD", destination="SIN", at="2025-03-10T08:00:00", arrive="2025-03-10T14:00:00"):
+    return {
+        "departure": {"iataCode": origin, "at": at},
+        "arrival": {"iataCode": destination, "at": arrive},
+        "carrierCode": "QF",
+        "number": "81",
+        "duration": "PT8H"
+    }
+
+
+def make_offer(outbound=None, inbound=None, price="300"):
+    offer = {"itineraries": [{"segments": outbound or [make_segment()]}]}
+    if inbound is not None:
+        offer["itineraries"].append({"segments": inbound})
+    if price is not None:
+        offer["price"] = {"base": price}
+    return offer
+
+
+def test_parse_offers_with_round_trip_gives_slotted_records():
+    """
+    GIVEN an offer with one outbound and one inbound segment
+    WHEN parse_offers is called
+    THEN one record is returned with the segment fields extracted and cities resolved
+    """
+    inbound = [make_segment("SIN", "SYD", "2025-03-17T10:00:00", "2025-03-17T20:00:00")]
+    records = parse_offers([make_offer(inbound=inbound)], "2025-03-10", AIRPORT_TO_CITY)
+
+    assert len(records) == 1
+    outbound = records[0].outbound[0]
+    assert records[0].price_per_person == "300"
+    assert (outbound.departure_date, outbound.departure_time) == ("2025-03-10", "08:00")
+    assert (outbound.arrival_date, outbound.arrival_time) == ("2025-03-10", "14:00")
+    assert outbound.duration == "8H"
+    assert (outbound.departure_city, outbound.destination_city) == ("Sydney", "Singapore")
+    assert outbound.unique_id == "QF812025-03-1008:00"
+    assert records[0].inbound[0].departure_airport == "SIN"
+    with pytest.raises(AttributeError):
+        outbound.extra = "no __dict__ on slotted records"
+
+
+def test_parse_offers_with_invalid_offers_skips_them():
+    """
+    GIVEN an offer without a price, an offer with 4 segments and a valid offer
+    WHEN parse_offers is called
+    THEN only the valid offer is returned
+    """
+    offers = [make_offer(price=None), make_offer(outbound=[make_segment()] * 4), make_offer(price="120")]
+
+    records = parse_offers(offers, "2025-03-10", AIRPORT_TO_CITY)
+
+    assert [record.price_per_person for record in records] == ["120"]
+
+
+def test_parse_offers_with_invalid_segment_skips_only_that_segment():
+    """
+    GIVEN an offer with a segment without a 'T' in its timestamp and a segment without duration
+    WHEN parse_offers is called
+    THEN both segments are skipped and the offer keeps its valid segment
+    """
+    bad_timestamp = make_segment(at="2025-03-10 08:00:00")
+    no_duration = make_segment()
+    del no_duration["duration"]
+
+    records = parse_offers([make_offer(outbound=[bad_timestamp, no_duration, make_segment()])], "2025-03-10", {})
+
+    assert len(records[0].outbound) == 1
+    assert records[0].outbound[0].departure_city == "Unknown"
+
+
+def test_parse_offers_with_debug_disabled_does_not_format_offers(caplog):
+    """
+    GIVEN the logger level above DEBUG
+    WHEN parse_offers is called
+    THEN the offers are never formatted for the debug log
+    """
+    class Unformattable(dict):
+        def __repr__(self):
+            raise AssertionError("offer was formatted")
+
+    offer = Unformattable(make_offer())
+    with caplog.at_level(logging.INFO, logger="flight_microservice"):
+        records = parse_offers([offer], "2025-03-10", AIRPORT_TO_CITY)
+
+    assert len(records) == 1
+
+
+def test_to_flight_response_gives_validated_response():
+    """
+    GIVEN parsed offers
+    WHEN to_flight_response is called for 2 passengers
+    THEN a FlightResponse is built with segment counts, passengers and total price
+    """
+    records = parse_offers([make_offer(inbound=[make_segment("SIN", "SYD")], price="300.5")], "2025-03-10", AIRPORT_TO_CITY)
+
+    response = to_flight_response("user-1", records, 2)
+
+    flight = response.results[0].FlightResponse
+    assert response.user_id == "user-1"
+    assert flight.number_of_segments == 2
+    assert flight.total_price == "601.00"
+    assert flight.outbound[0].SegmentResponse.num_passengers == 2
+    assert isinstance(records[0].outbound[0], SegmentRecord)
+
+
+def test_parse_offers_with_max_segments_and_duration_sort_orders_kept_offers():
+    """
+    GIVEN a one-stop offer and two direct offers with different itinerary durations
+    WHEN parse_offers is called with max_segments=1, sort='duration' and limit=1
+    THEN the one-stop offer is dropped and only the shortest direct offer is returned
+    """
+    slow = make_offer(price="100")
+    slow["itineraries"][0]["duration"] = "PT1D2H"
+    fast = make_offer(price="200")
+    fast["itineraries"][0]["duration"] = "PT8H5M"
+    one_stop = make_offer(outbound=[make_segment(), make_segment()], price="50")
+
+    records = parse_offers([one_stop, slow, fast], "2025-03-10", AIRPORT_TO_CITY, max_segments=1, sort="duration", limit=1)
+
+    assert [(record.price_per_person, record.duration_minutes) for record in records] == [("200", 485)]
+
+
+def test_parse_offers_without_sort_stops_at_limit():
+    """
+    GIVEN more offers than the limit, the first of them invalid
+    WHEN parse_offers is called with limit=2 and no sort
+    THEN the first two valid offers are returned in upstream order
+    """
+    offers = [make_offer(price=None)] + [make_offer(price=str(price)) for price in (300, 100, 200)]
+
+    records = parse_offers(offers, "2025-03-10", AIRPORT_TO_CITY, limit=2)
+
+    assert [record.price_per_person for record in records] == ["300", "100"]
@@ -0,0 +1,156 @@
+import asyncio
+import time
+import httpx
+import pytest
+from src.utils.rate_limit import AdaptiveConcurrencyLimit, TokenBucket, UpstreamLimiter, retry_after_seconds
+
+
+def test_token_bucket_spaces_out_requests_beyond_the_burst():
+    """
+    GIVEN a bucket allowing 50 requests per second with a burst of 2
+    WHEN 5 requests are made at once
+    THEN the first 2 pass immediately and the other 3 wait their turn (about 60 ms in total).
+    """
+    bucket = TokenBucket(rate=50, burst=2)
+
+    async def main():
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(main())
+
+    assert 0.05 <= elapsed < 0.5
+    assert bucket.stats()["delayed"] == 3
+    assert bucket.stats()["queued"] == 0
+
+
+def test_token_bucket_pause_holds_back_every_caller():
+    bucket = TokenBucket(rate=1000, burst=10)
+    started = time.monotonic()  # before pause(), so the measured wait covers the whole pause
+    bucket.pause(0.05)
+
+    async def main():
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) >= 0.05
+
+
+def test_adaptive_limit_halves_on_overload_and_grows_back_additively():
+    """
+    GIVEN a concurrency limit of 8
+    WHEN a request is throttled and then requests succeed
+    THEN the limit is halved once and then grows by 1/limit per success, up to the maximum.
+    """
+    limit = AdaptiveConcurrencyLimit(max_limit=8, latency_target=1.0)
+
+    async def complete(latency, overloaded=False):
+        await limit.acquire()
+        limit.release(latency, overloaded)
+
+    asyncio.run(complete(0.1, overloaded=True))
+    assert limit.limit == 4
+
+    asyncio.run(complete(2.0))  # slower than the latency target counts as overload too
+    assert limit.limit == 2
+
+    for _ in range(4):
+        asyncio.run(complete(0.1))
+    assert 3 < limit.limit < 4
+
+    for _ in range(100):
+        asyncio.run(complete(0.1))
+    assert limit.limit == 8
+    assert limit.stats()["decreases"] == 2
+
+
+def test_adaptive_limit_queues_callers_over_the_limit():
+    limit = AdaptiveConcurrencyLimit(max_limit=2)
+    in_flight, peak = 0, 0
+
+    async def request():
+        nonlocal in_flight, peak
+        await limit.acquire()
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        limit.release(0.01)
+
+    async def main():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(main())
+
+    assert peak == 2
+    assert limit.stats()["in_flight"] == 0
+    assert limit.stats()["queued"] == 0
+
+
+def test_retry_after_seconds_reads_delay_and_http_date():
+    request = httpx.Request("GET", "https://example.com")
+
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "2"}, request=request)) == 2.0
+    assert retry_after_seconds(httpx.Response(429, request=request)) is None
+    http_date = retry_after_seconds(
+        httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, request=request)
+    )
+    assert http_date == 0.0  # a date in the past means retry now
+
+
+def test_upstream_limiter_retries_429_until_the_upstream_recovers():
+    """
+    GIVEN an upstream answering 429 twice, the first time with Retry-After, then 200
+    WHEN a request is sent through the limiter
+    THEN it is retried until it succeeds and the throttle events are counted.
+    """
+    limiter = UpstreamLimiter(rate=0, burst=1, max_concurrency=4, backoff_base=0.001)
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0.01"}),
+        httpx.Response(429),
+        httpx.Response(200, json={"data": []})
+    ]
+
+    async def request():
+        return responses.pop(0)
+
+    response = asyncio.run(limiter.send(request))
+
+    assert response.status_code == 200
+    stats = limiter.stats()
+    assert (stats["requests"], stats["throttled"], stats["retries"]) == (3, 2, 2)
+    assert stats["concurrency"]["limit"] < 4
+
+
+def test_upstream_limiter_gives_up_after_max_retries():
+    limiter = UpstreamLimiter(rate=0, burst=1, max_concurrency=4, max_retries=1, backoff_base=0.001)
+
+    async def request():
+        return httpx.Response(429)
+
+    assert asyncio.run(limiter.send(request)).status_code == 429
+    assert limiter.stats()["requests"] == 2
+
+
+def test_upstream_limiter_does_not_wait_for_a_long_retry_after():
+    limiter = UpstreamLimiter(rate=0, burst=1, max_concurrency=4, backoff_max=1)
+
+    async def request():
+        return httpx.Response(429, headers={"Retry-After": "60"})
+
+    assert asyncio.run(limiter.send(request)).status_code == 429
+    assert limiter.stats()["retries"] == 0
+
+
+def test_upstream_limiter_releases_its_slot_when_the_request_fails():
+    limiter = UpstreamLimiter(rate=0, burst=1, max_concurrency=1)
+
+    async def request():
+        raise httpx.ConnectError("connection refused")
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(limiter.send(request))
+
+    assert limiter.stats()["concurrency"]["in_flight"] == 0
+    assert limiter.stats()["concurrency"]["limit"] == 1
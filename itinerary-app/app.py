@@ -1,33 +1,84 @@
-from fastapi import FastAPI, HTTPException
-from typing import List
-from src.models.itinerary_model import ItineraryRequest, ItineraryResponse
-from src.services.itinerary_service import get_city_activities
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from src.models.itinerary_model import ItineraryRequest, ItineraryResponse, ItineraryBatchRequest, ItineraryBatchResponse
+from src.services.itinerary_service import get_city_activities, stream_city_activities, get_batch_city_activities
+from src.utils import api_client
+from src.utils.api_refresh_token import start_token_refresher, stop_token_refresher
+from src.utils.circuit_breaker import CircuitOpenError
 from src.utils.configure_logging import configure_logging
 import logging
+import math
 
 configure_logging()
 logger = logging.getLogger("itinerary_microservice")
 
-app = FastAPI()
 
-# endpoint to fetch activities for the given user_id, city, radius, limit
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # renew the Amadeus token in the background, before requests find it expired
+    start_token_refresher()
+    api_client.open_clients()
+    api_client.open_geocode_cache()
+    yield
+    await api_client.close_clients()
+    api_client.close_geocode_cache()
+    stop_token_refresher()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# endpoint to fetch activities for the given user_id, city, radius, limit (page size) and cursor
+# (with "Accept: application/x-ndjson" the page is streamed one activity per line)
 @app.post("/itinerary", response_model=ItineraryResponse)  # Use POST method here
-async def fetch_itinerary(request: ItineraryRequest):
+async def fetch_itinerary(request: ItineraryRequest, accept: Optional[str] = Header(None)):
     try:
         city = request.itinerary.city
         radius = request.itinerary.radius
         limit = request.itinerary.limit
+        cursor = request.itinerary.cursor
+
+        if accept and "application/x-ndjson" in accept:
+            logger.info(f"Streaming activities for city: {city}")
+            lines = await stream_city_activities(request.user_id, city, radius, limit, cursor)
+            return StreamingResponse(lines, media_type="application/x-ndjson")
 
         logger.info(f"Fetching activities for city: {city}")
-        activities = get_city_activities(request.user_id, city, radius, limit)
+        activities = await get_city_activities(request.user_id, city, radius, limit, cursor)
         logger.info(f"Itinerary data fetched successfully for city: {city}")
 
         return activities
-    
+
+    except CircuitOpenError as e:
+        logger.warning(f"Error fetching itinerary data: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
     except Exception as e:
         logger.error(f"Error fetching itinerary data: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+# endpoint to fetch activities for several cities in one call, with a status/error per city
+@app.post("/itinerary/batch", response_model=ItineraryBatchResponse)
+async def fetch_itinerary_batch(request: ItineraryBatchRequest):
+    logger.info(f"Fetching activities for {len(request.itineraries)} cities")
+    return await get_batch_city_activities(request.user_id, request.itineraries)
+
+# cache, coalescing (collapsed = lookups that reused an in-flight call), Amadeus limiter, circuit breaker and hedging counters
+@app.get("/metrics")
+async def metrics():
+    return {
+        "geocode_cache": api_client.geocode_cache.stats(),
+        "activities_cache": api_client.activities_cache.stats(),
+        "geocode_coalescer": api_client.geocode_coalescer.stats(),
+        "activities_coalescer": api_client.activities_coalescer.stats(),
+        "amadeus_limiter": api_client.amadeus_limiter.stats(),
+        "activities_fallback_cache": api_client.activities_fallback_cache.stats(),
+        "openweather_breaker": api_client.openweather_breaker.stats(),
+        "amadeus_breaker": api_client.amadeus_breaker.stats(),
+        "openweather_hedging": api_client.openweather_hedging.stats(),
+        "amadeus_hedging": api_client.amadeus_hedging.stats()
+    }
+
 # @app.get("/itinerary", response_model=ItineraryResponse)
 # async def fetch_itinerary(user_id: str, city: str, radius: int = 10, limit: int = 5):
 #     try:
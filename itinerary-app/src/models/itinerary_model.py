@@ -1,17 +1,24 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
+MAX_BATCH_CITIES = 10
+
 
 # request model for endpoint
 class ItineraryRequestObj(BaseModel):
     city: str
     radius: int
-    limit: int
+    limit: int                      # page size
+    cursor: Optional[str] = None    # next_cursor of the previous page
 
 class ItineraryRequest(BaseModel):
     user_id: str
     itinerary: ItineraryRequestObj
 
+class ItineraryBatchRequest(BaseModel):
+    user_id: str
+    itineraries: List[ItineraryRequestObj] = Field(..., min_length=1, max_length=MAX_BATCH_CITIES)
+
 # response model for endpoint
 class ItineraryResponseObj(BaseModel):
     city: str
@@ -24,4 +31,17 @@ class ItineraryResponseObj(BaseModel):
 
 class ItineraryResponse(BaseModel):
     user_id: str
-    results: List[ItineraryResponseObj]
\ No newline at end of file
+    results: List[ItineraryResponseObj]
+    next_cursor: Optional[str] = None  # None on the last page
+
+# per-city result of the batch endpoint (results on success, error otherwise)
+class ItineraryBatchItem(BaseModel):
+    city: str
+    status_code: int
+    results: List[ItineraryResponseObj] = []
+    next_cursor: Optional[str] = None
+    error: Optional[str] = None
+
+class ItineraryBatchResponse(BaseModel):
+    user_id: str
+    items: List[ItineraryBatchItem]
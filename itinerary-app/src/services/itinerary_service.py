@@ -1,50 +1,149 @@
 from ..utils.api_client import get_city_geocode, get_activities
-from ..models.itinerary_model import ItineraryResponseObj, ItineraryResponse
+from ..models.itinerary_model import (
+    ItineraryResponseObj, ItineraryResponse, ItineraryRequestObj, ItineraryBatchItem, ItineraryBatchResponse
+)
 from ..utils.configure_logging import configure_logging
+from ..utils.circuit_breaker import CircuitOpenError
+from typing import AsyncIterator, List, Optional, Tuple, Union
+import asyncio
+import base64
+import httpx
+import json
 import logging
 
 configure_logging()
 logger = logging.getLogger("itinerary_microservice")
 
-def get_city_activities(user_id: str, city_name: str, radius: int, limit: int = 10) -> ItineraryResponse:
-    logger.info(f"Fetching city activities for user: {user_id}, city: {city_name}, radius: {radius}, limit: {limit}")
+def encode_cursor(offset: int) -> str:
+    """Opaque pagination cursor pointing at the given offset in the activity list."""
+    return base64.urlsafe_b64encode(f"offset:{offset}".encode()).decode()
 
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
     try:
-        logger.debug(f"Calling get_city_geocode for city: {city_name}")
-        latitude, longitude = get_city_geocode(city_name)
-
-        if latitude == None or longitude == None:
-            logger.warning(f"Could not find geocode for city: {city_name}")
-            return {"error": f"Could not find geocode for city: {city_name}"}
-        logger.debug(f"Geocode found: latitude={latitude}, longitude={longitude}")
-        
-        logger.debug(f"Calling get_activities with lat={latitude}, long={longitude}, radius={radius}")
-        data = get_activities(latitude, longitude, radius)
-        if not data or "data" not in data:
-            logger.error(f"get_activities returned empty data for city: {city_name}")
-            return {"error": f"No activities found for city: {city_name}"}
-
-        # limit num activities returned to given limits
-        limited_data = data.get("data", [])[:limit]
-        logger.debug(f"Retrieved {len(limited_data)} activities (limit: {limit})")
-
-        itinerary_responses = []
-        for activity in limited_data:
-            pic = activity.get("pictures", [])
-
-            itinerary_responses.append(ItineraryResponseObj(
-                city = city_name,
-                activity_id = activity.get("id", "None"),
-                activity_name = activity.get("name", "No name available"),
-                activity_details = activity.get("shortDescription", "No description available"),
-                price_amount = activity.get("price", {}).get("amount", "0.0"),
-                price_currency = activity.get("price", {}).get("currencyCode", "EUR"),
-                pictures = pic[0] if pic else ""
-            ))
-
-        logger.info(f"get_activities successful for city geoCode: {latitude}, {longitude}")
-        return ItineraryResponse(user_id=user_id, results=itinerary_responses)
+        prefix, offset = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        if prefix != "offset" or int(offset) < 0:
+            raise ValueError
+        return int(offset)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def to_itinerary(city_name: str, activity: dict) -> ItineraryResponseObj:
+    pic = activity.get("pictures", [])
+
+    return ItineraryResponseObj(
+        city = city_name,
+        activity_id = activity.get("id", "None"),
+        activity_name = activity.get("name", "No name available"),
+        activity_details = activity.get("shortDescription", "No description available"),
+        price_amount = activity.get("price", {}).get("amount", "0.0"),
+        price_currency = activity.get("price", {}).get("currencyCode", "EUR"),
+        pictures = pic[0] if pic else ""
+    )
+
+async def get_activity_page(city_name: str, radius: int, limit: int, offset: int = 0) -> Union[Tuple[List[dict], Optional[str]], dict]:
+    """
+    Page of raw Amadeus activities for the city, starting at offset, with the cursor of the next page
+    (None on the last page). The activity list comes from the activities cache, so later pages
+    do not call Amadeus again. Returns a dict with an "error" key when the city or its activities cannot be found.
+    """
+    logger.debug(f"Calling get_city_geocode for city: {city_name}")
+    latitude, longitude = await get_city_geocode(city_name)
+
+    if latitude == None or longitude == None:
+        logger.warning(f"Could not find geocode for city: {city_name}")
+        return {"error": f"Could not find geocode for city: {city_name}"}
+    logger.debug(f"Geocode found: latitude={latitude}, longitude={longitude}")
     
+    logger.debug(f"Calling get_activities with lat={latitude}, long={longitude}, radius={radius}")
+    data = await get_activities(latitude, longitude, radius)
+    if not data or "data" not in data:
+        logger.error(f"get_activities returned empty data for city: {city_name}")
+        return {"error": f"No activities found for city: {city_name}"}
+
+    # limit num activities returned to given page size
+    activities = data.get("data", [])
+    page = activities[offset:offset + limit]
+    next_cursor = encode_cursor(offset + limit) if limit > 0 and offset + limit < len(activities) else None
+    logger.debug(f"Retrieved {len(page)} activities (offset: {offset}, limit: {limit}, total: {len(activities)})")
+
+    logger.info(f"get_activities successful for city geoCode: {latitude}, {longitude}")
+    return page, next_cursor
+
+async def get_city_activities(user_id: str, city_name: str, radius: int, limit: int = 10, cursor: Optional[str] = None) -> ItineraryResponse:
+    logger.info(f"Fetching city activities for user: {user_id}, city: {city_name}, radius: {radius}, limit: {limit}")
+    offset = decode_cursor(cursor)  # an invalid cursor is the caller's error, raised as ValueError
+
+    try:
+        page = await get_activity_page(city_name, radius, limit, offset)
+        if isinstance(page, dict):
+            return page
+
+        activities, next_cursor = page
+        itinerary_responses = [to_itinerary(city_name, activity) for activity in activities]
+        return ItineraryResponse(user_id=user_id, results=itinerary_responses, next_cursor=next_cursor)
+
+    except CircuitOpenError:
+        raise  # an upstream is failing and there is nothing cached to fall back on: let the caller answer 503
     except Exception as e:
         logger.exception(f"Unexpected error while fetching city activities for {city_name}: {e}")
         return {"error": "An internal error occurred while processing your request."}
+
+async def stream_city_activities(user_id: str, city_name: str, radius: int, limit: int = 10, cursor: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    NDJSON lines for a page of activities: one ItineraryResponseObj per line as soon as it is built,
+    then a final {"user_id", "next_cursor"} line.
+    The page is fetched before the first line, so errors are raised before streaming starts.
+    """
+    logger.info(f"Streaming city activities for user: {user_id}, city: {city_name}, radius: {radius}, limit: {limit}")
+
+    page = await get_activity_page(city_name, radius, limit, decode_cursor(cursor))
+    if isinstance(page, dict):
+        raise ValueError(page["error"])
+    activities, next_cursor = page
+
+    async def lines():
+        for activity in activities:
+            yield to_itinerary(city_name, activity).model_dump_json() + "\n"
+        yield json.dumps({"user_id": user_id, "next_cursor": next_cursor}) + "\n"
+
+    return lines()
+
+async def get_city_activities_item(request: ItineraryRequestObj) -> ItineraryBatchItem:
+    """One city of a batch: its page of activities, or the error that city ran into."""
+    city_name = request.city
+    try:
+        page = await get_activity_page(city_name, request.radius, request.limit, decode_cursor(request.cursor))
+    except ValueError as e:
+        return ItineraryBatchItem(city=city_name, status_code=400, error=str(e))
+    except CircuitOpenError as e:
+        logger.warning(f"Fast-failing activities for {city_name}: {e}")
+        return ItineraryBatchItem(city=city_name, status_code=503, error=str(e))
+    except httpx.HTTPStatusError as e:
+        logger.warning(f"Upstream error while fetching activities for {city_name}: {e}")
+        return ItineraryBatchItem(city=city_name, status_code=502, error=f"Upstream error: {e.response.status_code}")
+    except Exception as e:
+        logger.exception(f"Unexpected error while fetching city activities for {city_name}: {e}")
+        return ItineraryBatchItem(city=city_name, status_code=500, error="An internal error occurred while processing your request.")
+
+    if isinstance(page, dict):
+        return ItineraryBatchItem(city=city_name, status_code=404, error=page["error"])
+
+    activities, next_cursor = page
+    return ItineraryBatchItem(
+        city=city_name,
+        status_code=200,
+        results=[to_itinerary(city_name, activity) for activity in activities],
+        next_cursor=next_cursor
+    )
+
+async def get_batch_city_activities(user_id: str, requests: List[ItineraryRequestObj]) -> ItineraryBatchResponse:
+    """
+    Activities for several cities at once. Cities are geocoded and searched concurrently;
+    the per-upstream limits in api_client cap how many calls are actually in flight.
+    A failing city only fails its own item.
+    """
+    logger.info(f"Fetching city activities for user: {user_id}, batch of {len(requests)} cities")
+    items = await asyncio.gather(*(get_city_activities_item(request) for request in requests))
+    return ItineraryBatchResponse(user_id=user_id, items=list(items))
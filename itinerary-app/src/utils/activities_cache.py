@@ -0,0 +1,108 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle (haversine) distance between two points, in km."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def within_radius(activity: dict, latitude: float, longitude: float, radius: float) -> bool:
+    """Whether an Amadeus activity's geoCode lies within radius km (activities without one are excluded)."""
+    geo_code = activity.get("geoCode") or {}
+    try:
+        return distance_km(latitude, longitude, float(geo_code["latitude"]), float(geo_code["longitude"])) <= radius
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+class ActivitiesCache:
+    """
+    Thread-safe LRU cache of Amadeus activity responses, one entry per location, expiring after ttl seconds.
+    Each entry remembers the radius it was fetched with, so a lookup for a smaller radius at the same
+    location is answered by filtering the cached activities by distance instead of calling Amadeus again.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (lat, lon) -> (expires_at, radius, response)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.filtered_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, latitude: float, longitude: float, radius: float) -> Optional[dict]:
+        key = (latitude, longitude)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() >= entry[0]:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None or entry[1] < radius:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            _, cached_radius, response = entry
+            if cached_radius == radius:
+                self.hits += 1
+                return response
+            self.filtered_hits += 1
+
+        # filter outside the lock, the cached response is never mutated
+        return {
+            **response,
+            "data": [activity for activity in response.get("data", []) if within_radius(activity, latitude, longitude, radius)]
+        }
+
+    def set(self, latitude: float, longitude: float, radius: float, response: dict) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+
+        key = (latitude, longitude)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[0] and entry[1] > radius:
+                return  # keep the wider result set fetched concurrently
+
+            self._entries[key] = (now + self.ttl, radius, response)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.filtered_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "filtered_hits": self.filtered_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round((self.hits + self.filtered_hits) / lookups, 4) if lookups else 0.0
+            }
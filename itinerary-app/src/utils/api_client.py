@@ -1,13 +1,208 @@
 import os
+import asyncio
+import logging
+import time
+from typing import Optional
 from dotenv import load_dotenv
-import requests
-from src.utils.api_refresh_token import get_valid_token
+import httpx
+from src.utils.api_refresh_token import get_valid_token, refresh_token
+from src.utils.activities_cache import ActivitiesCache
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.utils.coalesce import RequestCoalescer
+from src.utils.geocode_cache import GeocodeCache, normalize_city
+from src.utils.hedging import HedgingPolicy
+from src.utils.rate_limit import UpstreamLimiter
 
 load_dotenv()  # Load API credentials from .env
 
+logger = logging.getLogger("itinerary_microservice")
+
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+AMADEUS_URL = "https://test.api.amadeus.com/v1/shopping/activities"
+
+# connection pool settings, one pool per upstream shared by every request handled by this worker
+OPENWEATHER_MAX_CONNECTIONS = int(os.getenv("OPENWEATHER_MAX_CONNECTIONS", "20"))
+OPENWEATHER_TIMEOUT = float(os.getenv("OPENWEATHER_TIMEOUT", "10"))
+OPENWEATHER_CONNECT_TIMEOUT = float(os.getenv("OPENWEATHER_CONNECT_TIMEOUT", "3"))
+AMADEUS_MAX_CONNECTIONS = int(os.getenv("AMADEUS_MAX_CONNECTIONS", "20"))
+AMADEUS_TIMEOUT = float(os.getenv("AMADEUS_TIMEOUT", "30"))
+AMADEUS_CONNECT_TIMEOUT = float(os.getenv("AMADEUS_CONNECT_TIMEOUT", "5"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("MAX_KEEPALIVE_CONNECTIONS", "10"))
+
+# OpenWeather requests in flight, across all endpoints
+OPENWEATHER_CONCURRENCY = int(os.getenv("OPENWEATHER_CONCURRENCY", "10"))
+
+# Amadeus activities quota, per worker (OpenWeather geocoding only has the OPENWEATHER_CONCURRENCY cap)
+AMADEUS_RATE_LIMIT = float(os.getenv("AMADEUS_RATE_LIMIT", "10"))  # requests per second, 0 disables
+AMADEUS_BURST = int(os.getenv("AMADEUS_BURST", "10"))
+AMADEUS_CONCURRENCY = int(os.getenv("AMADEUS_CONCURRENCY", "5"))
+AMADEUS_MIN_CONCURRENCY = int(os.getenv("AMADEUS_MIN_CONCURRENCY", "1"))
+AMADEUS_LATENCY_TARGET = float(os.getenv("AMADEUS_LATENCY_TARGET", "5"))  # seconds, 0 ignores latency
+AMADEUS_MAX_RETRIES = int(os.getenv("AMADEUS_MAX_RETRIES", "3"))
+AMADEUS_BACKOFF_BASE = float(os.getenv("AMADEUS_BACKOFF_BASE", "0.5"))
+AMADEUS_BACKOFF_MAX = float(os.getenv("AMADEUS_BACKOFF_MAX", "8"))
+
+# geocode cache: SQLite file that survives restarts ("" keeps it in memory only), pre-seeded from a bundled city list
+APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+GEOCODE_CACHE_FILE = os.getenv("GEOCODE_CACHE_FILE", os.path.join(APP_DIR, "data", "geocode_cache.sqlite3"))
+GEOCODE_SEED_FILE = os.getenv("GEOCODE_SEED_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "city_geocodes.json"))
+GEOCODE_CACHE_MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "4096"))
+
+# cities OpenWeather returned no coordinates for are not looked up again for this many seconds
+GEOCODE_MISS_TTL = float(os.getenv("GEOCODE_MISS_TTL", "300"))
+GEOCODE_MISS_MAX_ENTRIES = 1024
+
+# activities cache: full result set per location, reused for smaller radii (ACTIVITIES_CACHE_TTL=0 disables it)
+ACTIVITIES_CACHE_TTL = float(os.getenv("ACTIVITIES_CACHE_TTL", "3600"))
+ACTIVITIES_CACHE_MAX_ENTRIES = int(os.getenv("ACTIVITIES_CACHE_MAX_ENTRIES", "512"))
+
+# one circuit breaker each for OpenWeather and Amadeus, sharing these thresholds
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "10"))
+CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.5"))
+CIRCUIT_WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+# opt-in hedging, with a policy per upstream: geocoding and activity lookups slower than HEDGING_PERCENTILE are duplicated
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGING_PERCENTILE = float(os.getenv("HEDGING_PERCENTILE", "95"))
+HEDGING_INITIAL_DELAY = float(os.getenv("HEDGING_INITIAL_DELAY", "2"))
+HEDGING_BUDGET = float(os.getenv("HEDGING_BUDGET", "0.05"))
+
+# last good activity list per location, served while the Amadeus circuit is open (STALE_FALLBACK_TTL=0 disables it)
+STALE_FALLBACK_TTL = float(os.getenv("STALE_FALLBACK_TTL", "86400"))
+STALE_FALLBACK_MAX_ENTRIES = int(os.getenv("STALE_FALLBACK_MAX_ENTRIES", "1024"))
+
+_openweather_client: Optional[httpx.AsyncClient] = None
+_amadeus_client: Optional[httpx.AsyncClient] = None
+_openweather_slots: Optional[asyncio.Semaphore] = None
+
+# one coalescer per upstream: geocode keys are city names, activity keys are (lat, lon, radius)
+geocode_coalescer = RequestCoalescer()
+activities_coalescer = RequestCoalescer()
+_geocode_misses = {}  # city key -> time.monotonic() at which the miss expires, oldest first
+
+# in memory until open_geocode_cache() attaches the persistent store
+geocode_cache = GeocodeCache(max_entries=GEOCODE_CACHE_MAX_ENTRIES)
+activities_cache = ActivitiesCache(max_entries=ACTIVITIES_CACHE_MAX_ENTRIES, ttl=ACTIVITIES_CACHE_TTL)
+activities_fallback_cache = ActivitiesCache(max_entries=STALE_FALLBACK_MAX_ENTRIES, ttl=STALE_FALLBACK_TTL)
+
+
+def _new_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        failure_rate=CIRCUIT_FAILURE_RATE,
+        slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS,
+        slow_call_rate=CIRCUIT_SLOW_CALL_RATE,
+        window_size=CIRCUIT_WINDOW_SIZE,
+        min_calls=CIRCUIT_MIN_CALLS,
+        open_seconds=CIRCUIT_OPEN_SECONDS
+    )
+
+
+openweather_breaker = _new_breaker("OpenWeather")
+amadeus_breaker = _new_breaker("Amadeus")
+
+
+def _new_hedging_policy() -> HedgingPolicy:
+    return HedgingPolicy(
+        enabled=HEDGING_ENABLED,
+        percentile=HEDGING_PERCENTILE,
+        initial_delay=HEDGING_INITIAL_DELAY,
+        budget=HEDGING_BUDGET
+    )
+
+
+openweather_hedging = _new_hedging_policy()
+amadeus_hedging = _new_hedging_policy()
+
+amadeus_limiter = UpstreamLimiter(
+    rate=AMADEUS_RATE_LIMIT,
+    burst=AMADEUS_BURST,
+    max_concurrency=AMADEUS_CONCURRENCY,
+    min_concurrency=AMADEUS_MIN_CONCURRENCY,
+    latency_target=AMADEUS_LATENCY_TARGET,
+    max_retries=AMADEUS_MAX_RETRIES,
+    backoff_base=AMADEUS_BACKOFF_BASE,
+    backoff_max=AMADEUS_BACKOFF_MAX
+)
+
+
+def _new_client(max_connections: int, timeout: float, connect_timeout: float) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout)
+    )
+
+
+def is_upstream_failure(response: httpx.Response) -> bool:
+    """Responses that count against a circuit breaker (client errors are the caller's fault)"""
+    return response.status_code >= 500 or response.status_code == 429
+
+
+def open_clients() -> None:
+    """Create the pooled OpenWeather and Amadeus clients (called from the FastAPI lifespan)."""
+    global _openweather_client, _amadeus_client, _openweather_slots
+
+    if _openweather_slots is None:
+        _openweather_slots = asyncio.Semaphore(OPENWEATHER_CONCURRENCY)
+    if _openweather_client is None or _openweather_client.is_closed:
+        _openweather_client = _new_client(OPENWEATHER_MAX_CONNECTIONS, OPENWEATHER_TIMEOUT, OPENWEATHER_CONNECT_TIMEOUT)
+    if _amadeus_client is None or _amadeus_client.is_closed:
+        _amadeus_client = _new_client(AMADEUS_MAX_CONNECTIONS, AMADEUS_TIMEOUT, AMADEUS_CONNECT_TIMEOUT)
+
+
+async def close_clients() -> None:
+    """Close both clients and release their pooled connections."""
+    global _openweather_client, _amadeus_client, _openweather_slots
+
+    for client in (_openweather_client, _amadeus_client):
+        if client is not None:
+            await client.aclose()
+    _openweather_client = _amadeus_client = None
+    _openweather_slots = None
+
+
+def open_geocode_cache() -> None:
+    """Attach the persistent geocode store and seed it (called from the FastAPI lifespan)."""
+    global geocode_cache
+
+    geocode_cache.close()
+    geocode_cache = GeocodeCache(GEOCODE_CACHE_FILE or None, max_entries=GEOCODE_CACHE_MAX_ENTRIES)
+    if GEOCODE_SEED_FILE:
+        geocode_cache.seed_from_file(GEOCODE_SEED_FILE)
+
+
+def close_geocode_cache() -> None:
+    geocode_cache.close()
+
+
 # City (OpenWeather): get city's geocode (latitude, longitude)
-def get_city_geocode(keyword: str) -> dict:
-    OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+async def get_city_geocode(keyword: str) -> tuple:
+    key = normalize_city(keyword)
+    cached = geocode_cache.get(keyword)
+    if cached is not None:
+        return cached
+    if _geocode_misses.get(key, 0) > time.monotonic():
+        return None, None
+
+    latitude, longitude = await geocode_coalescer.run(key, _request_city_geocode, keyword)
+    if latitude is None:
+        _remember_geocode_miss(key)
+    return latitude, longitude
+
+
+def _remember_geocode_miss(key: str) -> None:
+    if GEOCODE_MISS_TTL <= 0:
+        return
+    _geocode_misses.pop(key, None)
+    if len(_geocode_misses) >= GEOCODE_MISS_MAX_ENTRIES:
+        del _geocode_misses[next(iter(_geocode_misses))]
+    _geocode_misses[key] = time.monotonic() + GEOCODE_MISS_TTL
+
+
+async def _request_city_geocode(keyword: str) -> tuple:
     OPENWEATHER_KEY = os.getenv("OPENWEATHER-KEY")
 
     params = {
@@ -15,7 +210,8 @@ def get_city_geocode(keyword: str) -> dict:
         "appid": OPENWEATHER_KEY  # API key
     }
 
-    response = requests.get(OPENWEATHER_URL, params=params)
+    open_clients()
+    response = await openweather_hedging.run(lambda: _send_geocode_request(params))
 
     if response.status_code == 200:
         data = response.json()
@@ -24,23 +220,56 @@ def get_city_geocode(keyword: str) -> dict:
             latitude = data["coord"]["lat"]
             longitude = data["coord"]["lon"]
             # print(f"Latitude: {latitude}, Longitude: {longitude}")
+            geocode_cache.set(keyword, latitude, longitude)
             return latitude, longitude
         else:
-            print(f"Error: No coordinates found for city {keyword}")
+            logger.warning(f"No coordinates found for city {keyword}")
             return None, None
     else:
-        print(f"Error {response.status_code}: {response.json()}")
+        logger.error(f"OpenWeather geocoding failed with {response.status_code}: {response.text}")
         response.raise_for_status()
-        return None, None
+
+
+async def _send_geocode_request(params: dict) -> httpx.Response:
+    async with _openweather_slots:
+        return await openweather_breaker.call_async(
+            lambda: _openweather_client.get(OPENWEATHER_URL, params=params), is_failure=is_upstream_failure
+        )
 
 
 # Activities (Amadeus): finding activities based on geocode
-def get_activities(latitude: float, longitude: float, radius: int) -> dict:
-    AMADEUS_URL = f"https://test.api.amadeus.com/v1/shopping/activities"
+async def get_activities(latitude: float, longitude: float, radius: int) -> dict:
+    cached = activities_cache.get(latitude, longitude, radius)
+    if cached is not None:
+        return cached
+    try:
+        return await activities_coalescer.run((latitude, longitude, radius), _request_activities, latitude, longitude, radius)
+    except CircuitOpenError:
+        stale = activities_fallback_cache.get(latitude, longitude, radius)
+        if stale is None:
+            raise
+        logger.warning(f"Amadeus circuit is open, serving stale activities for {latitude}, {longitude}")
+        return stale
+
 
+async def _send_activities_request(headers: dict, params: dict) -> httpx.Response:
+    # only the Amadeus round trip is timed by the breaker; waiting for a limiter slot is not counted.
+    # The hedge wraps both, so a duplicate lookup is rate limited too
+    return await amadeus_hedging.run(
+        lambda: amadeus_limiter.send(
+            lambda: amadeus_breaker.call_async(
+                lambda: _amadeus_client.get(AMADEUS_URL, headers=headers, params=params), is_failure=is_upstream_failure
+            )
+        )
+    )
+
+
+async def _request_activities(latitude: float, longitude: float, radius: int) -> dict:
+    # token refresh is blocking, keep it off the event loop
+    token = await asyncio.to_thread(get_valid_token)
     headers = {
         "accept": "application/vnd.amadeus+json",
-        "Authorization": f"Bearer {get_valid_token()}"
+        "Authorization": f"Bearer {token}"
     }
     params = {
         "latitude": latitude,
@@ -48,23 +277,21 @@ def get_activities(latitude: float, longitude: float, radius: int) -> dict:
         "radius": radius             # TODO: check if user should input? (in km, can be from 0-20)
     }
 
-    response = requests.get(AMADEUS_URL, headers=headers, params=params)
+    open_clients()
+    response = await _send_activities_request(headers, params)
 
     if response.status_code == 401:  # Handle token expiration
-        print("Token expired, refreshing...")
-        headers["Authorization"] = f"Bearer {get_valid_token()}"
-        response = requests.get(AMADEUS_URL, headers=headers, params=params)
-    elif response.status_code == 200:
+        logger.warning("Amadeus token expired, refreshing...")
+        headers["Authorization"] = f"Bearer {await asyncio.to_thread(refresh_token, token)}"
+        response = await _send_activities_request(headers, params)
+
+    if response.status_code == 200:
         data = response.json()
         # print("API Response:")
         # print(data)
+        activities_cache.set(latitude, longitude, radius, data)
+        activities_fallback_cache.set(latitude, longitude, radius, data)
         return data
     else:
-        print(f"Error {response.status_code}: {response.json()}")
+        logger.error(f"Amadeus activities request failed with {response.status_code}: {response.text}")
         response.raise_for_status()
-
-
-# for debugging
-# if __name__ == "__main__":
-#     get_activities(41.397158, 2.160873, 41.394582, 2.177181)
-#     get_city_geocode("London")
\ No newline at end of file
@@ -1,6 +1,12 @@
 import os
+import json
 import time
+import fcntl
+import tempfile
+import threading
 import requests
+import logging
+from contextlib import contextmanager, nullcontext
 from dotenv import load_dotenv
 
 load_dotenv()  # Load API credentials from .env
@@ -9,34 +15,184 @@ load_dotenv()  # Load API credentials from .env
 AMADEUS_KEY = os.getenv("AMADEUS-KEY")
 AMADEUS_SECRET = os.getenv("AMADEUS-SECRET")
 
+# Optional file shared by all workers on the host, so only one of them refreshes the token
+AMADEUS_TOKEN_FILE = os.getenv("AMADEUS_TOKEN_FILE")
+# Seconds before expiry at which the background refresher renews the token
+AMADEUS_TOKEN_REFRESH_MARGIN = int(os.getenv("AMADEUS_TOKEN_REFRESH_MARGIN", "60"))
+# Seconds to wait before retrying a failed background refresh
+AMADEUS_TOKEN_RETRY_DELAY = 30
+
+logger = logging.getLogger("itinerary_microservice")
+
 # Global storage for token and expiry time
 token = None
 token_expiry = 0  # Stores expiration timestamp
 
+# serialises refreshes within this worker; the shared token file serialises them across workers
+_token_lock = threading.Lock()
+_refresher_stop = threading.Event()
+_refresher_thread = None
+
+
+@contextmanager
+def _shared_token_lock():
+    """Hold an exclusive lock on the shared token file for the duration of a refresh."""
+    with open(f"{AMADEUS_TOKEN_FILE}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_shared_token():
+    """Return (token, expiry) from the shared token file, or (None, 0) if unavailable."""
+    try:
+        with open(AMADEUS_TOKEN_FILE, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        return data["access_token"], data["token_expiry"]
+    except (OSError, ValueError, KeyError):
+        return None, 0
+
+
+def _write_shared_token(new_token: str, new_expiry: float) -> None:
+    """Atomically replace the shared token file so readers never see a partial write."""
+    directory = os.path.dirname(os.path.abspath(AMADEUS_TOKEN_FILE))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".amadeus_token")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        json.dump({"access_token": new_token, "token_expiry": new_expiry}, file)
+    os.replace(tmp_path, AMADEUS_TOKEN_FILE)
 
-def get_amadeus_token():
-    """Fetch a new Amadeus access token and store its expiration time."""
+
+def get_amadeus_token(rejected_token: str = None) -> str:
+    """
+    Fetch a new Amadeus access token and store its expiration time.
+    If a shared token file is configured and another worker has already stored a newer
+    token (other than rejected_token), that token is adopted instead of calling Amadeus.
+    Raises requests.exceptions.HTTPError on failure.
+    """
     global token, token_expiry
 
-    auth_url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-    payload = {
-        "grant_type": "client_credentials",
-        "client_id": AMADEUS_KEY,
-        "client_secret": AMADEUS_SECRET
-    }
+    with _shared_token_lock() if AMADEUS_TOKEN_FILE else nullcontext():
+        if AMADEUS_TOKEN_FILE:
+            shared_token, shared_expiry = _read_shared_token()
+            if (
+                shared_token
+                and shared_token != rejected_token
+                and shared_expiry > token_expiry
+                and time.time() < shared_expiry
+            ):
+                logger.info("Using Amadeus access token refreshed by another worker.")
+                token, token_expiry = shared_token, shared_expiry
+                return token
+
+        auth_url = "https://test.api.amadeus.com/v1/security/oauth2/token"
+        payload = {
+            "grant_type": "client_credentials",
+            "client_id": AMADEUS_KEY,
+            "client_secret": AMADEUS_SECRET
+        }
+
+        logger.info("Requesting a new Amadeus access token.")
+
+        try:
+            response = requests.post(auth_url, data=payload)
+            logger.debug(f"Amadeus token request status code: {response.status_code}")
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.error(
+                "Failed to retrieve Amadeus token.",
+                exc_info=True
+            )
+            raise
 
-    response = requests.post(auth_url, data=payload)
-    response.raise_for_status()  # Raise error if request fails
+        data = response.json()
+        if "access_token" not in data or "expires_in" not in data:
+            logger.error(
+                f"Amadeus token response is missing expected keys. Response data: {data}"
+            )
+            raise ValueError("Invalid token response from Amadeus.")
 
-    data = response.json()
-    token = data["access_token"]
-    token_expiry = time.time() + data["expires_in"] - 10  # Subtract 10s buffer for safety
+        token = data["access_token"]
+        token_expiry = time.time() + data["expires_in"] - 10  # Subtract a buffer for safety
+
+        if AMADEUS_TOKEN_FILE:
+            _write_shared_token(token, token_expiry)
+
+    logger.info("Amadeus access token retrieved successfully.")
+    logger.debug(f"Token expires at: {token_expiry} (epoch time)")
 
     return token
 
 
-def get_valid_token():
-    """Ensure a valid Amadeus token is always used for API requests."""
-    if not token or time.time() >= token_expiry:
+def get_valid_token() -> str:
+    """
+    Ensure a valid Amadeus token is always used for API requests.
+    If the current token is missing or expired, retrieves a new one.
+    Concurrent callers wait for a single refresh instead of each requesting a token.
+    """
+    if token and time.time() < token_expiry:
+        logger.debug("Using existing valid token.")
+        return token
+
+    with _token_lock:
+        # another caller may have refreshed the token while we waited for the lock
+        if token and time.time() < token_expiry:
+            logger.debug("Token was refreshed by a concurrent request.")
+            return token
+
+        logger.info("No valid token found or token has expired. Fetching a new token...")
         return get_amadeus_token()
-    return token
+
+
+def refresh_token(rejected_token: str) -> str:
+    """
+    Replace a token that Amadeus rejected (e.g. with a 401).
+    If a concurrent request has already replaced it, the newer token is returned as is.
+    """
+    with _token_lock:
+        if token and token != rejected_token and time.time() < token_expiry:
+            logger.debug("Rejected token was already replaced by a concurrent request.")
+            return token
+
+        return get_amadeus_token(rejected_token=rejected_token)
+
+
+def _refresh_loop() -> None:
+    """Renew the token shortly before it expires, so requests never wait on a refresh."""
+    while not _refresher_stop.is_set():
+        delay = token_expiry - AMADEUS_TOKEN_REFRESH_MARGIN - time.time()
+        if _refresher_stop.wait(max(delay, 0)):
+            break
+
+        try:
+            with _token_lock:
+                if time.time() >= token_expiry - AMADEUS_TOKEN_REFRESH_MARGIN:
+                    logger.info("Proactively refreshing Amadeus access token before expiry.")
+                    get_amadeus_token()
+        except Exception:
+            logger.error("Background Amadeus token refresh failed, retrying shortly.", exc_info=True)
+            _refresher_stop.wait(AMADEUS_TOKEN_RETRY_DELAY)
+
+
+def start_token_refresher() -> None:
+    """Start the background thread that renews the token before token_expiry."""
+    global _refresher_thread
+
+    if _refresher_thread is not None and _refresher_thread.is_alive():
+        return
+
+    _refresher_stop.clear()
+    _refresher_thread = threading.Thread(target=_refresh_loop, name="amadeus-token-refresher", daemon=True)
+    _refresher_thread.start()
+    logger.info(f"Started Amadeus token refresher (margin={AMADEUS_TOKEN_REFRESH_MARGIN}s).")
+
+
+def stop_token_refresher() -> None:
+    """Stop the background token refresher thread."""
+    global _refresher_thread
+
+    _refresher_stop.set()
+    if _refresher_thread is not None:
+        _refresher_thread.join(timeout=5)
+        _refresher_thread = None
@@ -0,0 +1,41 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class RequestCoalescer:
+    """
+    Collapses concurrent geocode and activity lookups on this worker's event loop.
+    Itineraries for popular destinations ask for the same city (OpenWeather) and the same coordinates (Amadeus)
+    at once; the first request starts the call as a task and the others await it.
+    """
+
+    def __init__(self):
+        self._in_flight = {}  # key -> asyncio.Task
+
+        self.calls = 0
+        self.collapsed = 0
+
+    async def run(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        task = self._in_flight.get(key)
+
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.collapsed += 1
+
+        # shielded: a disconnecting itinerary request must not cancel a lookup other itineraries are awaiting
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._in_flight)
+        }
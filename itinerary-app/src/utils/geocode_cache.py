@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger("itinerary_microservice")
+
+
+def normalize_city(city: str) -> str:
+    """Cache key for a city name: Unicode-normalised, case-folded, with whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFKC", city).split()).casefold()
+
+
+class GeocodeCache:
+    """
+    Two-tier city -> (latitude, longitude) cache.
+    An in-process LRU answers repeated lookups; an optional SQLite file keeps every geocode
+    across restarts (and can be pre-seeded), so a city only ever needs one upstream lookup.
+    City coordinates do not change, so entries never expire.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 4096):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # normalised city -> (lat, lon)
+        self._lock = threading.Lock()
+        self._db = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode (city TEXT PRIMARY KEY, latitude REAL NOT NULL, longitude REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, city: str) -> Optional[Tuple[float, float]]:
+        key = normalize_city(city)
+        with self._lock:
+            coordinates = self._entries.get(key)
+            if coordinates is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return coordinates
+
+            if self._db is not None:
+                row = self._db.execute("SELECT latitude, longitude FROM geocode WHERE city = ?", (key,)).fetchone()
+                if row is not None:
+                    self._remember(key, row)
+                    self.disk_hits += 1
+                    return row
+
+            self.misses += 1
+            return None
+
+    def set(self, city: str, latitude: float, longitude: float) -> None:
+        self.seed([(city, latitude, longitude)])
+
+    def seed(self, entries: Iterable[Tuple[str, float, float]]) -> None:
+        """Store geocodes; existing entries are replaced."""
+        rows = [(normalize_city(city), latitude, longitude) for city, latitude, longitude in entries]
+        with self._lock:
+            for key, latitude, longitude in rows:
+                self._remember(key, (latitude, longitude))
+            if self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?)", rows)
+                self._db.commit()
+
+    def seed_from_file(self, path: str) -> None:
+        """Store geocodes from a JSON list of {"city", "lat", "lon"} entries, keeping ones already known."""
+        with open(path, "r", encoding="utf-8") as file:
+            entries = [(entry["city"], entry["lat"], entry["lon"]) for entry in json.load(file)]
+        unknown = [entry for entry in entries if not self._contains(entry[0])]
+        self.seed(unknown)
+        logger.info(f"Seeded geocode cache with {len(unknown)} of {len(entries)} cities from {path}")
+
+    def _contains(self, city: str) -> bool:
+        key = normalize_city(city)
+        with self._lock:
+            if key in self._entries:
+                return True
+            if self._db is not None:
+                return self._db.execute("SELECT 1 FROM geocode WHERE city = ?", (key,)).fetchone() is not None
+            return False
+
+    def _remember(self, key: str, coordinates: Tuple[float, float]) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = tuple(coordinates)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM geocode")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self._db is not None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,100 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class HedgingPolicy:
+    """
+    Hedging for one itinerary upstream; api_client keeps one policy for OpenWeather geocoding and one
+    for Amadeus activities, so each learns its own latency percentile.
+    Once a lookup has run longer than that percentile (initial_delay before min_samples lookups completed),
+    a duplicate is sent and whichever succeeds first is returned; the loser is cancelled, as are both
+    if the itinerary request itself goes away. Duplicates are limited to budget (a fraction) of lookups.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 95,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.05,
+        budget: float = 0.05,
+        window_size: int = 200,
+        min_samples: int = 20
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window_size)
+
+        self.calls = 0
+        self.fired = 0           # hedges sent
+        self.won = 0             # hedges whose response was used
+        self.budget_exceeded = 0  # hedges skipped because of the budget
+
+    def delay(self) -> float:
+        """Seconds to wait for the first call before hedging it"""
+        if len(self._latencies) < self.min_samples:
+            return self.initial_delay
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(len(ordered) * self.percentile / 100) - 1)
+        return max(self.min_delay, ordered[index])
+
+    def _within_budget(self) -> bool:
+        if self.fired + 1 > self.budget * self.calls:
+            self.budget_exceeded += 1
+            return False
+        return True
+
+    async def _timed(self, call: Callable[[], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        result = await call()
+        self._latencies.append(time.monotonic() - started)
+        return result
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Await call(), hedged with a second call() if the first is slow."""
+        if not self.enabled:
+            return await call()
+
+        self.calls += 1
+        primary = asyncio.ensure_future(self._timed(call))
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.delay())
+            if done or not self._within_budget():
+                return await primary
+
+            self.fired += 1
+            hedge = asyncio.ensure_future(self._timed(call))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.won += 1
+                        return task.result()
+            return primary.result()  # both calls failed, raise the first one's error
+        finally:
+            # the slower call (or both, if the caller was cancelled) is not needed anymore
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "fired": self.fired,
+            "won": self.won,
+            "budget_exceeded": self.budget_exceeded,
+            "delay": round(self.delay(), 4)
+        }
@@ -0,0 +1,55 @@
+from unittest.mock import patch
+from src.utils.activities_cache import ActivitiesCache, distance_km, within_radius
+
+
+def activity(activity_id, latitude, longitude):
+    return {"id": activity_id, "geoCode": {"latitude": latitude, "longitude": longitude}}
+
+
+def test_distance_km_matches_known_distance():
+    # London -> Paris is roughly 344 km
+    assert 340 < distance_km(51.5074, -0.1278, 48.8566, 2.3522) < 348
+
+
+def test_within_radius_excludes_activities_without_location():
+    assert within_radius(activity("A", 51.508, -0.128), 51.5074, -0.1278, 1)
+    assert not within_radius({"id": "B"}, 51.5074, -0.1278, 1)
+    assert not within_radius(activity("C", None, None), 51.5074, -0.1278, 1)
+
+
+def test_cache_keeps_wider_result_set_and_misses_on_larger_radius():
+    """
+    GIVEN a location cached with a 10 km radius
+    WHEN a narrower result set is stored, and a wider radius is looked up
+    THEN the wider entry is kept, and the larger radius is a miss.
+    """
+    cache = ActivitiesCache(max_entries=10, ttl=60)
+    response = {"data": [activity("A", 51.508, -0.128)], "meta": {"count": 1}}
+    cache.set(51.5074, -0.1278, 10, response)
+    cache.set(51.5074, -0.1278, 1, {"data": []})
+
+    assert cache.get(51.5074, -0.1278, 10) is response
+    assert cache.get(51.5074, -0.1278, 5) == response
+    assert cache.get(51.5074, -0.1278, 15) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["filtered_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_cache_expires_and_evicts_entries():
+    """
+    GIVEN a cache bounded to one entry with a 60s TTL
+    WHEN a second location is stored, or the TTL elapses
+    THEN older entries are evicted or expired.
+    """
+    cache = ActivitiesCache(max_entries=1, ttl=60)
+
+    with patch("src.utils.activities_cache.time.monotonic", return_value=1000):
+        cache.set(1.0, 1.0, 10, {"data": []})
+        cache.set(2.0, 2.0, 10, {"data": []})
+        assert cache.get(1.0, 1.0, 10) is None
+    with patch("src.utils.activities_cache.time.monotonic", return_value=1060):
+        assert cache.get(2.0, 2.0, 10) is None
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["expirations"] == 1
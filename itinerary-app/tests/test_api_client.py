@@ -0,0 +1,303 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+from src.utils import api_client
+from src.utils.api_client import get_city_geocode, get_activities
+from src.utils.geocode_cache import GeocodeCache
+from src.utils.hedging import HedgingPolicy
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.utils.rate_limit import UpstreamLimiter
+
+
+def use_mock_transport(handler):
+    """
+    Swap the shared OpenWeather and Amadeus clients for ones backed by an httpx.MockTransport,
+    so no real network calls are made.
+    """
+    api_client._openweather_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    api_client._amadeus_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.fixture(autouse=True)
+def reset_clients(monkeypatch):
+    api_client._openweather_client = api_client._amadeus_client = None
+    monkeypatch.setattr(api_client, "geocode_cache", GeocodeCache())
+    api_client._geocode_misses.clear()
+    monkeypatch.setattr(api_client, "amadeus_limiter", UpstreamLimiter(rate=0, burst=1, max_concurrency=5, backoff_base=0.001))
+    monkeypatch.setattr(api_client, "openweather_breaker", CircuitBreaker("OpenWeather", min_calls=3))
+    monkeypatch.setattr(api_client, "amadeus_breaker", CircuitBreaker("Amadeus", min_calls=3))
+    api_client.activities_cache.clear()
+    api_client.activities_fallback_cache.clear()
+    yield
+    asyncio.run(api_client.close_clients())
+
+
+def test_get_city_geocode_returns_coordinates():
+    """
+    GIVEN OpenWeather responds with coordinates for the city
+    WHEN get_city_geocode is awaited
+    THEN it should return (latitude, longitude).
+    """
+    use_mock_transport(lambda request: httpx.Response(200, json={"coord": {"lat": 51.5074, "lon": -0.1278}}))
+
+    assert asyncio.run(get_city_geocode("London")) == (51.5074, -0.1278)
+
+
+def test_get_city_geocode_looks_up_each_city_once():
+    """
+    GIVEN a city already geocoded once
+    WHEN it is requested again with different case/spacing
+    THEN it is served from the geocode cache without another OpenWeather call.
+    """
+    seen_requests = []
+
+    def handler(request):
+        seen_requests.append(request)
+        return httpx.Response(200, json={"coord": {"lat": 51.5074, "lon": -0.1278}})
+
+    use_mock_transport(handler)
+
+    assert asyncio.run(get_city_geocode("London")) == (51.5074, -0.1278)
+    assert asyncio.run(get_city_geocode("  LONDON ")) == (51.5074, -0.1278)
+    assert len(seen_requests) == 1
+    assert api_client.geocode_cache.stats()["memory_hits"] == 1
+
+
+def test_get_city_geocode_returns_none_without_coordinates(caplog):
+    use_mock_transport(lambda request: httpx.Response(200, json={"name": "Nowhere"}))
+
+    with caplog.at_level("WARNING", logger="itinerary_microservice"):
+        assert asyncio.run(get_city_geocode("Nowhere")) == (None, None)
+    assert "No coordinates found for city Nowhere" in caplog.text
+
+
+def test_get_city_geocode_remembers_cities_without_coordinates():
+    """
+    GIVEN OpenWeather has no coordinates for a city
+    WHEN get_city_geocode is awaited again for it, then again after GEOCODE_MISS_TTL
+    THEN the repeat lookup should be answered without a request, and the expired one should go upstream.
+    """
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"name": "Nowhere"})
+
+    use_mock_transport(handler)
+
+    with patch("src.utils.api_client.time.monotonic", return_value=1000):
+        assert asyncio.run(get_city_geocode("Nowhere")) == (None, None)
+        assert asyncio.run(get_city_geocode(" nowhere ")) == (None, None)
+    assert len(requests) == 1
+
+    with patch("src.utils.api_client.time.monotonic", return_value=1000 + api_client.GEOCODE_MISS_TTL):
+        assert asyncio.run(get_city_geocode("Nowhere")) == (None, None)
+    assert len(requests) == 2
+
+
+def test_get_city_geocode_raises_on_error_status():
+    """
+    GIVEN OpenWeather responds with a 404
+    WHEN get_city_geocode is awaited
+    THEN an httpx.HTTPStatusError should propagate to the caller.
+    """
+    use_mock_transport(lambda request: httpx.Response(404, json={"message": "city not found"}))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(get_city_geocode("Atlantis"))
+
+
+@patch("src.utils.api_client.refresh_token", return_value="refreshed_token")
+@patch("src.utils.api_client.get_valid_token", return_value="stale_token")
+def test_get_activities_refreshes_token_and_retries_on_401(mock_get_valid_token, mock_refresh_token):
+    """
+    GIVEN Amadeus rejects the first request with 401
+    WHEN get_activities is awaited
+    THEN it should force a token refresh and retry once with the new token.
+    """
+    seen_tokens = []
+
+    def handler(request):
+        seen_tokens.append(request.headers["Authorization"])
+        if request.headers["Authorization"] == "Bearer stale_token":
+            return httpx.Response(401, json={"errors": []})
+        return httpx.Response(200, json={"data": [{"id": "ACT_1"}]})
+
+    use_mock_transport(handler)
+
+    data = asyncio.run(get_activities(51.5074, -0.1278, 10))
+
+    assert data == {"data": [{"id": "ACT_1"}]}
+    assert seen_tokens == ["Bearer stale_token", "Bearer refreshed_token"]
+    mock_refresh_token.assert_called_once_with("stale_token")
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_activities_coalesces_concurrent_identical_lookups(mock_get_valid_token):
+    """
+    GIVEN concurrent activity lookups for the same location and radius
+    WHEN get_activities is awaited several times at once
+    THEN only one Amadeus request should be made.
+    """
+    seen_requests = []
+
+    def handler(request):
+        seen_requests.append(request)
+        return httpx.Response(200, json={"data": [{"id": "ACT_1"}]})
+
+    use_mock_transport(handler)
+
+    async def main():
+        return await asyncio.gather(*(get_activities(51.5074, -0.1278, 10) for _ in range(4)))
+
+    assert asyncio.run(main()) == [{"data": [{"id": "ACT_1"}]}] * 4
+    assert len(seen_requests) == 1
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_activities_answers_smaller_radius_from_cache(mock_get_valid_token):
+    """
+    GIVEN activities already fetched for a location with a 10 km radius
+    WHEN the same location is queried with a 1 km radius
+    THEN the cached activities are filtered by distance instead of calling Amadeus again.
+    """
+    seen_requests = []
+    activities = {"data": [
+        {"id": "NEAR", "geoCode": {"latitude": "51.5080", "longitude": "-0.1280"}},
+        {"id": "FAR", "geoCode": {"latitude": "51.5500", "longitude": "-0.1278"}}
+    ]}
+
+    def handler(request):
+        seen_requests.append(request)
+        return httpx.Response(200, json=activities)
+
+    use_mock_transport(handler)
+
+    wide = asyncio.run(get_activities(51.5074, -0.1278, 10))
+    narrow = asyncio.run(get_activities(51.5074, -0.1278, 1))
+    wider = asyncio.run(get_activities(51.5074, -0.1278, 20))
+
+    assert [activity["id"] for activity in wide["data"]] == ["NEAR", "FAR"]
+    assert [activity["id"] for activity in narrow["data"]] == ["NEAR"]
+    assert len(wider["data"]) == 2
+    assert len(seen_requests) == 2  # the 20 km radius is not covered by the 10 km result set
+    assert api_client.activities_cache.stats()["filtered_hits"] == 1
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_activities_caps_concurrent_amadeus_requests(mock_get_valid_token, monkeypatch):
+    """
+    GIVEN an Amadeus concurrency limit of 2 and activity lookups for 6 different locations at once
+    WHEN get_activities is awaited for all of them
+    THEN no more than 2 Amadeus requests should be in flight at any time.
+    """
+    monkeypatch.setattr(api_client, "amadeus_limiter", UpstreamLimiter(rate=0, burst=1, max_concurrency=2))
+    in_flight, peak = 0, 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json={"data": [{"id": "ACT_1"}]})
+
+    use_mock_transport(handler)
+
+    async def main():
+        return await asyncio.gather(*(get_activities(10.0 * i, 0.0, 10) for i in range(6)))
+
+    assert len(asyncio.run(main())) == 6
+    assert peak == 2
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_activities_retries_when_rate_limited(mock_get_valid_token):
+    """
+    GIVEN Amadeus answers the first activities request with 429 and a Retry-After header
+    WHEN get_activities is awaited
+    THEN the request is retried after the delay and the throttle event is counted.
+    """
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0.01"}),
+        httpx.Response(200, json={"data": [{"id": "ACT_1"}]})
+    ]
+    use_mock_transport(lambda request: responses.pop(0))
+
+    assert asyncio.run(get_activities(51.5074, -0.1278, 10)) == {"data": [{"id": "ACT_1"}]}
+    assert api_client.amadeus_limiter.stats()["throttled"] == 1
+
+
+def test_get_city_geocode_fails_fast_once_openweather_circuit_opens():
+    """
+    GIVEN OpenWeather failing every request
+    WHEN uncached cities keep being geocoded
+    THEN the circuit opens after 3 failures and later lookups fail fast without a request.
+    """
+    seen_requests = []
+
+    def handler(request):
+        seen_requests.append(request)
+        return httpx.Response(502)
+
+    use_mock_transport(handler)
+
+    for city in ("Paris", "Rome", "Oslo"):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(get_city_geocode(city))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(get_city_geocode("Lima"))
+
+    assert len(seen_requests) == 3
+    assert api_client.openweather_breaker.stats()["state"] == "open"
+
+
+@patch("src.utils.api_client.get_valid_token", return_value="valid_token")
+def test_get_activities_serves_stale_list_while_amadeus_circuit_is_open(mock_get_valid_token):
+    """
+    GIVEN activities fetched once for a location, then Amadeus failing until its circuit opens
+    WHEN the location is queried again after the activities cache was emptied
+    THEN the last good activity list is served without calling Amadeus.
+    """
+    seen_requests = []
+    responses = [httpx.Response(200, json={"data": [{"id": "ACT_1"}]})] + [httpx.Response(500)] * 2
+
+    def handler(request):
+        seen_requests.append(request)
+        return responses.pop(0)
+
+    use_mock_transport(handler)
+
+    assert asyncio.run(get_activities(51.5074, -0.1278, 10)) == {"data": [{"id": "ACT_1"}]}
+    api_client.activities_cache.clear()
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(get_activities(40.7128, -74.0060, 10))
+
+    assert asyncio.run(get_activities(51.5074, -0.1278, 10)) == {"data": [{"id": "ACT_1"}]}
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(get_activities(40.7128, -74.0060, 10))
+    assert len(seen_requests) == 3
+
+
+def test_get_city_geocode_hedges_a_slow_lookup(monkeypatch):
+    """
+    GIVEN hedging enabled and a first OpenWeather request that hangs
+    WHEN get_city_geocode is awaited
+    THEN a hedged request is sent after the hedging delay and its response is used.
+    """
+    monkeypatch.setattr(api_client, "openweather_hedging", HedgingPolicy(enabled=True, initial_delay=0.01, budget=1.0))
+    seen_requests = []
+
+    async def handler(request):
+        seen_requests.append(request)
+        if len(seen_requests) == 1:
+            await asyncio.sleep(1)
+        return httpx.Response(200, json={"coord": {"lat": 48.8566, "lon": 2.3522}})
+
+    use_mock_transport(handler)
+
+    assert asyncio.run(get_city_geocode("Paris")) == (48.8566, 2.3522)
+    assert len(seen_requests) == 2
+    assert api_client.openweather_hedging.stats()["won"] == 1
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+async def fail():
+    raise ConnectionError("upstream down")
+
+
+async def ok():
+    return "ok"
+
+
+def call(breaker, func, **kwargs):
+    return asyncio.run(breaker.call_async(func, **kwargs))
+
+
+def test_amadeus_outage_does_not_open_the_openweather_circuit():
+    """
+    GIVEN one breaker per upstream, as in api_client
+    WHEN every Amadeus call fails
+    THEN the Amadeus circuit opens while geocoding keeps going through.
+    """
+    openweather = CircuitBreaker("OpenWeather", min_calls=2)
+    amadeus = CircuitBreaker("Amadeus", min_calls=2)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            call(amadeus, fail)
+        assert call(openweather, ok) == "ok"
+
+    with pytest.raises(CircuitOpenError, match="Amadeus"):
+        call(amadeus, ok)
+    assert call(openweather, ok) == "ok"
+    assert openweather.stats()["state"] == "closed"
+
+
+def test_old_failures_slide_out_of_the_window():
+    breaker = CircuitBreaker("Amadeus", failure_rate=0.5, window_size=4, min_calls=4)
+
+    with pytest.raises(ConnectionError):
+        call(breaker, fail)
+    for _ in range(5):
+        call(breaker, ok)
+    with pytest.raises(ConnectionError):
+        call(breaker, fail)
+
+    assert breaker.stats()["state"] == "closed"
+    assert breaker.stats()["failure_rate"] == 0.25
+
+
+def test_slow_call_rate_opens_the_circuit_without_failures():
+    """
+    GIVEN a breaker treating calls over 10 ms as slow, opening at a 50% slow rate
+    WHEN 2 of 4 geocoding calls succeed but take 20 ms
+    THEN the circuit opens.
+    """
+    breaker = CircuitBreaker("OpenWeather", slow_call_seconds=0.01, slow_call_rate=0.5, min_calls=4)
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    for func in (ok, slow, ok, slow):
+        assert call(breaker, func) == "ok"
+
+    assert breaker.stats()["state"] == "open"
+
+
+def test_client_errors_do_not_count_as_failures():
+    breaker = CircuitBreaker("Amadeus", min_calls=2)
+
+    async def bad_request():
+        return 400
+
+    for _ in range(3):
+        call(breaker, bad_request, is_failure=lambda status: status >= 500 or status == 429)
+
+    assert breaker.stats()["state"] == "closed"
+    assert breaker.stats()["failure_rate"] == 0.0
+
+
+def test_cancelled_trial_call_frees_the_half_open_slot():
+    """
+    GIVEN an open circuit whose open period has elapsed
+    WHEN the trial call is cancelled (e.g. the itinerary request was dropped)
+    THEN the next call is let through as the new trial instead of being rejected.
+    """
+    breaker = CircuitBreaker("Amadeus", min_calls=1, open_seconds=0)
+    with pytest.raises(ConnectionError):
+        call(breaker, fail)
+
+    async def main():
+        trial = asyncio.ensure_future(breaker.call_async(lambda: asyncio.sleep(1)))
+        await asyncio.sleep(0)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        return await breaker.call_async(ok)
+
+    assert asyncio.run(main()) == "ok"
+    assert breaker.stats()["state"] == "closed"
+    assert breaker.stats()["rejected"] == 0
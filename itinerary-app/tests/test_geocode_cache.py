@@ -0,0 +1,64 @@
+import json
+from src.utils.geocode_cache import GeocodeCache, normalize_city
+
+
+def test_normalize_city_ignores_case_and_spacing():
+    assert normalize_city("  New   York ") == normalize_city("new york") == "new york"
+    assert normalize_city("ZÜRICH") == "zürich"
+
+
+def test_geocode_cache_survives_restart(tmp_path):
+    """
+    GIVEN a geocode stored in a persistent cache
+    WHEN the cache is reopened on the same file (e.g. after a restart)
+    THEN the geocode is served from disk, then from memory.
+    """
+    path = str(tmp_path / "geocode.sqlite3")
+    cache = GeocodeCache(path)
+    cache.set("London", 51.5074, -0.1278)
+    cache.close()
+
+    reopened = GeocodeCache(path)
+    assert reopened.get("london") == (51.5074, -0.1278)
+    assert reopened.get("LONDON") == (51.5074, -0.1278)
+    assert reopened.get("Paris") is None
+
+    stats = reopened.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+    reopened.close()
+
+
+def test_geocode_cache_seeds_from_file_without_overwriting(tmp_path):
+    """
+    GIVEN a seed file and a cache that already knows one of its cities
+    WHEN the cache is seeded from the file
+    THEN only unknown cities are added.
+    """
+    seed_file = tmp_path / "cities.json"
+    seed_file.write_text(json.dumps([
+        {"city": "London", "lat": 51.5085, "lon": -0.1257},
+        {"city": "Paris", "lat": 48.8534, "lon": 2.3488}
+    ]))
+    cache = GeocodeCache()
+    cache.set("London", 51.5074, -0.1278)
+
+    cache.seed_from_file(str(seed_file))
+
+    assert cache.get("London") == (51.5074, -0.1278)
+    assert cache.get("Paris") == (48.8534, 2.3488)
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    """
+    GIVEN a persistent cache whose memory tier holds one entry
+    WHEN two cities are stored
+    THEN the older one is evicted from memory but still found on disk.
+    """
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite3"), max_entries=1)
+    cache.set("London", 51.5074, -0.1278)
+    cache.set("Paris", 48.8534, 2.3488)
+
+    assert cache.stats()["size"] == 1
+    assert cache.get("London") == (51.5074, -0.1278)
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from src.utils.hedging import HedgingPolicy
+
+
+def test_disabled_policy_makes_a_single_call_and_records_nothing():
+    policy = HedgingPolicy(enabled=False, initial_delay=0)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    assert asyncio.run(policy.run(call)) == "ok"
+    assert len(attempts) == 1
+    assert policy.stats()["calls"] == 0
+
+
+def test_hedged_lookup_returns_the_duplicate_when_the_first_hangs():
+    """
+    GIVEN a geocode lookup hanging for a second and a 10 ms hedging delay
+    WHEN it is run through the policy
+    THEN the duplicate's answer is returned well before the first lookup would have finished.
+    """
+    policy = HedgingPolicy(enabled=True, initial_delay=0.01, budget=1.0)
+    attempts = []
+
+    async def geocode():
+        attempts.append(1)
+        await asyncio.sleep(1 if len(attempts) == 1 else 0)
+        return (51.5074, -0.1278)
+
+    async def main():
+        return await asyncio.wait_for(policy.run(geocode), timeout=0.5)
+
+    assert asyncio.run(main()) == (51.5074, -0.1278)
+    assert policy.stats()["won"] == 1
+
+
+def test_cancelled_itinerary_request_cancels_both_lookups():
+    """
+    GIVEN a hedged lookup with both calls still running
+    WHEN the caller is cancelled
+    THEN neither call is left running.
+    """
+    policy = HedgingPolicy(enabled=True, initial_delay=0.005, budget=1.0)
+    started, cancelled = [], []
+
+    async def call():
+        attempt = len(started)
+        started.append(attempt)
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(attempt)
+            raise
+
+    async def main():
+        task = asyncio.ensure_future(policy.run(call))
+        await asyncio.sleep(0.03)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+    assert started == [0, 1]
+    assert sorted(cancelled) == [0, 1]
+
+
+def test_delay_never_drops_below_min_delay():
+    policy = HedgingPolicy(enabled=True, min_delay=0.05, min_samples=5)
+    policy._latencies.extend([0.001] * 10)
+
+    assert policy.delay() == 0.05
+
+
+def test_only_completed_lookups_feed_the_latency_window():
+    policy = HedgingPolicy(enabled=True, initial_delay=1, budget=1.0)
+
+    async def fails():
+        raise ConnectionError("Amadeus down")
+
+    async def succeeds():
+        return {"data": []}
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(policy.run(fails))
+    asyncio.run(policy.run(succeeds))
+
+    assert len(policy._latencies) == 1
+    assert policy.stats()["calls"] == 2
@@ -1,9 +1,11 @@
 # tests/test_itinerary_endpoint.py
 
+import json
 import pytest
 from unittest.mock import patch
 from fastapi.testclient import TestClient
 from app import app
+from src.utils.circuit_breaker import CircuitOpenError
 
 @pytest.fixture
 def client():
@@ -74,7 +76,8 @@ def test_fetch_itinerary_success(mock_get_city_activities, client, valid_request
         "testuser123",
         "London",
         10,
-        5
+        5,
+        None
     )
 
 @patch("app.get_city_activities")
@@ -107,3 +110,81 @@ def test_fetch_itinerary_validation_error(client):
     response = client.post("/itinerary", json=invalid_payload)
     assert response.status_code == 422
     assert "detail" in response.json()
+
+
+@patch("src.services.itinerary_service.get_activities")
+@patch("src.services.itinerary_service.get_city_geocode")
+def test_fetch_itinerary_streams_ndjson(mock_get_geocode, mock_get_activities, client, valid_request_payload):
+    """
+    GIVEN a request accepting application/x-ndjson
+    WHEN we POST to /itinerary
+    THEN each activity is streamed on its own line, followed by a line with the next cursor.
+    """
+    mock_get_geocode.return_value = (51.5074, -0.1278)
+    mock_get_activities.return_value = {"data": [{"id": f"ACT_{i}", "name": f"Activity {i}"} for i in range(7)]}
+
+    response = client.post("/itinerary", json=valid_request_payload, headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["activity_id"] for line in lines[:-1]] == ["ACT_0", "ACT_1", "ACT_2", "ACT_3", "ACT_4"]
+    assert lines[-1]["user_id"] == "testuser123"
+    assert lines[-1]["next_cursor"] is not None
+
+def test_fetch_itinerary_rejects_invalid_cursor(client, valid_request_payload):
+    valid_request_payload["itinerary"]["cursor"] = "not-a-cursor"
+
+    response = client.post("/itinerary", json=valid_request_payload)
+
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["detail"]
+
+
+@patch("src.services.itinerary_service.get_activities")
+@patch("src.services.itinerary_service.get_city_geocode")
+def test_fetch_itinerary_batch_returns_partial_results(mock_get_geocode, mock_get_activities, client):
+    """
+    GIVEN a batch request for a known and an unknown city
+    WHEN we POST to /itinerary/batch
+    THEN we should get a 200 response with a result item and an error item.
+    """
+    mock_get_geocode.side_effect = lambda city_name: (None, None) if city_name == "Atlantis" else (51.5074, -0.1278)
+    mock_get_activities.return_value = {"data": [{"id": "ACT_1", "name": "London Eye"}]}
+
+    response = client.post("/itinerary/batch", json={
+        "user_id": "testuser123",
+        "itineraries": [{"city": "London", "radius": 10, "limit": 5}, {"city": "Atlantis", "radius": 10, "limit": 5}]
+    })
+
+    assert response.status_code == 200
+    london, atlantis = response.json()["items"]
+    assert london["status_code"] == 200
+    assert london["results"][0]["activity_name"] == "London Eye"
+    assert atlantis["status_code"] == 404
+    assert atlantis["error"] == "Could not find geocode for city: Atlantis"
+
+def test_fetch_itinerary_batch_rejects_empty_and_oversized_batches(client):
+    itinerary = {"city": "London", "radius": 10, "limit": 5}
+
+    empty = client.post("/itinerary/batch", json={"user_id": "testuser123", "itineraries": []})
+    oversized = client.post("/itinerary/batch", json={"user_id": "testuser123", "itineraries": [itinerary] * 11})
+
+    assert empty.status_code == 422
+    assert oversized.status_code == 422
+
+
+@patch("app.get_city_activities")
+def test_fetch_itinerary_returns_503_while_circuit_is_open(mock_get_city_activities, client, valid_request_payload):
+    """
+    GIVEN an upstream circuit breaker is open and nothing cached can stand in
+    WHEN we POST to /itinerary
+    THEN we should get a 503 response with a Retry-After header.
+    """
+    mock_get_city_activities.side_effect = CircuitOpenError("Amadeus", 4.2)
+
+    response = client.post("/itinerary", json=valid_request_payload)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert "circuit breaker is open" in response.json()["detail"]
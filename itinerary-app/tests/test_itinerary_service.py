@@ -1,7 +1,9 @@
+import asyncio
+import httpx
 import pytest
 from unittest.mock import patch, MagicMock
-from src.services.itinerary_service import get_city_activities
-from src.models.itinerary_model import ItineraryResponse, ItineraryResponseObj
+from src.services.itinerary_service import get_city_activities, get_batch_city_activities, decode_cursor, encode_cursor
+from src.models.itinerary_model import ItineraryResponse, ItineraryResponseObj, ItineraryRequestObj
 
 @pytest.fixture
 def mock_city_geocode():
@@ -66,7 +68,7 @@ def test_get_city_activities_successful_flow(
     limit = 2  # We only want 2 results
 
     # Act
-    response = get_city_activities(user_id, city_name, radius, limit)
+    response = asyncio.run(get_city_activities(user_id, city_name, radius, limit))
 
     # Assert
     mock_get_geocode.assert_called_once_with(city_name)
@@ -101,7 +103,7 @@ def test_get_city_activities_cannot_find_geocode(
     # Arrange
     mock_get_geocode.return_value = (None, None)
 
-    response = get_city_activities("test_user", "UnknownCity", 5, 2)
+    response = asyncio.run(get_city_activities("test_user", "UnknownCity", 5, 2))
     
     # If we return {"error": "..."} it might not be an ItineraryResponse,
     # so check the shape
@@ -129,7 +131,80 @@ def test_get_city_activities_limiting_results(
     }
 
     user_id = "limit_user"
-    response = get_city_activities(user_id, "SomeCity", 10, limit=1)
+    response = asyncio.run(get_city_activities(user_id, "SomeCity", 10, limit=1))
     assert len(response.results) == 1  # Only 1 result, respecting limit=1
     assert response.results[0].activity_id == "ACT_1"
     assert response.user_id == user_id
+
+
+@patch("src.services.itinerary_service.get_city_geocode")
+@patch("src.services.itinerary_service.get_activities")
+def test_get_city_activities_paginates_with_cursor(
+    mock_get_activities,
+    mock_get_geocode
+):
+    """
+    GIVEN 5 activities and a page size of 2
+    WHEN get_city_activities is called following next_cursor
+    THEN the pages cover every activity once and the last page has no next_cursor.
+    """
+    mock_get_geocode.return_value = (40.7128, -74.0060)
+    mock_get_activities.return_value = {"data": [{"id": f"ACT_{i}"} for i in range(5)]}
+
+    pages, cursor = [], None
+    while True:
+        response = asyncio.run(get_city_activities("page_user", "SomeCity", 10, limit=2, cursor=cursor))
+        pages.append([result.activity_id for result in response.results])
+        cursor = response.next_cursor
+        if cursor is None:
+            break
+
+    assert pages == [["ACT_0", "ACT_1"], ["ACT_2", "ACT_3"], ["ACT_4"]]
+
+def test_cursor_round_trip_and_invalid_cursor():
+    assert decode_cursor(encode_cursor(40)) == 40
+    assert decode_cursor(None) == 0
+
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor("garbage")
+
+
+@patch("src.services.itinerary_service.get_city_geocode")
+@patch("src.services.itinerary_service.get_activities")
+def test_get_batch_city_activities_reports_each_city_separately(
+    mock_get_activities,
+    mock_get_geocode,
+    mock_activities_response
+):
+    """
+    GIVEN a batch where one city has activities, one is unknown, one hits an upstream error and one has a bad cursor
+    WHEN get_batch_city_activities is called
+    THEN every city gets its own item, in request order, and only the failing ones carry an error.
+    """
+    async def geocode(city_name):
+        if city_name == "Atlantis":
+            return (None, None)
+        if city_name == "Berlin":
+            request = httpx.Request("GET", "https://api.openweathermap.org/geo/1.0/direct")
+            raise httpx.HTTPStatusError("Too Many Requests", request=request, response=httpx.Response(429, request=request))
+        return (51.5074, -0.1278)
+
+    mock_get_geocode.side_effect = geocode
+    mock_get_activities.return_value = mock_activities_response
+
+    response = asyncio.run(get_batch_city_activities("batch_user", [
+        ItineraryRequestObj(city="London", radius=10, limit=1),
+        ItineraryRequestObj(city="Atlantis", radius=10, limit=1),
+        ItineraryRequestObj(city="Berlin", radius=10, limit=1),
+        ItineraryRequestObj(city="Paris", radius=10, limit=1, cursor="garbage")
+    ]))
+
+    assert response.user_id == "batch_user"
+    assert [item.city for item in response.items] == ["London", "Atlantis", "Berlin", "Paris"]
+    assert [item.status_code for item in response.items] == [200, 404, 502, 400]
+
+    london = response.items[0]
+    assert [result.activity_id for result in london.results] == ["ACT_1"]
+    assert london.next_cursor is not None
+    assert london.error is None
+    assert all(item.results == [] and item.error for item in response.items[1:])
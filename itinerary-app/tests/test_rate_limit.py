@@ -0,0 +1,127 @@
+import asyncio
+import time
+import httpx
+import pytest
+from src.utils.rate_limit import AdaptiveConcurrencyLimit, TokenBucket, UpstreamLimiter, retry_after_seconds
+
+
+def test_token_bucket_disabled_never_delays_lookups():
+    bucket = TokenBucket(rate=0, burst=1)
+
+    async def main():
+        await asyncio.gather(*(bucket.acquire() for _ in range(50)))
+
+    asyncio.run(main())
+
+    assert bucket.stats()["delayed"] == 0
+
+
+def test_token_bucket_gives_back_the_token_of_a_cancelled_lookup():
+    """
+    GIVEN a bucket allowing 10 lookups per second with a burst of 1, already used up
+    WHEN a waiting lookup is cancelled (e.g. its itinerary request was dropped)
+    THEN the next lookup waits for one token (about 100 ms), not two.
+    """
+    bucket = TokenBucket(rate=10, burst=1)
+
+    async def main():
+        await bucket.acquire()
+        waiting = asyncio.ensure_future(bucket.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) < 0.18
+    assert bucket.stats()["queued"] == 0
+
+
+def test_adaptive_limit_hands_the_slot_of_a_cancelled_waiter_to_the_next_one():
+    limit = AdaptiveConcurrencyLimit(max_limit=1)
+
+    async def main():
+        await limit.acquire()
+        cancelled = asyncio.ensure_future(limit.acquire())
+        next_in_line = asyncio.ensure_future(limit.acquire())
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        limit.release(0.01)
+        await asyncio.wait_for(next_in_line, timeout=1)
+        assert cancelled.cancelled()
+
+    asyncio.run(main())
+
+    assert limit.stats()["in_flight"] == 1
+    assert limit.stats()["queued"] == 0
+
+
+def test_upstream_limiter_treats_a_timeout_as_overload():
+    """
+    GIVEN a limiter allowing 4 concurrent activity lookups
+    WHEN a lookup times out
+    THEN the timeout is raised and the concurrency limit is halved.
+    """
+    limiter = UpstreamLimiter(rate=0, burst=1, max_concurrency=4)
+
+    async def request():
+        raise httpx.ReadTimeout("Amadeus did not answer")
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(limiter.send(request))
+
+    assert limiter.stats()["concurrency"]["limit"] == 2
+    assert limiter.stats()["concurrency"]["in_flight"] == 0
+
+
+def test_upstream_limiter_retry_after_holds_back_other_lookups():
+    """
+    GIVEN one lookup answered with 429 and Retry-After: 0.05
+    WHEN another lookup starts while that pause is running
+    THEN it does not reach Amadeus before the pause is over.
+    """
+    limiter = UpstreamLimiter(rate=1000, burst=10, max_concurrency=4)
+    sent_at = {}
+
+    async def main():
+        first_throttled = asyncio.Event()
+
+        async def first():
+            if first_throttled.is_set():
+                return httpx.Response(200)
+            first_throttled.set()
+            return httpx.Response(429, headers={"Retry-After": "0.05"})
+
+        async def second():
+            sent_at["second"] = time.monotonic()
+            return httpx.Response(200)
+
+        async def after_throttle():
+            await first_throttled.wait()
+            sent_at["throttled"] = time.monotonic()
+            return await limiter.send(second)
+
+        return await asyncio.gather(limiter.send(first), after_throttle())
+
+    responses = asyncio.run(main())
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert sent_at["second"] - sent_at["throttled"] >= 0.04
+    assert limiter.stats()["retries"] == 1
+
+
+def test_backoff_stays_within_backoff_max():
+    limiter = UpstreamLimiter(rate=0, burst=1, max_concurrency=1, backoff_base=0.5, backoff_max=2)
+
+    assert all(0 <= limiter.backoff(attempt) <= 2 for attempt in range(10))
+
+
+def test_retry_after_seconds_ignores_an_unreadable_header():
+    request = httpx.Request("GET", "https://example.com")
+
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "soon"}, request=request)) is None
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "-3"}, request=request)) == 0.0
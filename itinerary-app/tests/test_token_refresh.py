@@ -1,7 +1,10 @@
+import json
+import time
+import threading
 import pytest
 from unittest.mock import patch, MagicMock
 import src.utils.api_refresh_token as token_module
-from src.utils.api_refresh_token import get_amadeus_token, get_valid_token
+from src.utils.api_refresh_token import get_amadeus_token, get_valid_token, refresh_token
 
 
 @pytest.fixture(autouse=True)
@@ -114,3 +117,87 @@ def test_get_valid_token_propagates_exception_if_refresh_fails(mock_get_token):
             get_valid_token()
         assert "Network error" in str(exc.value)
         assert mock_get_token.call_count == 2
+
+
+def mock_token_response(access_token="test_access_token", expires_in=3600):
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {
+        "access_token": access_token,
+        "expires_in": expires_in
+    }
+    return mock_response
+
+
+@patch("src.utils.api_refresh_token.requests.post")
+def test_get_valid_token_concurrent_callers_share_a_single_refresh(mock_post):
+    """
+    GIVEN no valid token and many threads requesting one at the same time
+    WHEN get_valid_token() is called concurrently
+    THEN only one request should be made to the Amadeus OAuth endpoint.
+    """
+    def slow_post(*args, **kwargs):
+        time.sleep(0.05)
+        return mock_token_response("shared_token")
+
+    mock_post.side_effect = slow_post
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_valid_token())) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["shared_token"] * 10
+    mock_post.assert_called_once()
+
+
+@patch("src.utils.api_refresh_token.requests.post")
+def test_refresh_token_skips_refresh_if_rejected_token_already_replaced(mock_post):
+    """
+    GIVEN a request was rejected with an old token that has since been replaced
+    WHEN refresh_token(old_token) is called
+    THEN the current token should be returned without another OAuth request.
+    """
+    token_module.token = "new_token"
+    token_module.token_expiry = time.time() + 600
+
+    assert refresh_token("old_token") == "new_token"
+    mock_post.assert_not_called()
+
+    mock_post.return_value = mock_token_response("newest_token")
+    assert refresh_token("new_token") == "newest_token"
+    mock_post.assert_called_once()
+
+
+@patch("src.utils.api_refresh_token.requests.post")
+def test_get_valid_token_adopts_token_from_shared_file(mock_post, tmp_path, monkeypatch):
+    """
+    GIVEN a shared token file holding a token refreshed by another worker
+    WHEN get_valid_token() is called in this worker
+    THEN the shared token should be used without calling Amadeus.
+    """
+    token_file = tmp_path / "amadeus_token.json"
+    token_file.write_text(json.dumps({"access_token": "worker_token", "token_expiry": time.time() + 600}))
+    monkeypatch.setattr(token_module, "AMADEUS_TOKEN_FILE", str(token_file))
+
+    assert get_valid_token() == "worker_token"
+    mock_post.assert_not_called()
+
+
+@patch("src.utils.api_refresh_token.requests.post")
+def test_get_amadeus_token_writes_new_token_to_shared_file(mock_post, tmp_path, monkeypatch):
+    """
+    GIVEN a shared token file that only holds a rejected token
+    WHEN get_amadeus_token() refreshes it
+    THEN the new token should be fetched and written back for other workers.
+    """
+    token_file = tmp_path / "amadeus_token.json"
+    token_file.write_text(json.dumps({"access_token": "rejected", "token_expiry": time.time() + 600}))
+    monkeypatch.setattr(token_module, "AMADEUS_TOKEN_FILE", str(token_file))
+    mock_post.return_value = mock_token_response("fresh_token")
+
+    assert get_amadeus_token(rejected_token="rejected") == "fresh_token"
+    assert json.loads(token_file.read_text())["access_token"] == "fresh_token"
+    mock_post.assert_called_once()
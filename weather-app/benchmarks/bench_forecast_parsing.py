@@ -0,0 +1,79 @@
+"""
+Micro-benchmark for turning an Open-Meteo daily forecast into ForecastDay models.
+
+Compares the previous implementation (validating every key with a generator, then building
+and validating one ForecastDay per index) against the columnar parse_forecast in weather_service
+(arrays zipped once, rows validated in a single TypeAdapter call), on a 16-day forecast
+(the longest Open-Meteo serves).
+
+Run from the weather-app directory:
+    python benchmarks/bench_forecast_parsing.py
+"""
+import logging
+import os
+import sys
+import timeit
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+WEATHER_APP_DIR = os.path.join(CURRENT_DIR, '..')
+sys.path.insert(0, WEATHER_APP_DIR)
+
+from src.models.weather_model import ForecastDay
+from src.services.weather_service import WMO_code, parse_forecast
+
+FORECAST_DAYS = 16
+
+FORECAST_DATA = {
+    "daily": {
+        "time": [f"2025-04-{day:02d}" for day in range(1, FORECAST_DAYS + 1)],
+        "weather_code": [(0, 3, 45, 61, 80, 95)[day % 6] for day in range(FORECAST_DAYS)],
+        "temperature_2m_max": [15.0 + day * 0.5 for day in range(FORECAST_DAYS)],
+        "temperature_2m_min": [5.0 + day * 0.25 for day in range(FORECAST_DAYS)],
+        "sunrise": [f"2025-04-{day:02d}T06:15" for day in range(1, FORECAST_DAYS + 1)],
+        "sunset": [f"2025-04-{day:02d}T19:45" for day in range(1, FORECAST_DAYS + 1)],
+        "uv_index_max": [4.0 + day % 3 for day in range(FORECAST_DAYS)],
+        "precipitation_probability_max": [day * 5 for day in range(FORECAST_DAYS)],
+        "wind_speed_10m_max": [6.0 - day * 0.1 for day in range(FORECAST_DAYS)]
+    }
+}
+
+
+def legacy_parse_forecast(forecast_data):
+    forecast_list = []
+    daily_data = forecast_data["daily"]
+    if not all(len(daily_data[key]) == len(daily_data["time"]) for key in daily_data):
+        raise ValueError("Incomplete daily forecast data")
+
+    for i in range(1, len(daily_data["time"])):
+        weather_code = daily_data["weather_code"][i]
+        weather_description = WMO_code.get(weather_code, "Unknown")
+
+        forecast_list.append(ForecastDay(
+            date=daily_data["time"][i],
+            weather_description=weather_description,
+            temperature_max=daily_data["temperature_2m_max"][i],
+            temperature_min=daily_data["temperature_2m_min"][i],
+            sunrise=daily_data["sunrise"][i],
+            sunset=daily_data["sunset"][i],
+            uv_index_max=daily_data["uv_index_max"][i],
+            precipitation_probability_max=daily_data["precipitation_probability_max"][i],
+            wind_speed_max=daily_data["wind_speed_10m_max"][i]
+        ))
+    return forecast_list
+
+
+def bench(label: str, func, number: int):
+    per_request = timeit.timeit(lambda: func(FORECAST_DATA), number=number) / number
+    print(f"{label:<10} {per_request * 1e6:>10.2f} us/request")
+    return per_request
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)  # keep service logging out of the timings
+
+    expected = [day.model_dump() for day in legacy_parse_forecast(FORECAST_DATA)]
+    assert [day.model_dump() for day in parse_forecast(FORECAST_DATA)] == expected
+
+    legacy = bench("legacy", legacy_parse_forecast, number=20_000)
+    columnar = bench("columnar", parse_forecast, number=20_000)
+    print(f"saved: {(legacy - columnar) * 1e6:.2f} us/request ({legacy / columnar:.1f}x)")
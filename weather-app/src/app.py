@@ -1,7 +1,12 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from .models.weather_model import WeatherRequest, WeatherResponse
-from .services.weather_service import get_weather
+from .models.weather_model import (
+    WeatherRequest, WeatherResponse, WeatherBatchRequest, WeatherBatchItem, WeatherBatchResponse
+)
+from .services import weather_service
+from .services.weather_service import get_weather, get_weather_batch
+from .utils import api_client
+from .utils.circuit_breaker import CircuitOpenError
 from .utils.logging import configure_logging
 import logging
 
@@ -18,9 +23,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# map errors raised by weather_service.get_weather onto HTTP status codes and details
+def error_response(e: Exception) -> tuple:
+    if isinstance(e, CircuitOpenError) or isinstance(e.__cause__, CircuitOpenError):
+        logger.warning(f"Upstream unavailable: {str(e.__cause__ or e)}")
+        return 503, f"Service unavailable: {str(e.__cause__ or e)}"
+
+    if isinstance(e, KeyError):
+        logger.error(f"Missing key in response: {str(e)}")
+        return 400, f"Invalid response structure: {str(e)}"
+
+    if isinstance(e, ValueError):
+        logger.warning(f"Data validation issue: {str(e)}")
+        return 404, f"Data issue: {str(e)}"
+
+    if isinstance(e, RuntimeError):
+        logger.error(f"Service error: {str(e)}")
+        return 500, f"Service error: {str(e)}"
+
+    logger.error(f"Unexpected error: {str(e)}", exc_info=e) # log exception traceback
+    return 400, f"Unexpected error: {str(e)}"
+
 # endpoint to fetch weather data for given city and optional country code
+# (sync so FastAPI runs it in the threadpool and concurrent requests can share upstream calls)
 @app.post("/weather", response_model=WeatherResponse)
-async def fetch_weather(request: WeatherRequest):
+def fetch_weather(request: WeatherRequest):
     try:
         logger.info(f"Calling weather_service.get_weather() for city: {request.weather.city}, country_code: {request.weather.country_code}")
         weather_data = get_weather(request.user_id, request.weather.city, request.weather.country_code)
@@ -32,18 +59,38 @@ async def fetch_weather(request: WeatherRequest):
 
         return weather_data
     
-    except KeyError as e:
-        logger.error(f"Missing key in response: {str(e)}")
-        raise HTTPException(status_code=400, detail=f"Invalid response structure: {str(e)}")
+    except Exception as e:
+        status_code, detail = error_response(e)
+        raise HTTPException(status_code=status_code, detail=detail)
 
-    except ValueError as e:
-        logger.warning(f"Data validation issue: {str(e)}")
-        raise HTTPException(status_code=404, detail=f"Data issue: {str(e)}")
+# endpoint to fetch weather data for several cities in one call, with a status/error per city
+@app.post("/weather/batch", response_model=WeatherBatchResponse)
+def fetch_weather_batch(request: WeatherBatchRequest):
+    logger.info(f"Calling weather_service.get_weather_batch() for {len(request.cities)} cities")
+    results = get_weather_batch(request.user_id, request.cities)
 
-    except RuntimeError as e:
-        logger.error(f"Service error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Service error: {str(e)}")
-    
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}", exc_info=True) # log exception traceback
-        raise HTTPException(status_code=400, detail=f"Unexpected error: {str(e)}")
+    items = []
+    for city, result in zip(request.cities, results):
+        if isinstance(result, Exception):
+            status_code, detail = error_response(result)
+            items.append(WeatherBatchItem(city=city.city, country_code=city.country_code, status_code=status_code, error=detail))
+        else:
+            items.append(WeatherBatchItem(city=city.city, country_code=city.country_code, status_code=200, results=result.results))
+
+    return WeatherBatchResponse(user_id=request.user_id, items=items)
+
+# coordinate cache hits skip the OpenWeather round trip; collapsed counts lookups answered by another request's call
+@app.get("/metrics")
+def metrics():
+    return {
+        "coordinate_cache": weather_service.coordinate_cache.stats(),
+        "forecast_cache": api_client.forecast_cache.stats(),
+        "weather_coalescer": api_client.weather_coalescer.stats(),
+        "forecast_coalescer": api_client.forecast_coalescer.stats(),
+        "weather_fallback_cache": api_client.weather_fallback_cache.stats(),
+        "forecast_fallback_cache": api_client.forecast_fallback_cache.stats(),
+        "openweather_breaker": api_client.openweather_breaker.stats(),
+        "open_meteo_breaker": api_client.open_meteo_breaker.stats(),
+        "openweather_hedging": api_client.openweather_hedging.stats(),
+        "open_meteo_hedging": api_client.open_meteo_hedging.stats()
+    }
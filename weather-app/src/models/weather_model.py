@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
+MAX_BATCH_CITIES = 25
+
 # request model for endpoint
 class WeatherRequestObj(BaseModel):
     city: str
@@ -10,6 +12,10 @@ class WeatherRequest(BaseModel):
     user_id: str
     weather: WeatherRequestObj
 
+class WeatherBatchRequest(BaseModel):
+    user_id: str
+    cities: List[WeatherRequestObj] = Field(..., min_length=1, max_length=MAX_BATCH_CITIES)
+
 # model for single forecast day
 class ForecastDay(BaseModel):
     date: str
@@ -43,4 +49,16 @@ class CurrentWeather(BaseModel):
 # response model for endpoint
 class WeatherResponse(BaseModel):
     user_id: str
-    results: dict
\ No newline at end of file
+    results: dict
+
+# per-city result of the batch endpoint (results on success, error otherwise)
+class WeatherBatchItem(BaseModel):
+    city: str
+    country_code: Optional[str] = None
+    status_code: int
+    results: Optional[dict] = None
+    error: Optional[str] = None
+
+class WeatherBatchResponse(BaseModel):
+    user_id: str
+    items: List[WeatherBatchItem]
@@ -1,11 +1,28 @@
-from ..utils.api_client import get_weather_data, get_weather_forecast
-from ..models.weather_model import ForecastDay, CurrentWeather, WeatherResponse
+from ..utils.api_client import city_key, get_weather_data, get_weather_forecast
+from ..utils.cache import TTLCache
+from ..models.weather_model import ForecastDay, CurrentWeather, WeatherResponse, WeatherRequestObj
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Union
+from pydantic import TypeAdapter
 import logging
 import json
+import os
 
 logger = logging.getLogger("weather_microservice")
 
+# city -> (lat, lon) learnt from OpenWeather responses; once known, the Open-Meteo forecast
+# is requested alongside the OpenWeather call instead of after it
+COORDINATE_CACHE_TTL = float(os.getenv("COORDINATE_CACHE_TTL", "86400"))
+COORDINATE_CACHE_MAX_ENTRIES = int(os.getenv("COORDINATE_CACHE_MAX_ENTRIES", "4096"))
+FORECAST_PREFETCH_WORKERS = int(os.getenv("FORECAST_PREFETCH_WORKERS", "16"))
+# cities fetched at once across all batch requests handled by this worker
+WEATHER_BATCH_CONCURRENCY = int(os.getenv("WEATHER_BATCH_CONCURRENCY", "8"))
+
+coordinate_cache = TTLCache(max_entries=COORDINATE_CACHE_MAX_ENTRIES, ttl=COORDINATE_CACHE_TTL)
+forecast_executor = ThreadPoolExecutor(max_workers=FORECAST_PREFETCH_WORKERS, thread_name_prefix="forecast")
+batch_executor = ThreadPoolExecutor(max_workers=WEATHER_BATCH_CONCURRENCY, thread_name_prefix="weather-batch")
+
 # country name mapping for OpenWeather
 BASE_DIR = Path(__file__).resolve().parent
 COUNTRY_FILE = BASE_DIR / "countries_data.json"
@@ -26,6 +43,55 @@ WMO_code = {
     99: "Thunderstorm with heavy hail"
 }
 
+# validates a whole forecast in one call into pydantic-core
+forecast_days_adapter = TypeAdapter(List[ForecastDay])
+
+def parse_forecast(forecast_data: dict) -> List[ForecastDay]:
+    """
+    Build the forecast days (skipping today) from Open-Meteo's columnar daily arrays.
+    The columns are zipped once and the resulting rows validated in bulk.
+    """
+    try:
+        daily_data = forecast_data["daily"]
+        num_days = len(daily_data["time"])
+        if any(len(values) != num_days for values in daily_data.values()):
+            logger.warning("Incomplete daily forecast data")
+            raise ValueError("Incomplete daily forecast data")
+
+        columns = zip(
+            daily_data["time"][1:],
+            daily_data["weather_code"][1:],
+            daily_data["temperature_2m_max"][1:],
+            daily_data["temperature_2m_min"][1:],
+            daily_data["sunrise"][1:],
+            daily_data["sunset"][1:],
+            daily_data["uv_index_max"][1:],
+            daily_data["precipitation_probability_max"][1:],
+            daily_data["wind_speed_10m_max"][1:]
+        )
+    except KeyError as e:
+        logger.error(f"Missing key in forecast data: {e}")
+        raise KeyError("Incomplete or missing forecast data") from e
+
+    forecast_list = forecast_days_adapter.validate_python([
+        {
+            "date": date,
+            "weather_description": WMO_code.get(weather_code, "Unknown"), # map WMO code to description
+            "temperature_max": temperature_max,
+            "temperature_min": temperature_min,
+            "sunrise": sunrise,
+            "sunset": sunset,
+            "uv_index_max": uv_index_max,
+            "precipitation_probability_max": precipitation_probability_max,
+            "wind_speed_max": wind_speed_max
+        }
+        for date, weather_code, temperature_max, temperature_min, sunrise, sunset,
+            uv_index_max, precipitation_probability_max, wind_speed_max in columns
+    ])
+
+    logger.info(f"Forecast data processed successfully for {len(forecast_list)} days")
+    return forecast_list
+
 """
 KeyError when expected key is missing
 ValueError when data is incomplete
@@ -34,6 +100,15 @@ RuntimeError for general failures (e.g. API call failures)
 def get_weather(user_id: str, city: str, country_code: str = None) -> WeatherResponse:
     logger.info("Fetching weather data...")
 
+    # [0] with known coordinates, start the forecast request now so both upstream calls overlap;
+    # the key is the one requested, not the country OpenWeather resolves the city to
+    coordinates_key = city_key(city, country_code)
+    coordinates = coordinate_cache.get(coordinates_key)
+    forecast_future = None
+    if coordinates is not None:
+        logger.debug(f"Using cached coordinates {coordinates} for {city}, prefetching forecast")
+        forecast_future = forecast_executor.submit(get_weather_forecast, *coordinates)
+
     # [1] fetch weather data from OpenWeather API
     try:
         data = get_weather_data(city, country_code)
@@ -43,8 +118,8 @@ def get_weather(user_id: str, city: str, country_code: str = None) -> WeatherRes
         raise RuntimeError("Failed to fetch weather data from OpenWeather API") from e
     
     try:
-        country_code = data["sys"]["country"] # extract country code
-        country_name = country_mapping.get(country_code, "Unknown")  # map onto country name
+        resolved_country_code = data["sys"]["country"] # extract country code
+        country_name = country_mapping.get(resolved_country_code, "Unknown")  # map onto country name
     except KeyError as e:
         logger.error(f"Missing country code: {e}")
         raise KeyError("Missing country code in weather data") from e
@@ -56,10 +131,14 @@ def get_weather(user_id: str, city: str, country_code: str = None) -> WeatherRes
     except KeyError as e:
         logger.error(f"Missing coordinate data: {e}")
         raise KeyError("Missing lat/lon in weather data") from e
+    coordinate_cache.set(coordinates_key, (lat, lon))
 
-    # [3] fetch forecast data from Open-Meteo API
+    # [3] fetch forecast data from Open-Meteo API (or collect the prefetched one)
     try:
-        forecast_data = get_weather_forecast(lat, lon)
+        if forecast_future is not None:
+            forecast_data = forecast_future.result()
+        else:
+            forecast_data = get_weather_forecast(lat, lon)
         if not forecast_data or "daily" not in forecast_data:            
             logger.warning(f"No forecast data found for lat={lat}, lon={lon}")
             raise ValueError("No forecast data available")
@@ -95,32 +174,24 @@ def get_weather(user_id: str, city: str, country_code: str = None) -> WeatherRes
         raise KeyError("Incomplete or missing current weather data") from e
 
     # [5] process forecast data
-    forecast_list = []
-    try:
-        daily_data = forecast_data["daily"]
-        if not all(len(daily_data[key]) == len(daily_data["time"]) for key in daily_data):
-            logger.warning("Incomplete daily forecast data")
-            raise ValueError("Incomplete daily forecast data")
-            
-        for i in range(1, len(daily_data["time"])):
-            weather_code = daily_data["weather_code"][i]
-            weather_description = WMO_code.get(weather_code, "Unknown") # map WMO code to description
-
-            forecast_list.append(ForecastDay(
-                date=daily_data["time"][i],
-                weather_description=weather_description,
-                temperature_max=daily_data["temperature_2m_max"][i],
-                temperature_min=daily_data["temperature_2m_min"][i],
-                sunrise=daily_data["sunrise"][i],
-                sunset=daily_data["sunset"][i],
-                uv_index_max=daily_data["uv_index_max"][i],
-                precipitation_probability_max=daily_data["precipitation_probability_max"][i],
-                wind_speed_max=daily_data["wind_speed_10m_max"][i]
-            ))
-            
-        logger.info(f"Forecast data processed successfully for {len(forecast_list)} days")
-    except KeyError as e:
-        logger.error("Missing key in forecast data: {e}")
-        raise KeyError("Incomplete or missing forecast data") from e
+    forecast_list = parse_forecast(forecast_data)
+
+    return WeatherResponse(user_id=user_id, results={"current": current_weather, "forecast": forecast_list})
+
+def get_weather_batch(user_id: str, cities: List[WeatherRequestObj]) -> List[Union[WeatherResponse, Exception]]:
+    """
+    Fetch weather for several cities concurrently (bounded by WEATHER_BATCH_CONCURRENCY),
+    sharing the caches and coalescers of single-city requests.
+    Returns one entry per city, in request order: the WeatherResponse, or the exception raised for that city.
+    """
+    logger.info(f"Fetching weather data for a batch of {len(cities)} cities...")
+    futures = [batch_executor.submit(get_weather, user_id, city.city, city.country_code) for city in cities]
 
-    return WeatherResponse(user_id=user_id, results={"current": current_weather, "forecast": forecast_list})
\ No newline at end of file
+    results = []
+    for city, future in zip(cities, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            logger.warning(f"Batch weather request failed for {city.city}: {str(e)}")
+            results.append(e)
+    return results
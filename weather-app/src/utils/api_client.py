@@ -1,7 +1,14 @@
 import os
+import time
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from dotenv import load_dotenv
+from .cache import StaleWhileRevalidateCache, TTLCache
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .coalesce import RequestCoalescer
+from .hedging import HedgingPolicy
 
 load_dotenv() # load environment variable(s)
 
@@ -11,8 +18,114 @@ OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
 
 logger = logging.getLogger("weather_microservice")
 
+# (connect, read) timeouts in seconds, so a degraded upstream cannot pin a worker thread
+OPENWEATHER_TIMEOUT = (
+    float(os.getenv("OPENWEATHER_CONNECT_TIMEOUT", "3")),
+    float(os.getenv("OPENWEATHER_READ_TIMEOUT", "10"))
+)
+OPEN_METEO_TIMEOUT = (
+    float(os.getenv("OPEN_METEO_CONNECT_TIMEOUT", "3")),
+    float(os.getenv("OPEN_METEO_READ_TIMEOUT", "10"))
+)
+
+# OpenWeather and Open-Meteo breakers: a weather lookup gives up fast while its provider is failing or slow
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "5"))
+CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.5"))
+CIRCUIT_WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+
+# opt-in: a weather/forecast lookup slower than HEDGING_PERCENTILE is sent again on the hedging pool (HEDGING_BUDGET caps the share)
+HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGING_PERCENTILE = float(os.getenv("HEDGING_PERCENTILE", "95"))
+HEDGING_INITIAL_DELAY = float(os.getenv("HEDGING_INITIAL_DELAY", "1"))
+HEDGING_BUDGET = float(os.getenv("HEDGING_BUDGET", "0.05"))
+HEDGING_WORKERS = int(os.getenv("HEDGING_WORKERS", "32"))
+
+# last good response per city / forecast grid cell, served while a circuit is open (STALE_FALLBACK_TTL=0 disables it)
+STALE_FALLBACK_TTL = float(os.getenv("STALE_FALLBACK_TTL", "21600"))
+STALE_FALLBACK_MAX_ENTRIES = int(os.getenv("STALE_FALLBACK_MAX_ENTRIES", "2048"))
+
+# Open-Meteo forecast cache: nearby coordinates share a grid cell, and entries expire on the
+# model update cadence, then are served stale for a while during a background refresh
+FORECAST_GRID_DEGREES = float(os.getenv("FORECAST_GRID_DEGREES", "0.1"))
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", "3600"))
+FORECAST_CACHE_STALE_TTL = float(os.getenv("FORECAST_CACHE_STALE_TTL", "3600"))
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", "2048"))
+
+# current weather is keyed by (city, country code), forecasts by grid cell
+weather_coalescer = RequestCoalescer()
+forecast_coalescer = RequestCoalescer()
+
+def _new_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        failure_rate=CIRCUIT_FAILURE_RATE,
+        slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS,
+        slow_call_rate=CIRCUIT_SLOW_CALL_RATE,
+        window_size=CIRCUIT_WINDOW_SIZE,
+        min_calls=CIRCUIT_MIN_CALLS,
+        open_seconds=CIRCUIT_OPEN_SECONDS
+    )
+
+openweather_breaker = _new_breaker("OpenWeather")
+open_meteo_breaker = _new_breaker("Open-Meteo")
+
+# with hedging enabled, both the first and the hedged call run on this pool
+hedging_executor = ThreadPoolExecutor(max_workers=HEDGING_WORKERS, thread_name_prefix="hedged-request")
+
+def _new_hedging_policy() -> HedgingPolicy:
+    return HedgingPolicy(
+        hedging_executor,
+        enabled=HEDGING_ENABLED,
+        percentile=HEDGING_PERCENTILE,
+        initial_delay=HEDGING_INITIAL_DELAY,
+        budget=HEDGING_BUDGET
+    )
+
+openweather_hedging = _new_hedging_policy()
+open_meteo_hedging = _new_hedging_policy()
+
+weather_fallback_cache = TTLCache(max_entries=STALE_FALLBACK_MAX_ENTRIES, ttl=STALE_FALLBACK_TTL)
+forecast_fallback_cache = TTLCache(max_entries=STALE_FALLBACK_MAX_ENTRIES, ttl=STALE_FALLBACK_TTL)
+
+forecast_cache = StaleWhileRevalidateCache(
+    executor=ThreadPoolExecutor(max_workers=4, thread_name_prefix="forecast-refresh"),
+    max_entries=FORECAST_CACHE_MAX_ENTRIES,
+    ttl=FORECAST_CACHE_TTL,
+    stale_ttl=FORECAST_CACHE_STALE_TTL,
+    align_expiry=True
+)
+
+def city_key(city: str, country_code: str = None) -> tuple:
+    """Normalised (city, country code) key shared by the weather coalescer and coordinate cache"""
+    return (city.strip().casefold(), country_code.upper() if country_code else None)
+
+def is_upstream_failure(response: requests.Response) -> bool:
+    """Responses that count against a circuit breaker (client errors are the caller's fault)"""
+    return response.status_code >= 500 or response.status_code == 429
+
+def with_fallback(fallback_cache: TTLCache, key: tuple, load):
+    """Return load(), or the last good value for key while the upstream's circuit is open"""
+    try:
+        return load()
+    except CircuitOpenError as e:
+        stale = fallback_cache.get(key)
+        if stale is None:
+            raise
+        logger.warning(f"{e.name} circuit is open, serving stale data for {key}")
+        return stale
+
 # OpenWeather API
 def get_weather_data(city: str, country_code: str = None) -> dict:
+    key = city_key(city, country_code)
+    return with_fallback(
+        weather_fallback_cache, key,
+        lambda: weather_coalescer.run(key, _request_weather_data, city, country_code)
+    )
+
+def _request_weather_data(city: str, country_code: str = None) -> dict:
     query = f"{city},{country_code}" if country_code else city
     params = {
         "q": query,
@@ -21,15 +134,46 @@ def get_weather_data(city: str, country_code: str = None) -> dict:
     }
 
     try:
-        response = requests.get(OPENWEATHER_URL, params=params)
+        response = openweather_hedging.run(lambda: openweather_breaker.call(
+            lambda: requests.get(OPENWEATHER_URL, params=params, timeout=OPENWEATHER_TIMEOUT),
+            is_failure=is_upstream_failure
+        ))
         response.raise_for_status() # raise exception for HTTP errors
-        return response.json()
+        data = response.json()
+        weather_fallback_cache.set(city_key(city, country_code), data)
+        return data
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed OpenWeather API request: {str(e)}", exc_info=True)
         raise RuntimeError("Error fetching weather data") from e
 
 # Open-Meteo API
+def forecast_key(lat: float, lon: float) -> tuple:
+    """Snap coordinates to the forecast grid (FORECAST_GRID_DEGREES, 0 to disable)"""
+    if FORECAST_GRID_DEGREES <= 0:
+        return (lat, lon)
+    return (
+        round(round(lat / FORECAST_GRID_DEGREES) * FORECAST_GRID_DEGREES, 4),
+        round(round(lon / FORECAST_GRID_DEGREES) * FORECAST_GRID_DEGREES, 4)
+    )
+
+def is_current_local_day(forecast: dict) -> bool:
+    """A cached forecast is only reused while its first day is still 'today' at the forecast location"""
+    local_now = datetime.fromtimestamp(time.time() + forecast.get("utc_offset_seconds", 0), timezone.utc)
+    days = forecast.get("daily", {}).get("time")
+    return bool(days) and days[0] == local_now.date().isoformat()
+
 def get_weather_forecast(lat: float, lon: float) -> dict:
+    key = forecast_key(lat, lon)
+    return with_fallback(
+        forecast_fallback_cache, key,
+        lambda: forecast_cache.get_or_load(
+            key,
+            lambda: forecast_coalescer.run(key, _request_weather_forecast, *key),
+            is_valid=is_current_local_day
+        )
+    )
+
+def _request_weather_forecast(lat: float, lon: float) -> dict:
     params = {
         "latitude": lat,
         "longitude": lon,
@@ -41,9 +185,14 @@ def get_weather_forecast(lat: float, lon: float) -> dict:
     }
 
     try:
-        response = requests.get(OPEN_METEO_URL, params=params)
+        response = open_meteo_hedging.run(lambda: open_meteo_breaker.call(
+            lambda: requests.get(OPEN_METEO_URL, params=params, timeout=OPEN_METEO_TIMEOUT),
+            is_failure=is_upstream_failure
+        ))
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        forecast_fallback_cache.set((lat, lon), data)
+        return data
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed Open-Meteo API request: {str(e)}", exc_info=True)
         raise RuntimeError("Error fetching forecast data") from e
\ No newline at end of file
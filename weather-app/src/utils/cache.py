@@ -0,0 +1,243 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger("weather_microservice")
+
+
+class CacheBackend(ABC):
+    """
+    Interface for the coordinate and forecast caches.
+    The services only need get/set, /metrics reads stats and tests call clear, so a replacement backend
+    must provide all four.
+    """
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class TTLCache(CacheBackend):
+    """
+    Thread-safe in-process LRU cache whose entries expire after ttl seconds.
+    Once max_entries is reached, the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class StaleWhileRevalidateCache(CacheBackend):
+    """
+    Thread-safe LRU cache whose expired entries keep being served for up to stale_ttl seconds
+    while a single background refresh (on executor) replaces them.
+    With align_expiry, entries expire on wall-clock multiples of ttl (e.g. every hour on the hour),
+    so they can follow an upstream update schedule rather than the time they were fetched.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        max_entries: int = 1024,
+        ttl: float = 300,
+        stale_ttl: float = 0,
+        align_expiry: bool = False
+    ):
+        self.executor = executor
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.align_expiry = align_expiry
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def _expires_at(self, now: float) -> float:
+        if self.align_expiry:
+            return (now // self.ttl + 1) * self.ttl
+        return now + self.ttl
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the entry only while it is fresh (no refresh is triggered)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() >= entry[0]:
+                return None
+            return entry[1]
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        is_valid: Callable[[Any], bool] = lambda value: True
+    ) -> Any:
+        """
+        Return the cached value for key, calling loader() on a miss.
+        Stale entries are returned as is and refreshed in the background;
+        entries for which is_valid returns False are discarded and reloaded.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not is_valid(entry[1]):
+                del self._entries[key]
+                self.invalidations += 1
+                entry = None
+
+            if entry is not None:
+                expires_at, value = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                if now < expires_at + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    start_refresh = key not in self._refreshing
+                    self._refreshing.add(key)
+                else:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+
+            if entry is None:
+                self.misses += 1
+
+        if entry is not None:
+            if start_refresh:
+                self.executor.submit(self._refresh, key, loader)
+            return value
+
+        value = loader()
+        self.set(key, value)
+        return value
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any]) -> None:
+        try:
+            self.set(key, loader())
+            with self._lock:
+                self.refreshes += 1
+        except Exception:
+            logger.warning(f"Background cache refresh failed for {key}, serving stale entry", exc_info=True)
+            with self._lock:
+                self.refresh_failures += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (self._expires_at(time.time()), value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+            }
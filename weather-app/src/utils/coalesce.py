@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+
+class RequestCoalescer:
+    """
+    Collapses concurrent weather lookups for the same place made from FastAPI's threadpool.
+    The first thread calls OpenWeather/Open-Meteo; threads asking for the same city or coordinates meanwhile
+    block on its Future and return the same payload, keeping bursts under the OpenWeather call quota.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> Future
+
+        self.calls = 0
+        self.collapsed = 0
+
+    def run(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.calls += 1
+            else:
+                self.collapsed += 1
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "collapsed": self.collapsed,
+                "in_flight": len(self._in_flight)
+            }
@@ -0,0 +1,105 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class HedgingPolicy:
+    """
+    Hedged requests for idempotent upstream calls made from worker threads.
+    If a call has not completed after the given percentile of recent call latencies (initial_delay
+    until min_samples latencies are known), a second identical call is started on executor; the first
+    successful response wins. A blocking call cannot be interrupted, so the slower one is left to finish
+    in the background and its response is discarded. Hedges are capped at budget (a fraction) of calls.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        enabled: bool = False,
+        percentile: float = 95,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.05,
+        budget: float = 0.05,
+        window_size: int = 200,
+        min_samples: int = 20
+    ):
+        self.executor = executor
+        self.enabled = enabled
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.fired = 0            # hedges sent
+        self.won = 0              # hedges whose response was used
+        self.budget_exceeded = 0  # hedges skipped because of the budget
+
+    def delay(self) -> float:
+        """Seconds to wait for the first call before hedging it"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(len(ordered) * self.percentile / 100) - 1)
+        return max(self.min_delay, ordered[index])
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self.fired + 1 > self.budget * self.calls:
+                self.budget_exceeded += 1
+                return False
+            self.fired += 1
+            return True
+
+    def _timed(self, call: Callable[[], T]) -> T:
+        started = time.monotonic()
+        result = call()
+        with self._lock:
+            self._latencies.append(time.monotonic() - started)
+        return result
+
+    def run(self, call: Callable[[], T]) -> T:
+        """Return call(), hedged with a second call() on the executor if the first is slow."""
+        if not self.enabled:
+            return call()
+
+        with self._lock:
+            self.calls += 1
+        primary = self.executor.submit(self._timed, call)
+        done, _ = wait([primary], timeout=self.delay())
+        if done or not self._take_budget():
+            return primary.result()
+
+        hedge = self.executor.submit(self._timed, call)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.won += 1
+                    hedge.cancel()  # no-op once started
+                    return future.result()
+        return primary.result()  # both calls failed, raise the first one's error
+
+    def stats(self) -> dict:
+        delay = self.delay()
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "calls": self.calls,
+                "fired": self.fired,
+                "won": self.won,
+                "budget_exceeded": self.budget_exceeded,
+                "delay": round(delay, 4)
+            }
@@ -0,0 +1,109 @@
+# tests/test_api_client.py
+
+import json
+import pytest
+import requests
+from datetime import datetime, timezone
+from unittest.mock import patch
+from src.utils import api_client
+from src.utils.api_client import forecast_key, get_weather_data, get_weather_forecast, is_current_local_day
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+@pytest.fixture(autouse=True)
+def clear_forecast_cache(monkeypatch):
+    monkeypatch.setattr(api_client, "openweather_breaker", CircuitBreaker("OpenWeather", min_calls=3))
+    api_client.forecast_cache.clear()
+    api_client.weather_fallback_cache.clear()
+    yield
+    api_client.forecast_cache.clear()
+
+def forecast_for(day: str, utc_offset_seconds: int = 0) -> dict:
+    return {"utc_offset_seconds": utc_offset_seconds, "daily": {"time": [day]}}
+
+def test_forecast_key_snaps_coordinates_to_grid():
+    """
+    GIVEN coordinates of two nearby points
+    WHEN they are mapped to forecast cache keys
+    THEN both fall into the same 0.1 degree grid cell.
+    """
+    assert forecast_key(51.5074, -0.1278) == (51.5, -0.1)
+    assert forecast_key(51.4812, -0.0951) == (51.5, -0.1)
+
+def test_is_current_local_day_uses_forecast_timezone():
+    """
+    GIVEN 23:00 UTC
+    WHEN the cached forecast's first day is compared with the local date
+    THEN a UTC+2 location is already on the next day.
+    """
+    late_evening = datetime(2025, 4, 10, 23, 0, tzinfo=timezone.utc).timestamp()
+
+    with patch("src.utils.api_client.time.time", return_value=late_evening):
+        assert is_current_local_day(forecast_for("2025-04-10"))
+        assert not is_current_local_day(forecast_for("2025-04-10", utc_offset_seconds=7200))
+        assert is_current_local_day(forecast_for("2025-04-11", utc_offset_seconds=7200))
+
+@patch("src.utils.api_client._request_weather_forecast")
+def test_get_weather_forecast_serves_nearby_points_from_cache(mock_request_weather_forecast):
+    """
+    GIVEN a forecast already fetched for a grid cell
+    WHEN a forecast is requested for another point in the same cell
+    THEN it is served from the cache without another Open-Meteo call.
+    """
+    today = datetime.now(timezone.utc).date().isoformat()
+    mock_request_weather_forecast.return_value = forecast_for(today)
+
+    first = get_weather_forecast(51.5074, -0.1278)
+    second = get_weather_forecast(51.4812, -0.0951)
+
+    assert first == second
+    mock_request_weather_forecast.assert_called_once_with(51.5, -0.1)
+    assert api_client.forecast_cache.stats()["hits"] == 1
+
+@patch("src.utils.api_client._request_weather_forecast")
+def test_get_weather_forecast_refetches_when_local_date_changes(mock_request_weather_forecast):
+    """
+    GIVEN a cached forecast whose first day is no longer today at the location
+    WHEN the forecast is requested again
+    THEN it is fetched again from Open-Meteo.
+    """
+    mock_request_weather_forecast.return_value = forecast_for("2000-01-01")
+
+    get_weather_forecast(51.5074, -0.1278)
+    get_weather_forecast(51.5074, -0.1278)
+
+    assert mock_request_weather_forecast.call_count == 2
+    assert api_client.forecast_cache.stats()["invalidations"] == 1
+
+def openweather_response(status_code: int, body: dict = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body or {}).encode()
+    return response
+
+@patch("src.utils.api_client.requests.get")
+def test_get_weather_data_sets_connect_and_read_timeouts(mock_get):
+    mock_get.return_value = openweather_response(200, {"name": "London"})
+
+    get_weather_data("London", "GB")
+
+    assert mock_get.call_args.kwargs["timeout"] == api_client.OPENWEATHER_TIMEOUT
+
+@patch("src.utils.api_client.requests.get")
+def test_get_weather_data_serves_stale_data_while_circuit_is_open(mock_get):
+    """
+    GIVEN London fetched once, then OpenWeather failing until its circuit opens
+    WHEN London is requested again
+    THEN the last good response is served without a request, and an unseen city fails fast.
+    """
+    mock_get.side_effect = [openweather_response(200, {"name": "London"})] + [openweather_response(503)] * 2
+
+    assert get_weather_data("London", "GB") == {"name": "London"}
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="Error fetching weather data"):
+            get_weather_data("Paris", "FR")
+
+    assert get_weather_data("london", "gb") == {"name": "London"}
+    with pytest.raises(CircuitOpenError):
+        get_weather_data("Paris", "FR")
+    assert mock_get.call_count == 3
+    assert api_client.openweather_breaker.stats()["state"] == "open"
@@ -0,0 +1,180 @@
+# tests/test_cache.py
+
+import pytest
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.cache import CacheBackend, TTLCache, StaleWhileRevalidateCache
+
+
+def test_ttl_cache_returns_stored_value_and_counts_hits_and_misses():
+    """
+    GIVEN an empty TTLCache
+    WHEN a key is looked up before and after being set
+    THEN the first lookup is a miss and the second a hit returning the stored value.
+    """
+    cache = TTLCache(max_entries=10, ttl=60)
+
+    assert cache.get("key") is None
+    cache.set("key", {"data": []})
+    assert cache.get("key") == {"data": []}
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_ttl_cache_expires_entries_after_ttl():
+    """
+    GIVEN an entry stored with a 60s TTL
+    WHEN it is looked up after the TTL has elapsed
+    THEN it should be treated as a miss and counted as an expiration.
+    """
+    cache = TTLCache(max_entries=10, ttl=60)
+
+    with patch("src.utils.cache.time.monotonic", return_value=1000):
+        cache.set("key", "value")
+    with patch("src.utils.cache.time.monotonic", return_value=1059):
+        assert cache.get("key") == "value"
+    with patch("src.utils.cache.time.monotonic", return_value=1060):
+        assert cache.get("key") is None
+
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_cache_evicts_least_recently_used_entry_when_full():
+    """
+    GIVEN a cache bounded to 2 entries
+    WHEN a third entry is added after the first one was read
+    THEN the least recently used entry (the second) should be evicted.
+    """
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.parametrize("max_entries, ttl", [(0, 60), (10, 0)])
+def test_ttl_cache_disabled_when_size_or_ttl_is_zero(max_entries, ttl):
+    cache = TTLCache(max_entries=max_entries, ttl=ttl)
+    cache.set("key", "value")
+    assert cache.get("key") is None
+
+
+def test_cache_backend_missing_stats_cannot_be_created():
+    """
+    GIVEN a coordinate cache backend that does not implement stats
+    WHEN it is instantiated
+    THEN a TypeError is raised instead of /metrics failing later.
+    """
+    class NoStatsCache(CacheBackend):
+        def get(self, key):
+            return None
+
+        def set(self, key, value):
+            pass
+
+        def clear(self):
+            pass
+
+    with pytest.raises(TypeError):
+        NoStatsCache()
+
+
+class InlineExecutor:
+    """Runs submitted refreshes immediately, so tests can check their outcome"""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, func, *args):
+        self.submitted += 1
+        func(*args)
+
+
+def test_swr_cache_serves_stale_entry_and_refreshes_in_background():
+    """
+    GIVEN an entry past its TTL but within the stale window
+    WHEN it is looked up
+    THEN the stale value is returned and a background refresh replaces it.
+    """
+    executor = InlineExecutor()
+    cache = StaleWhileRevalidateCache(executor, max_entries=10, ttl=60, stale_ttl=60)
+    loader_values = iter(["first", "second"])
+    loader = lambda: next(loader_values)
+
+    with patch("src.utils.cache.time.time", return_value=1000):
+        assert cache.get_or_load("key", loader) == "first"
+    with patch("src.utils.cache.time.time", return_value=1030):
+        assert cache.get_or_load("key", loader) == "first"
+    with patch("src.utils.cache.time.time", return_value=1070):
+        assert cache.get_or_load("key", loader) == "first"  # stale, refreshed behind the scenes
+        assert cache.get_or_load("key", loader) == "second"
+
+    stats = cache.stats()
+    assert executor.submitted == 1
+    assert (stats["misses"], stats["hits"], stats["stale_hits"], stats["refreshes"]) == (1, 2, 1, 1)
+    assert stats["hit_rate"] == 0.75
+
+
+def test_swr_cache_reloads_after_stale_window_and_on_invalid_entry():
+    """
+    GIVEN entries past the stale window or rejected by is_valid
+    WHEN they are looked up
+    THEN they are reloaded synchronously.
+    """
+    cache = StaleWhileRevalidateCache(InlineExecutor(), max_entries=10, ttl=60, stale_ttl=60)
+
+    with patch("src.utils.cache.time.time", return_value=1000):
+        cache.get_or_load("key", lambda: "old")
+    with patch("src.utils.cache.time.time", return_value=1200):
+        assert cache.get_or_load("key", lambda: "new") == "new"
+        assert cache.get_or_load("key", lambda: "newer", is_valid=lambda value: value != "new") == "newer"
+
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["invalidations"] == 1
+    assert stats["misses"] == 3
+
+
+def test_swr_cache_keeps_stale_entry_when_refresh_fails():
+    """
+    GIVEN a background refresh that raises
+    WHEN the stale entry is looked up
+    THEN the stale value is still served and the failure is counted.
+    """
+    cache = StaleWhileRevalidateCache(InlineExecutor(), max_entries=10, ttl=60, stale_ttl=60)
+
+    def failing_loader():
+        raise RuntimeError("upstream down")
+
+    with patch("src.utils.cache.time.time", return_value=1000):
+        cache.get_or_load("key", lambda: "value")
+    with patch("src.utils.cache.time.time", return_value=1070):
+        assert cache.get_or_load("key", failing_loader) == "value"
+        assert cache.get_or_load("key", failing_loader) == "value"
+
+    assert cache.stats()["refresh_failures"] == 2
+
+
+def test_swr_cache_aligns_expiry_to_ttl_boundaries():
+    """
+    GIVEN align_expiry with a 3600s TTL
+    WHEN an entry is stored shortly before the hour
+    THEN it expires on the hour rather than a full TTL later.
+    """
+    cache = StaleWhileRevalidateCache(ThreadPoolExecutor(max_workers=1), max_entries=10, ttl=3600, align_expiry=True)
+
+    with patch("src.utils.cache.time.time", return_value=7100):
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+    with patch("src.utils.cache.time.time", return_value=7200):
+        assert cache.get("key") is None
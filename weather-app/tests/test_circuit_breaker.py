@@ -0,0 +1,107 @@
+# tests/test_circuit_breaker.py
+
+import threading
+import pytest
+from unittest.mock import patch
+from src.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def fail():
+    raise ConnectionError("upstream down")
+
+
+def test_breaker_opens_when_failure_rate_reaches_threshold():
+    """
+    GIVEN a breaker needing 4 calls with a 50% failure rate
+    WHEN 2 of 4 calls fail
+    THEN the circuit opens and further calls fail fast without reaching the upstream.
+    """
+    breaker = CircuitBreaker("upstream", failure_rate=0.5, min_calls=4, open_seconds=30)
+    upstream_calls = []
+
+    def succeed():
+        upstream_calls.append(1)
+        return "ok"
+
+    breaker.call(succeed)
+    breaker.call(succeed)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.call(succeed)
+
+    assert len(upstream_calls) == 2
+    assert 0 < excinfo.value.retry_after <= 30
+    assert breaker.stats()["state"] == "open"
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_opens_on_slow_calls_and_failing_results():
+    breaker = CircuitBreaker("upstream", slow_call_seconds=1, slow_call_rate=0.5, min_calls=2)
+
+    with patch("src.utils.circuit_breaker.time.monotonic", side_effect=[0, 2, 10, 13, 13]):
+        breaker.call(lambda: "slow")
+        breaker.call(lambda: "slow")
+
+    assert breaker.stats()["state"] == "open"
+
+    breaker = CircuitBreaker("upstream", min_calls=2)
+    breaker.call(lambda: 503, is_failure=lambda status: status >= 500)
+    breaker.call(lambda: 503, is_failure=lambda status: status >= 500)
+
+    assert breaker.stats()["state"] == "open"
+
+
+def test_half_open_trial_call_closes_or_reopens_the_circuit():
+    """
+    GIVEN an open circuit whose open period has elapsed
+    WHEN a trial call is made
+    THEN a failing trial reopens the circuit and a successful one closes it.
+    """
+    breaker = CircuitBreaker("upstream", min_calls=1, open_seconds=0)
+
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.stats()["state"] == "open"
+
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)  # trial call
+    assert breaker.stats()["opened"] == 2
+
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.stats()["state"] == "closed"
+
+
+def test_half_open_lets_a_single_trial_call_through():
+    """
+    GIVEN an open circuit whose open period has elapsed
+    WHEN two threads call OpenWeather at the same time
+    THEN only one of them makes the trial call, the other is rejected.
+    """
+    breaker = CircuitBreaker("OpenWeather", min_calls=1, open_seconds=0)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+
+    trial_started = threading.Event()
+    release_trial = threading.Event()
+
+    def slow_trial():
+        trial_started.set()
+        release_trial.wait(timeout=2)
+        return "ok"
+
+    results = []
+    trial = threading.Thread(target=lambda: results.append(breaker.call(slow_trial)))
+    trial.start()
+    trial_started.wait(timeout=2)
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+    release_trial.set()
+    trial.join()
+
+    assert results == ["ok"]
+    assert breaker.stats()["state"] == "closed"
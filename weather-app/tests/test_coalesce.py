@@ -0,0 +1,83 @@
+# tests/test_coalesce.py
+
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from src.utils.coalesce import RequestCoalescer
+from src.utils import api_client
+
+
+def run_concurrently(func, num_threads):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(func())) for _ in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    """
+    GIVEN several threads asking for the same key at the same time
+    WHEN they go through the coalescer
+    THEN the upstream function should run once and every thread gets its result.
+    """
+    coalescer = RequestCoalescer()
+    upstream_calls = []
+
+    def upstream():
+        upstream_calls.append(1)
+        time.sleep(0.05)
+        return {"temp": 12}
+
+    results = run_concurrently(lambda: coalescer.run("london", upstream), num_threads=5)
+
+    assert results == [{"temp": 12}] * 5
+    assert len(upstream_calls) == 1
+    assert coalescer.stats() == {"calls": 1, "collapsed": 4, "in_flight": 0}
+
+def test_upstream_error_is_raised_to_waiting_callers():
+    """
+    GIVEN the shared upstream call fails
+    WHEN callers go through the coalescer
+    THEN the exception propagates and the key is released for the next call.
+    """
+    coalescer = RequestCoalescer()
+
+    def failing_upstream():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError, match="upstream down"):
+        coalescer.run("london", failing_upstream)
+
+    assert coalescer.run("london", lambda: "recovered") == "recovered"
+    assert coalescer.stats()["in_flight"] == 0
+
+@patch("src.utils.api_client.requests.get")
+def test_get_weather_data_coalesces_same_city_with_different_casing(mock_get):
+    """
+    GIVEN concurrent lookups for the same city written differently
+    WHEN get_weather_data is called from several threads
+    THEN only one OpenWeather request should be made.
+    """
+    def slow_get(*args, **kwargs):
+        time.sleep(0.05)
+        return mock_get.return_value
+
+    mock_get.side_effect = slow_get
+    mock_get.return_value.json.return_value = {"name": "London"}
+    mock_get.return_value.status_code = 200
+
+    cities = iter(["London", "london", " LONDON ", "London"])
+    lock = threading.Lock()
+
+    def lookup():
+        with lock:
+            city = next(cities)
+        return api_client.get_weather_data(city, "gb")
+
+    results = run_concurrently(lookup, num_threads=4)
+
+    assert results == [{"name": "London"}] * 4
+    assert mock_get.call_count == 1
@@ -0,0 +1,82 @@
+# tests/test_hedging.py
+
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.hedging import HedgingPolicy
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+def test_slow_call_is_hedged_and_the_faster_response_wins(executor):
+    """
+    GIVEN a hedging policy with a 10 ms delay and a first call that takes 300 ms
+    WHEN the call is run through the policy
+    THEN a second call is sent and its response is returned without waiting for the first.
+    """
+    policy = HedgingPolicy(executor, enabled=True, initial_delay=0.01, budget=1.0)
+    attempts = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            attempt = len(attempts)
+            attempts.append(attempt)
+        time.sleep(0.3 if attempt == 0 else 0)
+        return f"response {attempt}"
+
+    started = time.monotonic()
+    assert policy.run(call) == "response 1"
+    assert time.monotonic() - started < 0.25
+    assert policy.stats()["fired"] == 1
+    assert policy.stats()["won"] == 1
+
+def test_fast_call_is_not_hedged(executor):
+    policy = HedgingPolicy(executor, enabled=True, initial_delay=1, budget=1.0)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        return "ok"
+
+    assert policy.run(call) == "ok"
+    assert len(attempts) == 1
+    assert policy.stats()["fired"] == 0
+
+def test_hedges_stay_within_budget(executor):
+    """
+    GIVEN a 10% hedging budget and calls that are all slower than the hedging delay
+    WHEN 20 calls are run
+    THEN only 2 of them are hedged.
+    """
+    policy = HedgingPolicy(executor, enabled=True, initial_delay=0.001, budget=0.1, min_samples=100)
+
+    def call():
+        time.sleep(0.02)
+        return "ok"
+
+    for _ in range(20):
+        policy.run(call)
+
+    assert policy.stats()["fired"] == 2
+    assert policy.stats()["budget_exceeded"] == 18
+
+def test_error_of_first_call_is_raised_when_both_fail(executor):
+    policy = HedgingPolicy(executor, enabled=True, initial_delay=0.01, budget=1.0)
+
+    def call():
+        time.sleep(0.02)
+        raise ConnectionError("upstream down")
+
+    with pytest.raises(ConnectionError):
+        policy.run(call)
+    assert policy.stats()["won"] == 0
+
+def test_disabled_policy_calls_in_the_current_thread(executor):
+    policy = HedgingPolicy(executor)
+
+    assert policy.run(threading.current_thread) is threading.current_thread()
+    assert policy.stats()["calls"] == 0
@@ -7,6 +7,7 @@ from fastapi.testclient import TestClient
 # If your FastAPI app is in src/app.py with 'app = FastAPI()', do:
 from src.app import app
 from src.models.weather_model import WeatherResponse
+from src.utils.circuit_breaker import CircuitOpenError
 
 @pytest.fixture
 def client():
@@ -91,6 +92,21 @@ def test_fetch_weather_raises_400_on_exception(mock_get_weather, client, valid_w
     assert "Some weather error" in response.json()["detail"]
     mock_get_weather.assert_called_once()
 
+@patch("src.app.get_weather")
+def test_fetch_weather_returns_503_while_circuit_is_open(mock_get_weather, client, valid_weather_request_payload):
+    """
+    GIVEN the OpenWeather circuit breaker is open and nothing cached can stand in
+    WHEN we POST to /weather
+    THEN we expect a 503 response naming the unavailable upstream.
+    """
+    error = RuntimeError("Failed to fetch weather data from OpenWeather API")
+    error.__cause__ = CircuitOpenError("OpenWeather", 20)
+    mock_get_weather.side_effect = error
+
+    response = client.post("/weather", json=valid_weather_request_payload)
+    assert response.status_code == 503
+    assert "OpenWeather is unavailable" in response.json()["detail"]
+
 def test_fetch_weather_validation_error(client):
     """
     If we omit required fields (like 'city'),
@@ -103,3 +119,40 @@ def test_fetch_weather_validation_error(client):
     response = client.post("/weather", json=invalid_payload)
     assert response.status_code == 422
     assert "detail" in response.json()
+
+@patch("src.services.weather_service.get_weather")
+def test_fetch_weather_batch_returns_result_or_error_per_city(mock_get_weather, client):
+    """
+    GIVEN a batch of cities where one lookup fails
+    WHEN we POST to /weather/batch
+    THEN we expect a 200 with one item per city, in order, carrying its own status and error.
+    """
+    def get_weather(user_id, city, country_code):
+        if city == "Atlantis":
+            raise ValueError("No forecast data available")
+        return mock_weather_response()
+
+    mock_get_weather.side_effect = get_weather
+
+    response = client.post("/weather/batch", json={
+        "user_id": "testuser123",
+        "cities": [{"city": "London", "country_code": "GB"}, {"city": "Atlantis"}, {"city": "Paris"}]
+    })
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["city"] for item in items] == ["London", "Atlantis", "Paris"]
+    assert [item["status_code"] for item in items] == [200, 404, 200]
+    assert items[0]["results"]["current"]["city"] == "London"
+    assert items[1]["results"] is None
+    assert items[1]["error"] == "Data issue: No forecast data available"
+    assert mock_get_weather.call_count == 3
+
+def test_fetch_weather_batch_rejects_empty_batch(client):
+    """
+    GIVEN a batch without any cities
+    WHEN we POST to /weather/batch
+    THEN we expect a 422 from FastAPI's validation.
+    """
+    response = client.post("/weather/batch", json={"user_id": "testuser123", "cities": []})
+    assert response.status_code == 422
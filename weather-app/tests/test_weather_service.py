@@ -1,9 +1,17 @@
 # tests/test_weather_service.py
 
+import threading
 import pytest
 from unittest.mock import patch, MagicMock
-from src.services.weather_service import get_weather
-from src.models.weather_model import WeatherResponse, CurrentWeather, ForecastDay
+from src.services import weather_service
+from src.services.weather_service import get_weather, get_weather_batch, parse_forecast
+from src.models.weather_model import WeatherResponse, CurrentWeather, ForecastDay, WeatherRequestObj
+
+@pytest.fixture(autouse=True)
+def clear_coordinate_cache():
+    weather_service.coordinate_cache.clear()
+    yield
+    weather_service.coordinate_cache.clear()
 
 @pytest.fixture
 def mock_openweather_data():
@@ -145,3 +153,115 @@ def test_get_weather_raises_exception_if_openweather_fails(mock_get_weather_data
     with pytest.raises(Exception) as exc:
         get_weather("exc_user", "SomeCity", "XX")
     assert "Failed to fetch weather data from OpenWeather API" in str(exc.value)
+
+
+@patch("src.services.weather_service.get_weather_forecast")
+@patch("src.services.weather_service.get_weather_data")
+def test_get_weather_fetches_forecast_concurrently_for_known_city(
+    mock_get_weather_data,
+    mock_get_weather_forecast,
+    mock_openweather_data,
+    mock_openmeteo_data
+):
+    """
+    GIVEN a city whose coordinates were learnt from an earlier OpenWeather response
+    WHEN get_weather() is called again for that city
+    THEN the Open-Meteo forecast is requested while the OpenWeather call is still in flight.
+    """
+    forecast_started = threading.Event()
+    overlapped = []
+
+    def weather_data(city, country_code):
+        # on the warm call, the forecast request should start before OpenWeather answers
+        if mock_get_weather_data.call_count == 2:
+            overlapped.append(forecast_started.wait(timeout=2))
+        return mock_openweather_data
+
+    def forecast(lat, lon):
+        forecast_started.set()
+        return mock_openmeteo_data
+
+    mock_get_weather_data.side_effect = weather_data
+    mock_get_weather_forecast.side_effect = forecast
+
+    get_weather("testuser", "London", "GB")  # cold: sequential, seeds the coordinate cache
+    forecast_started.clear()
+    response = get_weather("testuser", " london ", "gb")
+
+    assert overlapped == [True]
+    assert mock_get_weather_forecast.call_count == 2
+    mock_get_weather_forecast.assert_called_with(51.5074, -0.1278)
+    assert response.results["forecast"][0].date == "2025-04-11"
+    assert weather_service.coordinate_cache.stats()["hits"] == 1
+
+@patch("src.services.weather_service.get_weather_forecast")
+@patch("src.services.weather_service.get_weather_data")
+def test_get_weather_without_country_code_reuses_cached_coordinates(
+    mock_get_weather_data,
+    mock_get_weather_forecast,
+    mock_openweather_data,
+    mock_openmeteo_data
+):
+    """
+    GIVEN a city requested without a country code, which OpenWeather resolves to "GB"
+    WHEN get_weather() is called twice for that city
+    THEN the second call hits the coordinate cache and does not wait for OpenWeather before the forecast.
+    """
+    forecast_started = threading.Event()
+    overlapped = []
+
+    def weather_data(city, country_code):
+        if mock_get_weather_data.call_count == 2:
+            overlapped.append(forecast_started.wait(timeout=2))
+        return mock_openweather_data
+
+    def forecast(lat, lon):
+        forecast_started.set()
+        return mock_openmeteo_data
+
+    mock_get_weather_data.side_effect = weather_data
+    mock_get_weather_forecast.side_effect = forecast
+
+    hits = weather_service.coordinate_cache.stats()["hits"]
+    get_weather("testuser", "London", None)
+    forecast_started.clear()
+    get_weather("testuser", "London", None)
+
+    assert weather_service.coordinate_cache.stats()["hits"] == hits + 1
+    assert overlapped == [True]
+    assert mock_get_weather_forecast.call_count == 2
+
+@patch("src.services.weather_service.get_weather")
+def test_get_weather_batch_fetches_cities_concurrently(mock_get_weather):
+    """
+    GIVEN a batch of three cities
+    WHEN get_weather_batch() is called
+    THEN the cities are fetched at the same time and results keep the request order.
+    """
+    all_started = threading.Barrier(3, timeout=2)
+
+    def get_weather_for(user_id, city, country_code):
+        all_started.wait()  # only passes once all three lookups are in flight
+        if city == "Nowhere":
+            raise RuntimeError("Failed to fetch weather data from OpenWeather API")
+        return city
+
+    mock_get_weather.side_effect = get_weather_for
+    cities = [WeatherRequestObj(city=city) for city in ("London", "Nowhere", "Paris")]
+
+    results = get_weather_batch("testuser", cities)
+
+    assert results[0] == "London"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == "Paris"
+
+def test_parse_forecast_rejects_invalid_values(mock_openmeteo_data):
+    """
+    GIVEN a forecast with a missing precipitation value
+    WHEN parse_forecast() validates the daily columns
+    THEN a ValueError (pydantic ValidationError) is raised, as with per-day validation.
+    """
+    mock_openmeteo_data["daily"]["precipitation_probability_max"] = [20, None]
+
+    with pytest.raises(ValueError):
+        parse_forecast(mock_openmeteo_data)